@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.utils.html import format_html
 import json
-from .models import LicenseKey, Device, FullReport, DiffReport, PolicyRule, PolicyRuleset, Organization, ActivityIgnorePattern
+from .models import LicenseKey, Device, FullReport, DiffReport, PolicyRule, PolicyRuleset, Organization, ActivityIgnorePattern, ApiToken
 
 @admin.register(Organization)
 class OrganizationAdmin(admin.ModelAdmin):
@@ -24,7 +24,7 @@ class LicenseKeyAdmin(admin.ModelAdmin):
             'fields': ('name', 'licensekey', 'organization', 'created_by')
         }),
         ('License Configuration', {
-            'fields': ('max_devices', 'expires_at', 'is_active')
+            'fields': ('max_devices', 'report_retention', 'expires_at', 'is_active')
         }),
         ('Timestamps', {
             'fields': ('created_at',),
@@ -185,4 +185,16 @@ class ActivityIgnorePatternAdmin(admin.ModelAdmin):
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
-    )
\ No newline at end of file
+    )
+
+@admin.register(ApiToken)
+class ApiTokenAdmin(admin.ModelAdmin):
+    list_display = ('name', 'user', 'prefix', 'is_active', 'created_at', 'last_used_at')
+    list_filter = ('is_active', 'created_at')
+    search_fields = ('name', 'prefix', 'user__username')
+    readonly_fields = ('user', 'name', 'prefix', 'created_at', 'last_used_at')
+    exclude = ('key_hash',)
+
+    def has_add_permission(self, request):
+        # Tokens are created with manage.py create_api_token, which shows the key once
+        return False
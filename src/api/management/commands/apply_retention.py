@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+from api.utils.retention import RETENTION_TABLES, apply_retention, get_policy
+
+
+class Command(BaseCommand):
+    help = 'Prune old full reports and apply the retention policies of the diff report and device event history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--table',
+            action='append',
+            choices=['fullreport', *RETENTION_TABLES],
+            help='Only process this table (can be repeated; default: all)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Maximum number of rows deleted or rewritten per statement',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0.0,
+            help='Seconds to sleep between batches to leave room for other writers',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be removed without changing anything')
+
+    def handle(self, *args, **options):
+        tables = options['table'] or ['fullreport', *RETENTION_TABLES]
+        results = apply_retention(
+            tables=tables,
+            batch_size=options['batch_size'],
+            pause=options['pause'],
+            dry_run=options['dry_run'],
+        )
+
+        prefix = '[dry run] ' if options['dry_run'] else ''
+        for table, result in results.items():
+            if table == 'fullreport':
+                label = f'FullReport (keep newest {settings.FULLREPORT_RETENTION_COUNT} per device unless set on the license)'
+            else:
+                policy = ', '.join(f'{key}={value or "off"}' for key, value in get_policy(table).items())
+                label = f'{RETENTION_TABLES[table][0].__name__} ({policy})'
+            self.stdout.write(
+                f'{prefix}{label}: '
+                f'{result["deleted"]} rows deleted, {result["summarized"]} rows summarized, '
+                f'{filesizeformat(result["bytes_reclaimed"])} reclaimed'
+            )
+        self.stdout.write(self.style.SUCCESS('Retention applied'))
@@ -0,0 +1,71 @@
+import logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from api.utils.benchmarks import baseline_results, find_regressions, load_history, run_benchmarks, save_run
+
+
+class Command(BaseCommand):
+    help = 'Run the parser, diff and policy evaluation micro-benchmarks and check for regressions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--history',
+            default=str(settings.BASE_DIR / 'benchmarks' / 'history.json'),
+            help='JSON history file; the latest result of each benchmark in it is the regression baseline',
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.2,
+            help='Allowed throughput drop against the baseline (0.2 = 20%%)',
+        )
+        parser.add_argument(
+            '--filter',
+            dest='pattern',
+            help='Only run benchmarks whose name contains this string',
+        )
+        parser.add_argument('--repeat', type=int, default=5, help='Rounds per benchmark; the best is kept')
+        parser.add_argument('--min-time', type=float, default=0.2, help='Minimum seconds per round')
+        parser.add_argument('--label', default='', help='Free-form label stored with the run (e.g. a commit id)')
+        parser.add_argument('--no-save', action='store_true', help='Do not append this run to the history')
+
+    def handle(self, *args, **options):
+        history = load_history(options['history'])
+        baseline = baseline_results(history)
+
+        # Keep log output (and its I/O) out of the measurements
+        logging.disable(logging.CRITICAL)
+        try:
+            results = run_benchmarks(
+                pattern=options['pattern'],
+                repeat=options['repeat'],
+                min_time=options['min_time'],
+            )
+        finally:
+            logging.disable(logging.NOTSET)
+        if not results:
+            raise CommandError('No benchmark matches the given filter')
+
+        for name, result in results.items():
+            line = f'{name:<50} {result["ops_per_sec"]:>14.1f} ops/s'
+            previous = baseline.get(name)
+            if previous:
+                change = result['ops_per_sec'] / previous['ops_per_sec'] - 1
+                line += f' ({change:+.1%})'
+            self.stdout.write(line)
+
+        regressions = find_regressions(results, baseline, options['tolerance'])
+        if regressions:
+            # Regressed runs are not recorded so they do not become the next baseline
+            details = '\n'.join(
+                f'  {name}: {before:.1f} -> {after:.1f} ops/s'
+                for name, before, after in regressions
+            )
+            raise CommandError(
+                f'{len(regressions)} benchmark(s) regressed by more than {options["tolerance"]:.0%}:\n{details}'
+            )
+
+        if not options['no_save']:
+            save_run(options['history'], results, label=options['label'])
+            self.stdout.write(self.style.SUCCESS(f'Results appended to {options["history"]}'))
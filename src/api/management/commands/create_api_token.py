@@ -0,0 +1,22 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from api.read_api import create_token
+
+
+class Command(BaseCommand):
+    help = 'Create a token for the read-only API; the token is printed once and only its hash is stored'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='User the token belongs to')
+        parser.add_argument('--name', default='', help='Name describing what the token is used for')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f'User {options["username"]} not found')
+
+        token, key = create_token(user, options['name'])
+        self.stdout.write(f'Token {token.prefix}... created for {user.username}:')
+        self.stdout.write(key)
+        self.stdout.write(self.style.WARNING('Store it now: it cannot be shown again'))
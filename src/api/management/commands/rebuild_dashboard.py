@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+from api.models import Device, FleetAggregate
+from api.utils.compliance import latest_reports_by_device
+from api.utils.fleet_dashboard import count_evaluations, update_aggregates
+from api.utils.lynis_report import LynisReport
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the fleet dashboard counters from every device and its latest report'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='Devices loaded per batch')
+
+    def handle(self, *args, **options):
+        device_ids = list(Device.objects.order_by('id').values_list('id', flat=True))
+        batch_size = options['batch_size']
+
+        with transaction.atomic():
+            FleetAggregate.objects.all().delete()
+            Device.objects.update(dashboard_buckets=[])
+            for start in range(0, len(device_ids), batch_size):
+                batch = Device.objects.in_bulk(device_ids[start:start + batch_size])
+                reports = {
+                    device_id: LynisReport(full_report.full_report).get_parsed_report()
+                    for device_id, full_report in latest_reports_by_device(list(batch)).items()
+                }
+                update_aggregates(list(batch.values()), reports)
+            # Evaluations of deleted devices are not kept on any device, so the totals restart without them
+            totals = Device.objects.aggregate(evaluated=Sum('rules_evaluated'), skipped=Sum('rules_skipped'))
+            count_evaluations(totals['evaluated'] or 0, totals['skipped'] or 0)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Dashboard rebuilt for {len(device_ids)} devices: {FleetAggregate.objects.count()} counters'
+        ))
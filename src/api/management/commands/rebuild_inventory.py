@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from api.models import Device
+from api.utils.compliance import latest_reports_by_device
+from api.utils.inventory import sync_device_inventory
+from api.utils.lynis_report import LynisReport
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the fleet inventory tables from the latest report of each device'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--device', type=int, action='append', help='Only rebuild this device id (can be repeated)')
+        parser.add_argument('--batch-size', type=int, default=200, help='Devices loaded per batch')
+
+    def handle(self, *args, **options):
+        devices = Device.objects.order_by('id')
+        if options['device']:
+            devices = devices.filter(id__in=options['device'])
+        device_ids = list(devices.values_list('id', flat=True))
+
+        synced = added = removed = 0
+        batch_size = options['batch_size']
+        for start in range(0, len(device_ids), batch_size):
+            batch = Device.objects.in_bulk(device_ids[start:start + batch_size])
+            reports = latest_reports_by_device(list(batch))
+            for device_id, full_report in reports.items():
+                report = LynisReport(full_report.full_report).get_parsed_report()
+                stats = sync_device_inventory(batch[device_id], report)
+                added += sum(kind_added for kind_added, _ in stats.values())
+                removed += sum(kind_removed for _, kind_removed in stats.values())
+                synced += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Inventory rebuilt for {synced} devices: {added} rows added, {removed} rows removed'
+        ))
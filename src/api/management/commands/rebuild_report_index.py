@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from api.models import Device
+from api.utils.compliance import latest_reports_by_device
+from api.utils.lynis_report import LynisReport
+from api.utils.report_index import index_report
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the report key/value index from the latest report of each device'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--device', type=int, action='append', help='Only rebuild this device id (can be repeated)')
+        parser.add_argument('--batch-size', type=int, default=200, help='Devices loaded per batch')
+
+    def handle(self, *args, **options):
+        devices = Device.objects.order_by('id')
+        if options['device']:
+            devices = devices.filter(id__in=options['device'])
+        device_ids = list(devices.values_list('id', flat=True))
+
+        indexed = rows = 0
+        batch_size = options['batch_size']
+        for start in range(0, len(device_ids), batch_size):
+            batch = Device.objects.in_bulk(device_ids[start:start + batch_size])
+            reports = latest_reports_by_device(list(batch))
+            for device_id, full_report in reports.items():
+                report = LynisReport(full_report.full_report).get_parsed_report()
+                rows += index_report(batch[device_id], report)
+                indexed += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Report index rebuilt for {indexed} devices: {rows} rows written'))
@@ -0,0 +1,107 @@
+import multiprocessing
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from api.models import Device
+from api.utils.recompute import TARGETS, Checkpoint, chunked, recompute_chunk
+from api.utils.rule_stats import collector as stats_collector
+
+
+def _close_connections():
+    # Each worker opens its own database connections
+    connections.close_all()
+
+
+def _run_chunk(args):
+    device_ids, targets = args
+    return device_ids, recompute_chunk(device_ids, targets)
+
+
+class Command(BaseCommand):
+    help = 'Parse the latest report of every device again and recompute compliance, the report index and the inventory'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target',
+            action='append',
+            choices=TARGETS,
+            help='Only recompute this (can be repeated; default: all)',
+        )
+        parser.add_argument('--device', type=int, action='append', help='Only recompute this device id (can be repeated)')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=min(4, os.cpu_count() or 1),
+            help='Worker processes (0 runs in this process)',
+        )
+        parser.add_argument('--chunk-size', type=int, default=200, help='Devices per chunk (one transaction each)')
+        parser.add_argument(
+            '--checkpoint',
+            default=str(settings.BASE_DIR / 'recompute-checkpoint.json'),
+            help='File recording finished chunks, used to resume an interrupted full run (not used with --device)',
+        )
+        parser.add_argument('--restart', action='store_true', help='Ignore the checkpoint of a previous run')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1 or options['workers'] < 0:
+            raise CommandError('--chunk-size must be positive and --workers cannot be negative')
+        targets = options['target'] or list(TARGETS)
+
+        devices = Device.objects.order_by('id')
+        if options['device']:
+            # Chunks of a partial run span ids it skips: only full runs are checkpointed
+            devices = devices.filter(id__in=options['device'])
+            checkpoint = None
+        else:
+            checkpoint = Checkpoint(options['checkpoint'], targets)
+            if options['restart']:
+                checkpoint.clear()
+            elif checkpoint.load():
+                self.stdout.write(f'Resuming from {checkpoint.path} ({len(checkpoint.done)} chunks already done)')
+        device_ids = [
+            device_id for device_id in devices.values_list('id', flat=True)
+            if checkpoint is None or not checkpoint.is_done(device_id)
+        ]
+        chunks = [(chunk, targets) for chunk in chunked(device_ids, options['chunk_size'])]
+        total = len(device_ids)
+        self.stdout.write(f'Recomputing {", ".join(targets)} for {total} devices in {len(chunks)} chunks')
+
+        done = changed = 0
+        start = time.monotonic()
+        pool = None
+        try:
+            if options['workers']:
+                # Workers inherit this process' buffers: write them once, here
+                stats_collector.flush()
+                _close_connections()
+                pool = multiprocessing.get_context('fork').Pool(options['workers'], initializer=_close_connections)
+                results = pool.imap_unordered(_run_chunk, chunks)
+            else:
+                results = map(_run_chunk, chunks)
+
+            for chunk, stats in results:
+                if checkpoint is not None:
+                    checkpoint.mark_done(chunk)
+                done += stats['devices']
+                changed += stats['changed']
+                elapsed = time.monotonic() - start
+                rate = done / elapsed if elapsed else 0
+                eta = (total - done) / rate if rate else 0
+                self.stdout.write(f'  {done}/{total} devices ({rate:.0f}/s, about {eta:.0f}s left)')
+        except KeyboardInterrupt:
+            raise CommandError(f'Interrupted after {done} devices; run the command again to resume')
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+
+        if checkpoint is not None:
+            checkpoint.clear()
+        elapsed = time.monotonic() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Recomputed {done} devices in {elapsed:.1f}s ({done / elapsed if elapsed else 0:.0f}/s); '
+            f'compliance changed for {changed}'
+        ))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from api.models import Device
+from api.utils.compliance import refresh_device_compliance, time_dependent_devices
+
+
+class Command(BaseCommand):
+    help = 'Re-evaluate the compliance of devices whose rules depend on the time (e.g. days_since_audit); run it daily'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Re-evaluate every device, not only those with time-dependent rules')
+        parser.add_argument('--batch-size', type=int, default=200, help='Devices evaluated per batch')
+
+    def handle(self, *args, **options):
+        devices = Device.objects.all() if options['all'] else time_dependent_devices()
+        device_ids = sorted(devices.values_list('id', flat=True))
+
+        changed = 0
+        batch_size = options['batch_size']
+        for start in range(0, len(device_ids), batch_size):
+            changed += refresh_device_compliance(Device.objects.filter(id__in=device_ids[start:start + batch_size]))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Compliance refreshed for {len(device_ids)} devices: {changed} changed status'
+        ))
@@ -0,0 +1,41 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from api.models import ArchivedReport
+from api.utils.lynis_report import LynisReport
+from api.utils.report_archive import ArchiveError, read_archived_report
+
+
+class Command(BaseCommand):
+    help = 'Read an archived report back from its segment and run it through the report parser'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archive_id', type=int, help='ArchivedReport id')
+        parser.add_argument('--raw', action='store_true', help='Print the raw report instead of the parsed JSON')
+        parser.add_argument('--output', help='Write to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        try:
+            entry = ArchivedReport.objects.get(id=options['archive_id'])
+        except ArchivedReport.DoesNotExist:
+            raise CommandError(f'Archived report {options["archive_id"]} does not exist')
+
+        try:
+            raw_report = read_archived_report(entry)
+        except ArchiveError as e:
+            raise CommandError(str(e))
+
+        if options['raw']:
+            content = raw_report
+        else:
+            parsed_report = LynisReport(raw_report).get_parsed_report()
+            content = json.dumps(parsed_report, indent=2, sort_keys=True, default=str)
+
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                output_file.write(content)
+            self.stdout.write(self.style.SUCCESS(
+                f'Report {entry.report_id} of {entry.hostname or entry.hostid} written to {options["output"]}'
+            ))
+        else:
+            self.stdout.write(content)
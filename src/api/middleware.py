@@ -1,8 +1,13 @@
 import logging
+import time
+from django.conf import settings
+from django.db import connection
 from django.utils.deprecation import MiddlewareMixin
 from django.contrib.auth.models import AnonymousUser
+from api.utils.profiling import QueryRecorder, should_sample, start_profiler, format_profile
 
 logger = logging.getLogger('audit')
+performance_logger = logging.getLogger('performance')
 
 class AuditLoggingMiddleware(MiddlewareMixin):
     """Middleware to log sensitive operations for audit trail."""
@@ -51,3 +56,56 @@ class AuditLoggingMiddleware(MiddlewareMixin):
             ip = request.META.get('REMOTE_ADDR')
         return ip
 
+
+class QueryProfilingMiddleware:
+    """
+    Middleware to record query count, SQL time and wall time per request.
+
+    Requests over SLOW_REQUEST_THRESHOLD_MS or SLOW_REQUEST_QUERY_BUDGET are
+    logged together with their most repeated SQL statements, which makes
+    N+1 query patterns visible. Sampled requests additionally run under
+    cProfile (see api.utils.profiling).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'REQUEST_PROFILING_ENABLED', True)
+        self.threshold_ms = getattr(settings, 'SLOW_REQUEST_THRESHOLD_MS', 500)
+        self.query_budget = getattr(settings, 'SLOW_REQUEST_QUERY_BUDGET', 100)
+        self.top_queries = getattr(settings, 'REQUEST_PROFILING_TOP_QUERIES', 5)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        profiler = start_profiler() if should_sample(request.path) else None
+        start = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        wall_ms = (time.perf_counter() - start) * 1000
+        sql_ms = recorder.duration * 1000
+
+        request.query_count = recorder.count
+        if settings.DEBUG:
+            response['Server-Timing'] = f'db;dur={sql_ms:.1f};desc="{recorder.count} queries", total;dur={wall_ms:.1f}'
+
+        profile_output = format_profile(profiler) if profiler else None
+        if wall_ms >= self.threshold_ms or recorder.count > self.query_budget:
+            self.log_slow_request(request, response, recorder, wall_ms, sql_ms, profile_output)
+        return response
+
+    def log_slow_request(self, request, response, recorder, wall_ms, sql_ms, profile_output=None):
+        """Log a request that exceeded the time threshold or the query budget."""
+        lines = [
+            f'SLOW REQUEST: {request.method} {request.path} | '
+            f'Status: {response.status_code} | '
+            f'Wall: {wall_ms:.1f}ms | '
+            f'SQL: {sql_ms:.1f}ms | '
+            f'Queries: {recorder.count}'
+        ]
+        for sql, count, duration in recorder.top_repeated(self.top_queries):
+            lines.append(f'  {count}x ({duration * 1000:.1f}ms) {sql}')
+        if profile_output:
+            lines.append(profile_output)
+        performance_logger.warning('\n'.join(lines))
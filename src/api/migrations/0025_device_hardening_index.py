@@ -0,0 +1,41 @@
+# Generated by Django 4.2.16 on 2026-10-18 23:58
+
+from django.db import migrations, models
+
+
+def forwards(apps, schema_editor):
+    """Backfill hardening_index from each device's latest report."""
+    Device = apps.get_model('api', 'Device')
+    FullReport = apps.get_model('api', 'FullReport')
+
+    for device in Device.objects.all().iterator():
+        report = FullReport.objects.filter(device=device).order_by('-id').only('full_report').first()
+        if not report:
+            continue
+        for line in report.full_report.split('\n'):
+            if line.startswith('hardening_index='):
+                value = line.split('=', 1)[1].strip()
+                if value.isdigit():
+                    device.hardening_index = int(value)
+                    device.save(update_fields=['hardening_index'])
+                break
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0024_diffreport_hostname_alter_diffreport_device'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='device',
+            name='hardening_index',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='device',
+            index=models.Index(fields=['hardening_index'], name='api_device_hardeni_465c10_idx'),
+        ),
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-19 00:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0025_device_hardening_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='licensekey',
+            name='report_retention',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
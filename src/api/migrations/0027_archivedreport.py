@@ -0,0 +1,34 @@
+# Generated by Django 4.2.16 on 2026-10-19 00:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0026_licensekey_report_retention'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hostid', models.CharField(db_index=True, max_length=255)),
+                ('hostname', models.CharField(blank=True, max_length=255, null=True)),
+                ('report_id', models.BigIntegerField()),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('segment', models.CharField(max_length=64)),
+                ('offset', models.BigIntegerField()),
+                ('length', models.IntegerField()),
+                ('size', models.IntegerField()),
+                ('device', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='api.device')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['device', '-created_at'], name='api_archive_device__cb66e2_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 4.2.16 on 2026-10-19 00:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0027_archivedreport'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='device',
+            name='inventory_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='InventoryUser',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('uid', models.IntegerField(blank=True, null=True)),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory_users', to='api.device')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['name'], name='api_invento_name_ed207c_idx'), models.Index(fields=['uid'], name='api_invento_uid_4b5af4_idx')],
+                'unique_together': {('device', 'name', 'uid')},
+            },
+        ),
+        migrations.CreateModel(
+            name='InventoryPackage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('version', models.CharField(blank=True, default='', max_length=255)),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory_packages', to='api.device')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['name', 'version'], name='api_invento_name_c95e9e_idx')],
+                'unique_together': {('device', 'name', 'version')},
+            },
+        ),
+        migrations.CreateModel(
+            name='InventoryListeningPort',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('protocol', models.CharField(blank=True, default='', max_length=10)),
+                ('address', models.CharField(blank=True, default='', max_length=255)),
+                ('port', models.IntegerField()),
+                ('process', models.CharField(blank=True, default='', max_length=255)),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory_ports', to='api.device')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['port', 'protocol'], name='api_invento_port_365da8_idx')],
+                'unique_together': {('device', 'protocol', 'address', 'port', 'process')},
+            },
+        ),
+        migrations.CreateModel(
+            name='InventoryKernelModule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory_kernel_modules', to='api.device')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['name'], name='api_invento_name_3d9692_idx')],
+                'unique_together': {('device', 'name')},
+            },
+        ),
+        migrations.CreateModel(
+            name='InventoryAddress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('family', models.CharField(choices=[('ipv4', 'IPv4'), ('ipv6', 'IPv6'), ('mac', 'MAC')], max_length=4)),
+                ('address', models.CharField(max_length=255)),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory_addresses', to='api.device')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['address'], name='api_invento_address_7e8c5f_idx')],
+                'unique_together': {('device', 'family', 'address')},
+            },
+        ),
+    ]
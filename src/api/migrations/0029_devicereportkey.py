@@ -0,0 +1,34 @@
+# Generated by Django 4.2.16 on 2026-10-19 00:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0028_inventory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='device',
+            name='report_index_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='DeviceReportKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255)),
+                ('item', models.IntegerField(blank=True, null=True)),
+                ('value_type', models.CharField(choices=[('text', 'Text'), ('number', 'Number')], max_length=10)),
+                ('value_text', models.CharField(max_length=255)),
+                ('value_num', models.FloatField(blank=True, null=True)),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_keys', to='api.device')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['key', 'value_num'], name='api_devicer_key_0c852e_idx'), models.Index(fields=['key', 'value_text'], name='api_devicer_key_d5baa6_idx'), models.Index(fields=['device', 'key'], name='api_devicer_device__b5e3fe_idx')],
+            },
+        ),
+    ]
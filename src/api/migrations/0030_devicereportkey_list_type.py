@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-19 00:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0029_devicereportkey'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='devicereportkey',
+            name='value_type',
+            field=models.CharField(choices=[('text', 'Text'), ('number', 'Number'), ('list', 'List')], max_length=10),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.16 on 2026-10-19 00:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0030_devicereportkey_list_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='device',
+            name='rules_evaluated',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='device',
+            name='rules_skipped',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='RuleEvaluation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('compliant', models.BooleanField()),
+                ('evaluated_at', models.DateTimeField()),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rule_evaluations', to='api.device')),
+                ('rule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='evaluations', to='api.policyrule')),
+            ],
+            options={
+                'unique_together': {('device', 'rule')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-19 00:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0031_ruleevaluation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='policyrule',
+            name='slow_since',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
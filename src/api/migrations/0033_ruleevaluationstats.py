@@ -0,0 +1,31 @@
+# Generated by Django 4.2.16 on 2026-10-19 00:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0032_policyrule_slow_since'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RuleEvaluationStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('evaluations', models.PositiveBigIntegerField(default=0)),
+                ('errors', models.PositiveBigIntegerField(default=0)),
+                ('total_ms', models.FloatField(default=0)),
+                ('max_ms', models.FloatField(default=0)),
+                ('histogram', models.JSONField(default=list)),
+                ('last_failure_at', models.DateTimeField(blank=True, null=True)),
+                ('rule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='evaluation_stats', to='api.policyrule')),
+            ],
+            options={
+                'unique_together': {('rule', 'day')},
+            },
+        ),
+    ]
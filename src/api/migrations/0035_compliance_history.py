@@ -0,0 +1,42 @@
+# Generated by Django 4.2.16 on 2026-10-19 00:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0034_ruleimpactpreview'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplianceTrend',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('devices', models.PositiveIntegerField(default=0)),
+                ('compliant', models.PositiveIntegerField(default=0)),
+                ('hardening_index_sum', models.PositiveBigIntegerField(default=0)),
+                ('hardening_index_count', models.PositiveIntegerField(default=0)),
+                ('warnings_sum', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ComplianceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('compliant', models.BooleanField()),
+                ('hardening_index', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('warnings', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('rulesets_assigned', models.BinaryField(default=b'')),
+                ('rulesets_passed', models.BinaryField(default=b'')),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='compliance_snapshots', to='api.device')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['device', '-created_at'], name='api_complia_device__731ed4_idx')],
+            },
+        ),
+    ]
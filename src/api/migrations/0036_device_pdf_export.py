@@ -0,0 +1,33 @@
+# Generated by Django 4.2.16 on 2026-10-19 01:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0035_compliance_history'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DevicePdfExport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('report_id', models.PositiveBigIntegerField()),
+                ('rulesets_version', models.CharField(max_length=40)),
+                ('template_version', models.PositiveSmallIntegerField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('hostname', models.CharField(blank=True, default='', max_length=255)),
+                ('pdf', models.BinaryField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pdf_exports', to='api.device')),
+            ],
+            options={
+                'unique_together': {('report_id', 'rulesets_version', 'template_version')},
+            },
+        ),
+    ]
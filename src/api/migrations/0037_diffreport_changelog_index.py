@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-19 01:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0036_device_pdf_export'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='diffreport',
+            index=models.Index(fields=['device', '-created_at', '-id'], name='api_diffrep_device__a6478b_idx'),
+        ),
+    ]
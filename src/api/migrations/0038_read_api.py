@@ -0,0 +1,45 @@
+# Generated by Django 4.2.16 on 2026-10-19 01:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0037_diffreport_changelog_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApiToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('key_hash', models.CharField(max_length=64, unique=True)),
+                ('prefix', models.CharField(max_length=8)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='device',
+            index=models.Index(fields=['updated_at', 'id'], name='api_device_updated_81907a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='diffreport',
+            index=models.Index(fields=['created_at', 'id'], name='api_diffrep_created_a481ce_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ruleevaluation',
+            index=models.Index(fields=['evaluated_at', 'id'], name='api_ruleeva_evaluat_d41e05_idx'),
+        ),
+        migrations.AddField(
+            model_name='apitoken',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='api_tokens', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
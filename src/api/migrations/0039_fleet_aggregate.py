@@ -0,0 +1,30 @@
+# Generated by Django 4.2.16 on 2026-10-19 01:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0038_read_api'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='device',
+            name='dashboard_buckets',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.CreateModel(
+            name='FleetAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(max_length=20)),
+                ('bucket', models.CharField(max_length=255)),
+                ('devices', models.IntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('metric', 'bucket')},
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.16 on 2026-10-19 01:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0039_fleet_aggregate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfilingSettings',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('enabled', models.BooleanField(default=False)),
+                ('rate', models.FloatField(default=0.0)),
+                ('path_prefix', models.CharField(blank=True, default='', max_length=255)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Profiling Settings',
+                'verbose_name_plural': 'Profiling Settings',
+            },
+        ),
+    ]
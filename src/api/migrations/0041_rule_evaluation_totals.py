@@ -0,0 +1,29 @@
+from django.db import migrations
+from django.db.models import Sum
+
+
+def forwards(apps, schema_editor):
+    Device = apps.get_model('api', 'Device')
+    FleetAggregate = apps.get_model('api', 'FleetAggregate')
+
+    totals = Device.objects.aggregate(evaluated=Sum('rules_evaluated'), skipped=Sum('rules_skipped'))
+    for bucket in ('evaluated', 'skipped'):
+        FleetAggregate.objects.update_or_create(
+            metric='rule_evaluations', bucket=bucket, defaults={'devices': totals[bucket] or 0}
+        )
+
+
+def backwards(apps, schema_editor):
+    FleetAggregate = apps.get_model('api', 'FleetAggregate')
+    FleetAggregate.objects.filter(metric='rule_evaluations').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0040_profiling_settings'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
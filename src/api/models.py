@@ -18,6 +18,7 @@ class LicenseKey(models.Model):
     organization = models.ForeignKey(Organization, on_delete=models.CASCADE, null=True, blank=True)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
     max_devices = models.IntegerField(null=True, blank=True)  # null=unlimited
+    report_retention = models.PositiveIntegerField(null=True, blank=True)  # null=FULLREPORT_RETENTION_COUNT
     expires_at = models.DateTimeField(null=True, blank=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -50,14 +51,22 @@ class Device(models.Model):
     lynis_version = models.CharField(max_length=255, blank=True, null=True)
     last_update = models.DateTimeField(blank=True, null=True)
     warnings = models.IntegerField(blank=True, null=True)
+    hardening_index = models.IntegerField(blank=True, null=True)
     rulesets = models.ManyToManyField('PolicyRuleset', related_name='devices', blank=True)
     compliant = models.BooleanField(default=True)
+    inventory_updated_at = models.DateTimeField(blank=True, null=True)  # null=inventory never extracted
+    report_index_updated_at = models.DateTimeField(blank=True, null=True)  # null=report keys never indexed
+    rules_evaluated = models.PositiveBigIntegerField(default=0)  # rule evaluations run at ingest
+    rules_skipped = models.PositiveBigIntegerField(default=0)  # rule results carried forward at ingest
+    dashboard_buckets = models.JSONField(default=list, blank=True)  # FleetAggregate [metric, bucket] pairs counting this device
     
     class Meta:
         indexes = [
             models.Index(fields=['licensekey', 'hostid']),
             models.Index(fields=['licensekey', 'hostid2']),
             models.Index(fields=['last_update']),
+            models.Index(fields=['hardening_index']),
+            models.Index(fields=['updated_at', 'id']),  # read API sync (updated_since)
         ]
 
 class FullReport(models.Model):
@@ -71,12 +80,38 @@ class FullReport(models.Model):
     def save(self, *args, **kwargs):
         super(FullReport, self).save(*args, **kwargs)
 
+class ArchivedReport(models.Model):
+    """Offset index of a pruned FullReport stored in a compressed archive segment (see api.utils.report_archive)."""
+    device = models.ForeignKey(Device, on_delete=models.SET_NULL, null=True, blank=True)
+    hostid = models.CharField(max_length=255, db_index=True)  # preserved even if the device is deleted
+    hostname = models.CharField(max_length=255, blank=True, null=True)
+    report_id = models.BigIntegerField()  # id the report had in FullReport
+    created_at = models.DateTimeField()  # when the original report was received
+    archived_at = models.DateTimeField(auto_now_add=True)
+    segment = models.CharField(max_length=64)  # file name inside REPORT_ARCHIVE_DIR
+    offset = models.BigIntegerField()  # start of the record in the segment
+    length = models.IntegerField()  # compressed payload size in bytes
+    size = models.IntegerField()  # uncompressed report size in bytes
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['device', '-created_at']),
+        ]
+
 class DiffReport(models.Model):
     device = models.ForeignKey(Device, on_delete=models.SET_NULL, null=True, blank=True)
     hostname = models.CharField(max_length=255, blank=True, null=True, db_index=True)
     diff_report = models.JSONField(default=dict)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of a device's changelog (see api.utils.changelog)
+            models.Index(fields=['device', '-created_at', '-id']),
+            models.Index(fields=['created_at', 'id']),  # read API activity
+        ]
+
 class DeviceEvent(models.Model):
     EVENT_TYPE_CHOICES = [
         ('enrolled', 'Device Enrolled'),
@@ -104,6 +139,156 @@ class DeviceEvent(models.Model):
             device_name = self.metadata.get('hostname') or self.metadata.get('hostid')
         return f"{device_name} - {self.get_event_type_display()}"
 
+class ComplianceSnapshot(models.Model):
+    """Compliance state of a device after one report, kept after the report itself is pruned (see api.utils.compliance_history)."""
+    device = models.ForeignKey(Device, on_delete=models.CASCADE, related_name='compliance_snapshots')
+    created_at = models.DateTimeField(auto_now_add=True)
+    compliant = models.BooleanField()
+    hardening_index = models.PositiveSmallIntegerField(blank=True, null=True)
+    warnings = models.PositiveSmallIntegerField(blank=True, null=True)
+    # Bitsets of ruleset ids (bit N set for ruleset N), see compliance_history.pack_ids
+    rulesets_assigned = models.BinaryField(default=b'')
+    rulesets_passed = models.BinaryField(default=b'')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['device', '-created_at']),
+        ]
+
+class ComplianceTrend(models.Model):
+    """Fleet totals for one day over the last snapshot of each device reporting that day, updated at ingest."""
+    day = models.DateField(unique=True)
+    devices = models.PositiveIntegerField(default=0)
+    compliant = models.PositiveIntegerField(default=0)
+    hardening_index_sum = models.PositiveBigIntegerField(default=0)
+    hardening_index_count = models.PositiveIntegerField(default=0)
+    warnings_sum = models.PositiveBigIntegerField(default=0)
+
+class FleetAggregate(models.Model):
+    """Number of devices in one bucket of a fleet dashboard metric, or a fleet total, updated at ingest (see api.utils.fleet_dashboard)."""
+    metric = models.CharField(max_length=20)
+    bucket = models.CharField(max_length=255)
+    devices = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = [['metric', 'bucket']]
+
+class DevicePdfExport(models.Model):
+    """PDF of a device's report, rendered in the background and reused while the report, rulesets and template are unchanged (see api.utils.pdf_export)."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    device = models.ForeignKey(Device, on_delete=models.CASCADE, related_name='pdf_exports')
+    # Not a foreign key, so pruning reports stays a single DELETE; exports of older reports are replaced on the next export
+    report_id = models.PositiveBigIntegerField()
+    rulesets_version = models.CharField(max_length=40)  # hash of the assigned rulesets and their rules
+    template_version = models.PositiveSmallIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    hostname = models.CharField(max_length=255, blank=True, default='')
+    pdf = models.BinaryField(blank=True, null=True)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        unique_together = ('report_id', 'rulesets_version', 'template_version')
+
+# Inventory tables: normalized copies of lists found in each device's latest report,
+# maintained at ingest by api.utils.inventory so fleet questions are indexed queries.
+
+class InventoryPackage(models.Model):
+    device = models.ForeignKey(Device, on_delete=models.CASCADE, related_name='inventory_packages')
+    name = models.CharField(max_length=255)
+    version = models.CharField(max_length=255, blank=True, default='')
+
+    class Meta:
+        unique_together = [['device', 'name', 'version']]
+        indexes = [
+            models.Index(fields=['name', 'version']),
+        ]
+
+class InventoryListeningPort(models.Model):
+    device = models.ForeignKey(Device, on_delete=models.CASCADE, related_name='inventory_ports')
+    protocol = models.CharField(max_length=10, blank=True, default='')
+    address = models.CharField(max_length=255, blank=True, default='')
+    port = models.IntegerField()
+    process = models.CharField(max_length=255, blank=True, default='')
+
+    class Meta:
+        unique_together = [['device', 'protocol', 'address', 'port', 'process']]
+        indexes = [
+            models.Index(fields=['port', 'protocol']),
+        ]
+
+class InventoryUser(models.Model):
+    device = models.ForeignKey(Device, on_delete=models.CASCADE, related_name='inventory_users')
+    name = models.CharField(max_length=255)
+    uid = models.IntegerField(blank=True, null=True)
+
+    class Meta:
+        unique_together = [['device', 'name', 'uid']]
+        indexes = [
+            models.Index(fields=['name']),
+            models.Index(fields=['uid']),
+        ]
+
+class InventoryKernelModule(models.Model):
+    device = models.ForeignKey(Device, on_delete=models.CASCADE, related_name='inventory_kernel_modules')
+    name = models.CharField(max_length=255)
+
+    class Meta:
+        unique_together = [['device', 'name']]
+        indexes = [
+            models.Index(fields=['name']),
+        ]
+
+class InventoryAddress(models.Model):
+    FAMILY_CHOICES = [
+        ('ipv4', 'IPv4'),
+        ('ipv6', 'IPv6'),
+        ('mac', 'MAC'),
+    ]
+
+    device = models.ForeignKey(Device, on_delete=models.CASCADE, related_name='inventory_addresses')
+    family = models.CharField(max_length=4, choices=FAMILY_CHOICES)
+    address = models.CharField(max_length=255)
+
+    class Meta:
+        unique_together = [['device', 'family', 'address']]
+        indexes = [
+            models.Index(fields=['address']),
+        ]
+
+class DeviceReportKey(models.Model):
+    """
+    One scalar key, or one list item, of a device's latest parsed report (see api.utils.report_index).
+
+    value_type is the type of the parsed value. Numeric values, including
+    numeric strings, are also stored in value_num so range comparisons use the index.
+    """
+    TYPE_CHOICES = [
+        ('text', 'Text'),
+        ('number', 'Number'),
+        ('list', 'List'),  # list item that is itself a list, stored joined with '|'
+    ]
+
+    device = models.ForeignKey(Device, on_delete=models.CASCADE, related_name='report_keys')
+    key = models.CharField(max_length=255)
+    item = models.IntegerField(blank=True, null=True)  # position in a list key, null for scalar keys
+    value_type = models.CharField(max_length=10, choices=TYPE_CHOICES)
+    value_text = models.CharField(max_length=255)  # truncated to 255 characters
+    value_num = models.FloatField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['key', 'value_num']),
+            models.Index(fields=['key', 'value_text']),
+            models.Index(fields=['device', 'key']),
+        ]
+
 class ActivityIgnorePattern(models.Model):
     EVENT_TYPE_CHOICES = [
         ('all', 'All'),
@@ -139,6 +324,7 @@ class PolicyRule(models.Model):
     alert = models.BooleanField(default=False)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='created_rules')
     is_system = models.BooleanField(default=False)
+    slow_since = models.DateTimeField(blank=True, null=True)  # set while the p95 evaluation time is over POLICY_RULE_SLOW_MS
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -148,6 +334,53 @@ class PolicyRule(models.Model):
     def __str__(self):
         return self.name
 
+class RuleEvaluation(models.Model):
+    """Last result of a rule for a device, carried forward while the keys the rule reads do not change."""
+    device = models.ForeignKey(Device, on_delete=models.CASCADE, related_name='rule_evaluations')
+    rule = models.ForeignKey(PolicyRule, on_delete=models.CASCADE, related_name='evaluations')
+    compliant = models.BooleanField()
+    evaluated_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = [['device', 'rule']]
+        indexes = [
+            models.Index(fields=['evaluated_at', 'id']),  # read API sync (updated_since)
+        ]
+
+class RuleEvaluationStats(models.Model):
+    """Evaluation timings and failures of a rule for one day, merged from every process (see api.utils.rule_stats)."""
+    rule = models.ForeignKey(PolicyRule, on_delete=models.CASCADE, related_name='evaluation_stats')
+    day = models.DateField()
+    evaluations = models.PositiveBigIntegerField(default=0)
+    errors = models.PositiveBigIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    histogram = models.JSONField(default=list)  # evaluation counts per bucket of rule_stats.HISTOGRAM_BOUNDS_MS
+    last_failure_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        unique_together = [['rule', 'day']]
+
+class RuleImpactPreview(models.Model):
+    """Evaluation of a draft rule query against the latest report of every device, run in the background (see api.utils.impact_preview)."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    rule_query = models.CharField(max_length=255)
+    rule = models.ForeignKey(PolicyRule, on_delete=models.CASCADE, null=True, blank=True, related_name='impact_previews')  # rule being edited, compared with the draft
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    result = models.JSONField(default=dict)  # counts and sample failing devices, updated after each batch
+    error = models.TextField(blank=True, default='')
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='rule_impact_previews')
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
 class PolicyRuleset(models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField()
@@ -167,6 +400,34 @@ class PolicyRuleset(models.Model):
         return self.name
 
 
+class ApiToken(models.Model):
+    """Bearer token of the read API (see api.read_api); only a SHA-256 hash of the token is stored."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='api_tokens')
+    name = models.CharField(max_length=255)
+    key_hash = models.CharField(max_length=64, unique=True)
+    prefix = models.CharField(max_length=8)  # first characters of the token, to tell tokens apart
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f'{self.name} ({self.prefix}...)'
+
+class ProfilingSettings(models.Model):
+    """Singleton model storing the cProfile sampling configuration set at runtime (see api.utils.profiling)."""
+
+    enabled = models.BooleanField(default=False)
+    rate = models.FloatField(default=0.0)
+    path_prefix = models.CharField(max_length=255, blank=True, default='')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Profiling Settings'
+        verbose_name_plural = 'Profiling Settings'
+
+    def __str__(self):
+        return 'Profiling Settings'
+
 class EnrollmentSettings(models.Model):
     """Singleton model storing global enrollment script configuration."""
 
@@ -0,0 +1,28 @@
+from django.http import JsonResponse
+from django.views.decorators.http import require_http_methods
+from api.utils.error_responses import error_response, bad_request
+from api.utils.profiling import get_sampling_config, set_sampling_config
+
+
+@require_http_methods(['GET', 'POST'])
+def profiling_settings(request):
+    """
+    Show or change the cProfile sampling configuration at runtime (staff only).
+
+    POST parameters: enabled (true/false), rate (0.0-1.0), path_prefix.
+    """
+    if not request.user.is_authenticated or not request.user.is_staff:
+        return error_response('Staff access required', 403, 'FORBIDDEN')
+
+    if request.method == 'POST':
+        enabled = request.POST.get('enabled', '').lower() in ('true', '1', 'yes', 'on')
+        rate = request.POST.get('rate')
+        try:
+            rate = float(rate) if rate not in (None, '') else None
+        except ValueError:
+            return bad_request('rate must be a number between 0 and 1')
+        config = set_sampling_config(enabled, rate=rate, path_prefix=request.POST.get('path_prefix'))
+    else:
+        config = get_sampling_config()
+
+    return JsonResponse({'sampling': config})
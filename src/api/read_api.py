@@ -0,0 +1,345 @@
+"""
+Read-only JSON API for integrations, under api/v1/.
+
+Requests authenticate with an ApiToken (``Authorization: Bearer <token>``,
+see ``manage.py create_api_token``) or a logged-in session. Listings are
+paginated with a keyset cursor on (timestamp, id) in ascending order: a
+client syncing the fleet keeps the ``next_cursor`` of its last page, or
+passes ``updated_since``, and only reads the rows that changed. A page costs
+the same number of queries whatever the table size: the token lookup and
+touch, one query for the rows and one per multi-valued field requested.
+
+Common parameters: ``limit`` (default 100, at most 1000), ``cursor``,
+``fields`` (comma-separated sparse fieldset; id is always returned),
+``updated_since`` (ISO 8601) and the filters of each listing.
+"""
+import hashlib
+import secrets
+from datetime import timedelta
+from functools import wraps
+
+from django.http import HttpResponse, JsonResponse
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from api.models import ApiToken, Device, DiffReport, PolicyRule, PolicyRuleset, RuleEvaluation
+from api.utils.changelog import changelog_entry
+from api.utils.cursors import InvalidCursor, decode_cursor, encode_cursor
+from api.utils.error_responses import bad_request, error_response, not_found, unauthorized
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+TOKEN_PREFIX_LENGTH = 8
+# last_used_at is written at most once per interval
+TOKEN_TOUCH_INTERVAL = timedelta(minutes=1)
+
+
+class QueryError(ValueError):
+    """Raised when query parameters are invalid."""
+
+
+def hash_token(key):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def create_token(user, name):
+    """Create an ApiToken for ``user``; return (token, key). Only a hash of the key is stored."""
+    key = secrets.token_urlsafe(32)
+    token = ApiToken.objects.create(user=user, name=name, key_hash=hash_token(key), prefix=key[:TOKEN_PREFIX_LENGTH])
+    return token, key
+
+
+def authenticate(request):
+    """Return the user of the request's API token or session, or None."""
+    scheme, _, key = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() in ('bearer', 'token') and key.strip():
+        token = ApiToken.objects.select_related('user').filter(
+            key_hash=hash_token(key.strip()), is_active=True, user__is_active=True,
+        ).first()
+        if token is None:
+            return None
+        now = timezone.now()
+        ApiToken.objects.filter(id=token.id).filter(
+            Q(last_used_at__isnull=True) | Q(last_used_at__lt=now - TOKEN_TOUCH_INTERVAL)
+        ).update(last_used_at=now)
+        return token.user
+    return request.user if request.user.is_authenticated else None
+
+
+def api_view(func):
+    """GET-only, authenticated API view returning a dict (or a response) as JSON."""
+    @wraps(func)
+    def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return error_response('Method not allowed', 405, 'METHOD_NOT_ALLOWED')
+        if authenticate(request) is None:
+            return unauthorized('A valid API token is required')
+        try:
+            result = func(request, *args, **kwargs)
+        except QueryError as e:
+            return bad_request(str(e))
+        return result if isinstance(result, HttpResponse) else JsonResponse(result)
+    return wrapper
+
+
+def parse_timestamp(value, name):
+    timestamp = parse_datetime(value)
+    if timestamp is None:
+        raise QueryError(f'{name} must be an ISO 8601 date and time')
+    return timestamp if timezone.is_aware(timestamp) else timezone.make_aware(timestamp)
+
+
+def parse_int(value, name):
+    try:
+        return int(value)
+    except ValueError:
+        raise QueryError(f'{name} must be a number')
+
+
+def parse_bool(value, name):
+    if value.lower() not in ('true', 'false', '1', '0'):
+        raise QueryError(f'{name} must be true or false')
+    return value.lower() in ('true', '1')
+
+
+def parse_text(value, name):
+    return value
+
+
+class Listing:
+    """
+    Keyset-paginated listing of a queryset ordered by (``order_field``, id).
+
+    ``fields`` maps API field names to a path for QuerySet.values(), or to a
+    (path, convert) pair; ``related`` maps multi-valued field names to a
+    function returning {id: [values]} for the ids of a page; ``filters`` maps
+    query parameters to a (lookup, parser) pair. ``updated_since`` filters on
+    ``order_field``.
+    """
+
+    def __init__(self, queryset, order_field, fields, filters=None, related=None):
+        self.queryset = queryset
+        self.order_field = order_field
+        self.fields = {name: spec if isinstance(spec, tuple) else (spec, None) for name, spec in fields.items()}
+        self.filters = {**(filters or {}), 'updated_since': (f'{order_field}__gte', parse_timestamp)}
+        self.related = related or {}
+
+    def _field_names(self, request):
+        requested = [name.strip() for name in request.GET.get('fields', '').split(',') if name.strip()]
+        if not requested:
+            return list(self.fields) + list(self.related)
+        unknown = [name for name in requested if name not in self.fields and name not in self.related]
+        if unknown:
+            raise QueryError(f'Unknown fields: {", ".join(unknown)}')
+        return ['id'] + [name for name in requested if name != 'id']
+
+    def _serialize(self, rows, names):
+        related = {name: self.related[name]([row['id'] for row in rows]) for name in names if name in self.related}
+        results = []
+        for row in rows:
+            item = {}
+            for name in names:
+                if name in related:
+                    item[name] = related[name].get(row['id'], [])
+                else:
+                    path, convert = self.fields[name]
+                    item[name] = convert(row[path]) if convert else row[path]
+            results.append(item)
+        return results
+
+    def _values(self, queryset, names):
+        paths = {self.fields[name][0] for name in names if name in self.fields} | {'id', self.order_field}
+        return queryset.values(*paths)
+
+    def page(self, request):
+        """Return {'results', 'next_cursor', 'has_more'} for the request's parameters."""
+        limit = parse_int(request.GET.get('limit') or str(DEFAULT_LIMIT), 'limit')
+        if not 1 <= limit <= MAX_LIMIT:
+            raise QueryError(f'limit must be between 1 and {MAX_LIMIT}')
+        names = self._field_names(request)
+
+        queryset = self.queryset
+        for param, (lookup, parser) in self.filters.items():
+            value = request.GET.get(param)
+            if value:
+                queryset = queryset.filter(**{lookup: parser(value, param)})
+        cursor = request.GET.get('cursor')
+        if cursor:
+            try:
+                timestamp, row_id = decode_cursor(cursor)
+            except InvalidCursor as e:
+                raise QueryError(str(e))
+            queryset = queryset.filter(
+                Q(**{f'{self.order_field}__gt': timestamp}) | Q(**{self.order_field: timestamp, 'id__gt': row_id})
+            )
+
+        rows = list(self._values(queryset.order_by(self.order_field, 'id'), names)[:limit + 1])
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        # The cursor of the last row lets a client resume later, even from the last page
+        next_cursor = encode_cursor(rows[-1][self.order_field], rows[-1]['id']) if rows else cursor
+        return {'results': self._serialize(rows, names), 'next_cursor': next_cursor, 'has_more': has_more}
+
+    def get(self, request, pk):
+        """Return the item with id ``pk``, or None."""
+        names = self._field_names(request)
+        rows = list(self._values(self.queryset.filter(id=pk), names))
+        return self._serialize(rows, names)[0] if rows else None
+
+
+def _device_rulesets(device_ids):
+    rulesets = {}
+    through = Device.rulesets.through.objects.filter(device_id__in=device_ids).order_by('policyruleset_id')
+    for device_id, ruleset_id in through.values_list('device_id', 'policyruleset_id'):
+        rulesets.setdefault(device_id, []).append(ruleset_id)
+    return rulesets
+
+
+def _ruleset_rules(ruleset_ids):
+    rules = {}
+    through = PolicyRuleset.rules.through.objects.filter(policyruleset_id__in=ruleset_ids).order_by('policyrule_id')
+    for ruleset_id, rule_id in through.values_list('policyruleset_id', 'policyrule_id'):
+        rules.setdefault(ruleset_id, []).append(rule_id)
+    return rules
+
+
+def _changes(diff):
+    """Key names and value counts of a diff (see api.utils.changelog)."""
+    entry = changelog_entry(None, None, diff, None, None, compact=True)
+    if entry is None:
+        return {'added': {}, 'removed': {}, 'changed': [], 'summarized': False}
+    return {name: entry[name] for name in ('added', 'removed', 'changed', 'summarized')}
+
+
+devices = Listing(
+    Device.objects.all(),
+    'updated_at',
+    fields={
+        'id': 'id',
+        'hostname': 'hostname',
+        'hostid': 'hostid',
+        'hostid2': 'hostid2',
+        'license': 'licensekey_id',
+        'license_name': 'licensekey__name',
+        'os': 'os',
+        'distro': 'distro',
+        'distro_version': 'distro_version',
+        'lynis_version': 'lynis_version',
+        'hardening_index': 'hardening_index',
+        'warnings': 'warnings',
+        'compliant': 'compliant',
+        'last_update': 'last_update',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    },
+    filters={
+        'license': ('licensekey_id', parse_int),
+        'hostid': ('hostid', parse_text),
+        'hostid2': ('hostid2', parse_text),
+        'compliant': ('compliant', parse_bool),
+        'hardening_index_min': ('hardening_index__gte', parse_int),
+        'hardening_index_max': ('hardening_index__lte', parse_int),
+        'last_update_since': ('last_update__gte', parse_timestamp),
+    },
+    related={'rulesets': _device_rulesets},
+)
+
+compliance = Listing(
+    RuleEvaluation.objects.all(),
+    'evaluated_at',
+    fields={
+        'id': 'id',
+        'device': 'device_id',
+        'rule': 'rule_id',
+        'rule_name': 'rule__name',
+        'compliant': 'compliant',
+        'evaluated_at': 'evaluated_at',
+    },
+    filters={
+        'device': ('device_id', parse_int),
+        'rule': ('rule_id', parse_int),
+        'compliant': ('compliant', parse_bool),
+    },
+)
+
+rules = Listing(
+    PolicyRule.objects.all(),
+    'updated_at',
+    fields={
+        'id': 'id',
+        'name': 'name',
+        'description': 'description',
+        'rule_query': 'rule_query',
+        'enabled': 'enabled',
+        'alert': 'alert',
+        'is_system': 'is_system',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    },
+    filters={'enabled': ('enabled', parse_bool)},
+)
+
+rulesets = Listing(
+    PolicyRuleset.objects.all(),
+    'updated_at',
+    fields={
+        'id': 'id',
+        'name': 'name',
+        'description': 'description',
+        'is_system': 'is_system',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    },
+    related={'rules': _ruleset_rules},
+)
+
+activity = Listing(
+    DiffReport.objects.all(),
+    'created_at',
+    fields={
+        'id': 'id',
+        'device': 'device_id',
+        'hostname': 'hostname',
+        'created_at': 'created_at',
+        'changes': ('diff_report', _changes),
+    },
+    filters={'device': ('device_id', parse_int)},
+)
+
+
+@api_view
+def device_list(request):
+    """Devices with the fields stored at ingest, ordered by updated_at"""
+    return devices.page(request)
+
+
+@api_view
+def device_detail(request, device_id):
+    """One device"""
+    device = devices.get(request, device_id)
+    return device if device is not None else not_found('Device not found')
+
+
+@api_view
+def compliance_list(request):
+    """Last result of each rule for each device, ordered by evaluated_at"""
+    return compliance.page(request)
+
+
+@api_view
+def rule_list(request):
+    """Policy rules, ordered by updated_at"""
+    return rules.page(request)
+
+
+@api_view
+def ruleset_list(request):
+    """Policy rulesets with their rule ids, ordered by updated_at"""
+    return rulesets.page(request)
+
+
+@api_view
+def activity_list(request):
+    """Report changes of every device (key names and value counts), ordered by created_at"""
+    return activity.page(request)
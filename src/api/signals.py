@@ -1,8 +1,11 @@
-from django.db.models.signals import post_migrate, post_save
+from django.db.models.signals import m2m_changed, post_migrate, post_save, pre_delete
 from django.dispatch import receiver
-from api.models import LicenseKey, FullReport
+from django.utils import timezone
+from api.models import Device, DeviceEvent, DiffReport, LicenseKey, PolicyRule, PolicyRuleset
+from api.utils import activity_feed
+from api.utils.fleet_dashboard import remove_device_aggregates
 from django.core.management import call_command
-from django.db import connection
+from django.db import connection, transaction
 import random
 import string
 
@@ -22,15 +25,38 @@ def first_run(sender, **kwargs):
                     call_command('migrate')
                     call_command('populate_db_licensekey')
 
-@receiver(post_save, sender=FullReport)
-def cleanup_old_reports(sender, instance, created, **kwargs):
-    """
-    Keep only the latest 2 reports for each device.
-    This signal fires after a FullReport is saved.
-    """
-    if created:  # Only run for new reports
-        reports = FullReport.objects.filter(device=instance.device).order_by('-created_at')
-        if reports.count() > 2:
-            # Delete older reports except the latest 2
-            for report in reports[2:]:
-                report.delete()
+
+def _touch_rulesets(rulesets):
+    rulesets.update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=PolicyRuleset.rules.through)
+def ruleset_rules_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Touch the rulesets whose rules change, so the policy catalog and the read API see it"""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            _touch_rulesets(PolicyRuleset.objects.filter(id=instance.id))
+    elif action in ('post_add', 'post_remove'):
+        _touch_rulesets(PolicyRuleset.objects.filter(id__in=pk_set))
+    elif action == 'pre_clear':
+        _touch_rulesets(PolicyRuleset.objects.filter(rules=instance))
+
+
+@receiver(pre_delete, sender=PolicyRule)
+def rule_deleted(sender, instance, **kwargs):
+    """Touch the rulesets losing a deleted rule"""
+    _touch_rulesets(PolicyRuleset.objects.filter(rules=instance))
+
+
+@receiver(pre_delete, sender=Device)
+def device_deleted(sender, instance, **kwargs):
+    """Remove a deleted device from the fleet dashboard counters"""
+    remove_device_aggregates(instance)
+
+
+@receiver(post_save, sender=DiffReport)
+@receiver(post_save, sender=DeviceEvent)
+def activity_created(sender, created, **kwargs):
+    """Wake up the live activity feeds of this process"""
+    if created:
+        transaction.on_commit(activity_feed.notify)
@@ -56,6 +56,29 @@ class TestUploadReport:
         # Compare reports ignoring trailing whitespace
         assert report.full_report.strip() == sample_lynis_report.strip()
 
+    def test_upload_report_stores_hardening_index_and_compliance(self, test_license_key, test_user, sample_lynis_report):
+        """Test that ingest stores hardening_index and evaluates compliance for the device."""
+        from api.models import PolicyRule, PolicyRuleset
+        client = Client()
+        url = reverse('upload_report')
+        device = Device.objects.create(licensekey=test_license_key, hostid='host-a', hostid2='host-b')
+        rule = PolicyRule.objects.create(name='Hardened', description='', rule_query='hardening_index > `70`', created_by=test_user)
+        ruleset = PolicyRuleset.objects.create(name='Baseline', description='', created_by=test_user)
+        ruleset.rules.add(rule)
+        device.rulesets.add(ruleset)
+
+        response = client.post(url, {
+            'licensekey': test_license_key.licensekey,
+            'hostid': 'host-a',
+            'hostid2': 'host-b',
+            'data': sample_lynis_report
+        })
+
+        assert response.status_code == 200
+        device.refresh_from_db()
+        assert device.hardening_index == 65
+        assert device.compliant is False
+
     def test_upload_report_invalid_license(self, sample_lynis_report):
         """Test uploading a report with invalid license key returns 401."""
         client = Client()
@@ -1191,3 +1214,1189 @@ class TestActivityIgnorePattern:
         
         assert should_filter_web is True  # Should be filtered
         assert should_filter_db is False  # Should NOT be filtered
+
+
+@pytest.mark.django_db
+class TestRetention:
+    """Tests for the history retention policies (apply_retention)."""
+
+    @pytest.fixture(autouse=True)
+    def policy(self, settings):
+        settings.RETENTION_DIFFREPORT_MAX_AGE_DAYS = 365
+        settings.RETENTION_DIFFREPORT_MAX_ROWS_PER_DEVICE = 3
+        settings.RETENTION_DIFFREPORT_SUMMARY_AFTER_DAYS = 30
+        settings.RETENTION_DEVICEEVENT_MAX_AGE_DAYS = 365
+        settings.RETENTION_DEVICEEVENT_MAX_ROWS_PER_DEVICE = 0
+
+    def create_diff(self, device, days_old):
+        diff = DiffReport.objects.create(
+            device=device,
+            hostname=device.hostname,
+            diff_report={'added': {'new_key': 'value'}, 'removed': {}, 'changed': [{'hardening_index': {'old': 60, 'new': 70}}]},
+        )
+        DiffReport.objects.filter(pk=diff.pk).update(created_at=timezone.now() - timedelta(days=days_old))
+        return diff
+
+    def test_deletes_old_rows_and_caps_rows_per_device(self, test_device):
+        expired = self.create_diff(test_device, days_old=400)
+        recent = [self.create_diff(test_device, days_old=days) for days in (4, 3, 2, 1)]
+        old_event = DeviceEvent.objects.create(device=test_device, event_type='enrolled')
+        DeviceEvent.objects.filter(pk=old_event.pk).update(created_at=timezone.now() - timedelta(days=400))
+
+        from api.utils.retention import apply_retention
+        results = apply_retention(batch_size=1)
+
+        remaining = set(DiffReport.objects.values_list('id', flat=True))
+        assert remaining == {diff.id for diff in recent[1:]}
+        assert expired.id not in remaining
+        assert results['diffreport']['deleted'] == 2
+        assert results['diffreport']['bytes_reclaimed'] > 0
+        assert results['deviceevent']['deleted'] == 1
+        assert not DeviceEvent.objects.exists()
+
+    def test_summarizes_old_diffs(self, test_device):
+        old = self.create_diff(test_device, days_old=60)
+        new = self.create_diff(test_device, days_old=1)
+        Device.objects.filter(id=test_device.id).update(updated_at=timezone.now() - timedelta(days=1))
+
+        from api.utils.retention import apply_retention
+        results = apply_retention(tables=['diffreport'])
+
+        old.refresh_from_db()
+        new.refresh_from_db()
+        # Touched so the changelog ETag changes
+        assert Device.objects.get(id=test_device.id).updated_at > timezone.now() - timedelta(minutes=1)
+        assert old.diff_report == {'summary': {'added': ['new_key'], 'removed': [], 'changed': ['hardening_index']}}
+        assert 'added' in new.diff_report
+        assert results['diffreport']['summarized'] == 1
+
+        # Summarized diffs are not rewritten again
+        assert apply_retention(tables=['diffreport'])['diffreport']['summarized'] == 0
+
+    def test_dry_run_changes_nothing(self, test_device):
+        self.create_diff(test_device, days_old=400)
+        self.create_diff(test_device, days_old=60)
+
+        from django.core.management import call_command
+        from io import StringIO
+        out = StringIO()
+        call_command('apply_retention', '--dry-run', '--table', 'diffreport', stdout=out)
+
+        assert '1 rows deleted, 1 rows summarized' in out.getvalue()
+        assert DiffReport.objects.count() == 2
+        assert not DiffReport.objects.filter(diff_report__has_key='summary').exists()
+
+
+def archived_reports_hook(reports):
+    """Archive hook used by TestPruneFullReports."""
+    archived_reports_hook.archived.extend(report.id for report in reports)
+
+
+archived_reports_hook.archived = []
+
+
+def failing_archive_hook(reports):
+    raise IOError('cold storage unavailable')
+
+
+@pytest.mark.django_db
+class TestPruneFullReports:
+    """Tests for set-based full report pruning."""
+
+    def create_reports(self, device, count):
+        return [FullReport.objects.create(device=device, full_report=f'hardening_index={i}') for i in range(count)]
+
+    def test_upload_keeps_newest_reports(self, client, test_license_key, sample_lynis_report):
+        for _ in range(4):
+            response = client.post('/api/lynis/upload/', {
+                'licensekey': test_license_key.licensekey,
+                'hostid': 'prune-host',
+                'hostid2': 'prune-host2',
+                'data': sample_lynis_report,
+            })
+            assert response.status_code == 200
+
+        device = Device.objects.get(hostid='prune-host')
+        assert FullReport.objects.filter(device=device).count() == 2
+
+    def test_prune_uses_constant_queries(self, test_device, django_assert_num_queries):
+        reports = self.create_reports(test_device, 5)
+        from api.utils.retention import prune_full_reports
+
+        with django_assert_num_queries(2):
+            result = prune_full_reports([test_device.id])
+
+        assert result['deleted'] == 3
+        assert set(FullReport.objects.values_list('id', flat=True)) == {reports[-1].id, reports[-2].id}
+
+    def test_license_override(self, test_device, settings):
+        settings.FULLREPORT_RETENTION_COUNT = 1
+        other_license = LicenseKey.objects.create(
+            licensekey='prune-license', name='Prune', created_by=test_device.licensekey.created_by, report_retention=3,
+        )
+        other_device = Device.objects.create(licensekey=other_license, hostid='other', hostid2='other')
+        self.create_reports(test_device, 4)
+        self.create_reports(other_device, 4)
+        from api.utils.retention import prune_full_reports
+
+        prune_full_reports()
+
+        assert FullReport.objects.filter(device=test_device).count() == 1
+        assert FullReport.objects.filter(device=other_device).count() == 3
+
+    def test_archive_hook_receives_pruned_reports(self, test_device, settings):
+        settings.FULLREPORT_ARCHIVE_HOOK = 'api.tests.archived_reports_hook'
+        archived_reports_hook.archived.clear()
+        reports = self.create_reports(test_device, 3)
+        from api.utils.retention import prune_full_reports
+
+        prune_full_reports([test_device.id])
+
+        assert archived_reports_hook.archived == [reports[0].id]
+        assert not FullReport.objects.filter(id=reports[0].id).exists()
+
+    def test_failed_archive_hook_keeps_reports(self, test_device, settings):
+        settings.FULLREPORT_ARCHIVE_HOOK = 'api.tests.failing_archive_hook'
+        self.create_reports(test_device, 3)
+        from api.utils.retention import prune_full_reports
+
+        assert prune_full_reports([test_device.id])['deleted'] == 0
+        assert FullReport.objects.filter(device=test_device).count() == 3
+
+
+@pytest.mark.django_db
+class TestReportArchive:
+    """Tests for the compressed segment archive of pruned reports."""
+
+    @pytest.fixture(autouse=True)
+    def archive_settings(self, settings, tmp_path):
+        settings.FULLREPORT_ARCHIVE_HOOK = 'api.utils.report_archive.archive_reports'
+        settings.REPORT_ARCHIVE_DIR = tmp_path
+        settings.FULLREPORT_RETENTION_COUNT = 1
+
+    def test_pruned_reports_are_archived_and_readable(self, test_device, sample_lynis_report, sample_lynis_report_updated):
+        from api.models import ArchivedReport
+        from api.utils.report_archive import read_archived_report
+        from api.utils.retention import prune_full_reports
+
+        first = FullReport.objects.create(device=test_device, full_report=sample_lynis_report)
+        second = FullReport.objects.create(device=test_device, full_report=sample_lynis_report_updated)
+        FullReport.objects.create(device=test_device, full_report=sample_lynis_report)
+
+        assert prune_full_reports([test_device.id])['deleted'] == 2
+
+        entries = list(ArchivedReport.objects.order_by('report_id'))
+        assert [entry.report_id for entry in entries] == [first.id, second.id]
+        assert entries[1].offset > entries[0].offset
+        assert entries[0].segment == entries[1].segment
+        assert read_archived_report(entries[1]) == sample_lynis_report_updated
+        assert read_archived_report(entries[0]) == sample_lynis_report
+
+    def test_corrupted_index_is_detected(self, test_device, sample_lynis_report):
+        from api.utils.report_archive import ArchiveError, archive_reports, read_archived_report
+
+        report = FullReport.objects.create(device=test_device, full_report=sample_lynis_report)
+        entry = archive_reports([report])[0]
+        entry.report_id += 1
+
+        with pytest.raises(ArchiveError):
+            read_archived_report(entry)
+
+    def test_rehydrate_command(self, test_device, sample_lynis_report, tmp_path):
+        import json
+        from io import StringIO
+        from django.core.management import call_command
+        from api.utils.report_archive import archive_reports
+
+        report = FullReport.objects.create(device=test_device, full_report=sample_lynis_report)
+        entry = archive_reports([report])[0]
+
+        out = StringIO()
+        call_command('rehydrate_report', str(entry.id), stdout=out)
+        parsed = json.loads(out.getvalue())
+        assert parsed['hostname'] == 'test-server'
+        assert parsed['hardening_index'] == 65
+
+
+@pytest.mark.django_db
+class TestInventory:
+    """Tests for inventory extraction at ingest."""
+
+    def upload(self, client, license_key, data):
+        response = client.post('/api/lynis/upload/', {
+            'licensekey': license_key.licensekey,
+            'hostid': 'inventory-host',
+            'hostid2': 'inventory-host2',
+            'data': data,
+        })
+        assert response.status_code == 200
+        return Device.objects.get(hostid='inventory-host')
+
+    def test_extracts_inventory_from_real_report(self, real_lynis_report):
+        from api.utils.inventory import extract_addresses, extract_packages, extract_ports, extract_users
+
+        report = LynisReport(real_lynis_report).get_parsed_report()
+        packages = extract_packages(report)
+        assert ('adduser', '3.118ubuntu5') in packages
+        assert len(packages) == 184
+        assert ('tcp', '127.0.0.11', 34767, '') in extract_ports(report)
+        assert extract_users(report) == {('root', 0)}
+        assert ('ipv4', '172.18.0.4') in extract_addresses(report)
+
+    def test_ingest_syncs_inventory_incrementally(self, client, test_license_key, sample_lynis_report):
+        from api.models import InventoryListeningPort, InventoryPackage, InventoryUser
+
+        first = sample_lynis_report + (
+            'installed_packages_array=|openssl,3.0.2-0ubuntu1|bash,5.1|\n'
+            'network_listen_port[]=0.0.0.0:22|sshd|\n'
+            'network_listen_port[]=0.0.0.0:23|telnetd|\n'
+            'real_user[]=alice,1000\n'
+        )
+        device = self.upload(client, test_license_key, first)
+        assert set(InventoryPackage.objects.filter(device=device).values_list('name', 'version')) == {
+            ('openssl', '3.0.2-0ubuntu1'), ('bash', '5.1'),
+        }
+        assert set(InventoryListeningPort.objects.filter(device=device).values_list('port', flat=True)) == {22, 23}
+        bash_id = InventoryPackage.objects.get(device=device, name='bash').id
+
+        second = first.replace('openssl,3.0.2-0ubuntu1', 'openssl,3.0.2-0ubuntu1.10').replace(
+            'network_listen_port[]=0.0.0.0:23|telnetd|\n', ''
+        )
+        self.upload(client, test_license_key, second)
+
+        assert set(InventoryPackage.objects.filter(device=device).values_list('name', 'version')) == {
+            ('openssl', '3.0.2-0ubuntu1.10'), ('bash', '5.1'),
+        }
+        # Unchanged rows are kept as they are
+        assert InventoryPackage.objects.get(device=device, name='bash').id == bash_id
+        assert set(InventoryListeningPort.objects.filter(device=device).values_list('port', flat=True)) == {22}
+        assert InventoryUser.objects.filter(device=device, name='alice', uid=1000).exists()
+
+    def test_unchanged_kinds_are_skipped(self, test_device):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from api.utils.inventory import sync_device_inventory
+
+        test_device.inventory_updated_at = timezone.now()
+        with CaptureQueriesContext(connection) as queries:
+            stats = sync_device_inventory(test_device, {'hardening_index': 70}, changed_keys={'hardening_index'})
+        assert stats == {}
+        assert not any('api_inventory' in query['sql'] for query in queries.captured_queries)
+
+    def test_rebuild_inventory_command(self, test_device, real_lynis_report):
+        from django.core.management import call_command
+        from api.models import InventoryPackage
+
+        FullReport.objects.create(device=test_device, full_report=real_lynis_report)
+        call_command('rebuild_inventory')
+
+        assert InventoryPackage.objects.filter(device=test_device).count() == 184
+
+
+@pytest.mark.django_db
+class TestReportIndex:
+    """Tests for the report key/value index and fleet filters."""
+
+    def index(self, device, report, changed_keys=None):
+        from api.utils.report_index import index_report
+        return index_report(device, report, changed_keys)
+
+    def matching(self, expression):
+        from api.utils.report_index import parse_fleet_filter
+        return set(Device.objects.filter(parse_fleet_filter(expression)).values_list('hostid', flat=True))
+
+    def test_index_scalars_and_list_items(self, test_device):
+        from api.models import DeviceReportKey
+
+        self.index(test_device, {
+            'hardening_index': 65,
+            'os': 'Linux',
+            'network_ipv4_address': ['10.0.0.5', '172.18.0.4'],
+            'real_user': [['root', '0']],
+            'days_since_audit': 3,
+        })
+        rows = {(row.key, row.item): row for row in DeviceReportKey.objects.filter(device=test_device)}
+        assert rows[('hardening_index', None)].value_num == 65
+        assert rows[('os', None)].value_type == 'text'
+        assert rows[('network_ipv4_address', 1)].value_text == '172.18.0.4'
+        assert rows[('real_user', 0)].value_text == 'root|0'
+        assert ('days_since_audit', None) not in rows
+
+    def test_incremental_update_only_rewrites_changed_keys(self, test_device):
+        from api.models import DeviceReportKey
+
+        self.index(test_device, {'hardening_index': 65, 'os': 'Linux'})
+        os_row = DeviceReportKey.objects.get(device=test_device, key='os')
+        self.index(test_device, {'hardening_index': 70, 'os': 'Linux'}, changed_keys={'hardening_index'})
+
+        assert DeviceReportKey.objects.get(device=test_device, key='hardening_index').value_num == 70
+        assert DeviceReportKey.objects.get(device=test_device, key='os').id == os_row.id
+
+    def test_fleet_filters(self, test_device, test_license_key):
+        other = Device.objects.create(licensekey=test_license_key, hostid='bsd-host', hostid2='bsd-host2', os='OpenBSD')
+        self.index(test_device, {'hardening_index': 55, 'os': 'Linux', 'network_ipv4_address': ['10.0.0.5']})
+        self.index(other, {'hardening_index': 80, 'os': 'OpenBSD', 'automation_tool_running': 'ansible'})
+
+        assert self.matching("hardening_index < 60 AND os == 'Linux'") == {'test-host-id-1'}
+        assert self.matching('hardening_index >= 60 OR os == Linux') == {'test-host-id-1', 'bsd-host'}
+        assert self.matching("os != 'Linux'") == {'bsd-host'}
+        assert self.matching('NOT (hardening_index < 60)') == {'bsd-host'}
+        assert self.matching("network_ipv4_address contains '10.0.0.5'") == {'test-host-id-1'}
+        assert self.matching('automation_tool_running contains ans') == {'bsd-host'}
+
+    @pytest.mark.parametrize('expression', [
+        'hardening_index <',
+        "os == 'Linux' AND",
+        '(os == Linux',
+        'hardening_index ~ 3',
+        'days_since_audit > 30',
+    ])
+    def test_invalid_filters(self, expression):
+        from api.utils.report_index import FleetFilterError, parse_fleet_filter
+
+        with pytest.raises(FleetFilterError):
+            parse_fleet_filter(expression)
+
+    def test_ingest_indexes_latest_report(self, client, test_license_key, sample_lynis_report):
+        from api.utils.report_index import parse_fleet_filter
+
+        response = client.post('/api/lynis/upload/', {
+            'licensekey': test_license_key.licensekey,
+            'hostid': 'index-host',
+            'hostid2': 'index-host2',
+            'data': sample_lynis_report,
+        })
+        assert response.status_code == 200
+        assert Device.objects.filter(parse_fleet_filter("hostname == 'test-server' AND hardening_index == 65")).exists()
+
+
+@pytest.mark.django_db
+class TestPolicyPlanner:
+    """Tests for translating policy rules to SQL over the report index."""
+
+    RULES = [
+        'hardening_index > `70`',
+        '`70` >= hardening_index',
+        "os == 'Linux'",
+        "os != 'Linux'",
+        'vulnerable_packages_found == `0`',
+        'installed_packages == `184` && cpu_nx == `1`',
+        "os_name == 'Debian' || !(memory_size < `1000`)",
+        "password_min_days < `0`",
+        "password_max_days == '-1'",
+        'missing_key == `1`',
+        '!(missing_key > `1`)',
+        "contains(network_ipv4_address, '172.18.0.4')",
+        "contains(real_user, 'root')",
+        "contains(os_fullname, 'Ubuntu 22')",
+        "contains(os_fullname, 'ubuntu')",
+        "contains(binaries_suid_count, '/usr/bin/sudo')",
+        "contains(missing_key, 'x') || os == 'Linux'",
+        "!contains(network_ipv4_address, '10.0.0.1')",
+        "contains(loaded_kernel_module, 'usb_storage')",
+    ]
+
+    @pytest.mark.parametrize('query', RULES)
+    def test_sql_matches_python_evaluation(self, query, test_device, real_lynis_report):
+        from api.utils.policy_planner import evaluate_rule_in_sql, plan_rule
+        from api.utils.policy_query import evaluate_query
+        from api.utils.report_index import index_report
+
+        report = LynisReport(real_lynis_report).get_parsed_report()
+        index_report(test_device, report)
+        assert plan_rule(query) is not None
+
+        compliant, undecided = evaluate_rule_in_sql(query, Device.objects.all())
+        if test_device.id in undecided:
+            # contains() on a key missing from the report raises in JMESPath
+            assert 'missing_key' in query or 'loaded_kernel_module' in query
+        else:
+            assert (test_device.id in compliant) == bool(evaluate_query(report, query))
+
+    def test_truncated_text_is_left_to_python(self, test_device):
+        from api.utils.policy_planner import evaluate_rule_in_sql
+        from api.utils.report_index import index_report
+
+        index_report(test_device, {'banner': 'a' * 300 + 'needle'})
+        assert evaluate_rule_in_sql("contains(banner, 'needle')", Device.objects.all()) == (set(), {test_device.id})
+
+    @pytest.mark.parametrize('query', [
+        'days_since_audit < `7`',
+        'firewall_active',
+        'length(installed_packages_array) > `10`',
+        'a.b == `1`',
+        'contains(installed_packages, `1`)',
+        'hardening_index > os',
+        "os > 'A'",
+        'not a valid query ==',
+    ])
+    def test_unplannable_rules(self, query):
+        from api.utils.policy_planner import plan_rule
+
+        assert plan_rule(query) is None
+
+    def test_refresh_uses_sql_for_planned_rules(self, test_device, test_user, sample_lynis_report):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from api.models import PolicyRule, PolicyRuleset
+        from api.utils.compliance import refresh_device_compliance
+        from api.utils.report_index import index_report
+
+        FullReport.objects.create(device=test_device, full_report=sample_lynis_report)
+        index_report(test_device, LynisReport(sample_lynis_report).get_parsed_report())
+        rule = PolicyRule.objects.create(name='Hardened', description='', rule_query='hardening_index > `60`', created_by=test_user)
+        ruleset = PolicyRuleset.objects.create(name='Baseline', description='', created_by=test_user)
+        ruleset.rules.add(rule)
+        test_device.rulesets.add(ruleset)
+        Device.objects.filter(id=test_device.id).update(compliant=False)
+
+        with CaptureQueriesContext(connection) as queries:
+            assert refresh_device_compliance(Device.objects.filter(id=test_device.id)) == 1
+        assert not any('api_fullreport' in query['sql'] for query in queries.captured_queries)
+        test_device.refresh_from_db()
+        assert test_device.compliant is True
+
+        # A rule that cannot be planned falls back to parsing the report
+        rule.rule_query = 'days_since_audit < `-1`'
+        rule.save()
+        assert refresh_device_compliance(Device.objects.filter(id=test_device.id)) == 1
+        test_device.refresh_from_db()
+        assert test_device.compliant is False
+
+
+@pytest.mark.django_db
+class TestIncrementalCompliance:
+    """Tests for re-evaluating only the rules affected by a new report."""
+
+    @pytest.mark.parametrize('query, fields', [
+        ('hardening_index > `70`', {'hardening_index'}),
+        ("os == 'Linux' && !contains(loaded_kernel_module, 'usb_storage')", {'os', 'loaded_kernel_module'}),
+        ("length(installed_packages_array[?contains(@, 'openssl')]) > `0`", {'installed_packages_array'}),
+        ('sort_by(real_user, &name)[0].uid', {'real_user'}),
+        ('keys(@)', None),
+        ('*.value', None),
+        ('not a query ==', None),
+    ])
+    def test_query_fields(self, query, fields):
+        from api.utils.policy_query import query_fields
+
+        assert query_fields(query) == (frozenset(fields) if fields is not None else None)
+
+    def test_only_affected_rules_are_evaluated(self, test_device, test_user):
+        from api.models import PolicyRule, PolicyRuleset, RuleEvaluation
+        from api.utils.compliance import evaluate_device_compliance
+
+        ruleset = PolicyRuleset.objects.create(name='Baseline', description='', created_by=test_user)
+        hardened = PolicyRule.objects.create(name='Hardened', description='', rule_query='hardening_index > `60`')
+        linux = PolicyRule.objects.create(name='Linux', description='', rule_query="os == 'Linux'")
+        recent = PolicyRule.objects.create(name='Recent', description='', rule_query='days_since_audit < `7`')
+        ruleset.rules.add(hardened, linux, recent)
+        test_device.rulesets.add(ruleset)
+        report = {'hardening_index': 65, 'os': 'Linux', 'days_since_audit': 1}
+
+        assert evaluate_device_compliance(test_device, report) == (True, 3, 0)
+
+        # os is not re-read: its stored result is carried forward
+        report['os'] = 'FreeBSD'
+        report['hardening_index'] = 50
+        assert evaluate_device_compliance(test_device, report, changed_keys={'hardening_index'}) == (False, 2, 1)
+        assert RuleEvaluation.objects.get(device=test_device, rule=linux).compliant is True
+        assert RuleEvaluation.objects.get(device=test_device, rule=hardened).compliant is False
+
+        # Editing a rule invalidates its stored result
+        linux.rule_query = "os == 'FreeBSD'"
+        linux.save()
+        assert evaluate_device_compliance(test_device, report, changed_keys=set()) == (False, 2, 1)
+        assert RuleEvaluation.objects.get(device=test_device, rule=linux).compliant is True
+
+    def test_ingest_counts_skipped_evaluations(self, client, test_license_key, test_user, sample_lynis_report, sample_lynis_report_updated):
+        from api.models import PolicyRule, PolicyRuleset
+
+        def upload(data):
+            response = client.post('/api/lynis/upload/', {
+                'licensekey': test_license_key.licensekey,
+                'hostid': 'incremental-host',
+                'hostid2': 'incremental-host2',
+                'data': data,
+            })
+            assert response.status_code == 200
+            return Device.objects.get(hostid='incremental-host')
+
+        device = upload(sample_lynis_report)
+        ruleset = PolicyRuleset.objects.create(name='Baseline', description='', created_by=test_user)
+        ruleset.rules.add(PolicyRule.objects.create(name='Linux', description='', rule_query="os == 'Linux'"))
+        device.rulesets.add(ruleset)
+
+        upload(sample_lynis_report_updated)
+        device = upload(sample_lynis_report_updated.replace('hardening_index=70', 'hardening_index=72'))
+        assert device.compliant is True
+        assert device.rules_skipped >= 1
+        assert device.rules_evaluated >= 1
+
+        # The policies page reads the fleet totals kept next to the dashboard counters
+        from io import StringIO
+        from django.core.management import call_command
+        from api.utils.fleet_dashboard import evaluation_counts
+
+        assert evaluation_counts() == (device.rules_evaluated, device.rules_skipped)
+        call_command('rebuild_dashboard', stdout=StringIO())
+        assert evaluation_counts() == (device.rules_evaluated, device.rules_skipped)
+
+
+@pytest.mark.django_db
+class TestRefreshCompliance:
+    """Tests for the daily refresh of rules that depend on the time."""
+
+    def test_device_that_stopped_reporting_becomes_non_compliant(self, client, test_device, test_user, monkeypatch):
+        from io import StringIO
+        from django.core.management import call_command
+        from django.urls import reverse
+        from api.models import PolicyRule, PolicyRuleset
+        from api.utils.compliance import refresh_device_compliance
+
+        ruleset = PolicyRuleset.objects.create(name='Baseline', description='', created_by=test_user)
+        ruleset.rules.add(PolicyRule.objects.create(name='Recent Audit', description='', rule_query='days_since_audit < `7`'))
+        test_device.rulesets.add(ruleset)
+        other = Device.objects.create(licensekey=test_device.licensekey, hostid='other-1', hostid2='other-2')
+        other.rulesets.add(PolicyRuleset.objects.create(name='Empty', description='', created_by=test_user))
+        now = timezone.now()
+        FullReport.objects.create(
+            device=test_device,
+            full_report=f"hostname=test-server\nreport_datetime_end={now.strftime('%Y-%m-%d %H:%M:%S')}",
+        )
+        refresh_device_compliance(Device.objects.filter(id=test_device.id))
+        assert Device.objects.get(id=test_device.id).compliant is True
+
+        monkeypatch.setattr('api.utils.lynis_report.timezone.now', lambda: now + timedelta(days=8))
+        out = StringIO()
+        call_command('refresh_compliance', stdout=out)
+
+        # Only devices with a time-dependent rule are evaluated
+        assert 'Compliance refreshed for 1 devices: 1 changed status' in out.getvalue()
+        client.force_login(test_user)
+        listed = {device.id: device.compliant for device in client.get(reverse('device_list')).context['devices']}
+        assert listed[test_device.id] is False
+
+
+@pytest.mark.django_db
+class TestRecompute:
+    """Tests for the recompute management command."""
+
+    def test_recompute_all_targets(self, test_device, test_user, real_lynis_report, tmp_path):
+        from io import StringIO
+        from django.core.management import call_command
+        from api.models import DeviceReportKey, InventoryPackage, PolicyRule, PolicyRuleset, RuleEvaluation
+
+        FullReport.objects.create(device=test_device, full_report=real_lynis_report)
+        rule = PolicyRule.objects.create(name='Linux', description='', rule_query="os == 'Linux'")
+        ruleset = PolicyRuleset.objects.create(name='Baseline', description='', created_by=test_user)
+        ruleset.rules.add(rule)
+        test_device.rulesets.add(ruleset)
+        Device.objects.filter(id=test_device.id).update(compliant=False)
+        checkpoint = tmp_path / 'checkpoint.json'
+
+        out = StringIO()
+        call_command('recompute', workers=0, checkpoint=str(checkpoint), stdout=out)
+
+        test_device.refresh_from_db()
+        assert test_device.compliant is True
+        assert RuleEvaluation.objects.get(device=test_device, rule=rule).compliant is True
+        assert DeviceReportKey.objects.filter(device=test_device, key='os', value_text='Linux').exists()
+        assert test_device.report_index_updated_at is not None
+        assert InventoryPackage.objects.filter(device=test_device).count() == 184
+        assert 'compliance changed for 1' in out.getvalue()
+        assert not checkpoint.exists()
+
+    def test_recompute_resumes_from_checkpoint(self, test_license_key, sample_lynis_report, tmp_path):
+        from io import StringIO
+        from django.core.management import call_command
+        from api.models import DeviceReportKey
+        from api.utils.recompute import Checkpoint
+
+        devices = [
+            Device.objects.create(licensekey=test_license_key, hostid=f'host-{i}', hostid2=f'host2-{i}')
+            for i in range(4)
+        ]
+        for device in devices:
+            FullReport.objects.create(device=device, full_report=sample_lynis_report)
+        # A previous run finished the chunk of the first two devices
+        checkpoint = Checkpoint(str(tmp_path / 'checkpoint.json'), ['index'])
+        checkpoint.mark_done([devices[0].id, devices[1].id])
+
+        out = StringIO()
+        call_command('recompute', target=['index'], workers=0, chunk_size=1, checkpoint=checkpoint.path, stdout=out)
+
+        assert 'Resuming' in out.getvalue()
+        assert set(DeviceReportKey.objects.values_list('device_id', flat=True)) == {devices[2].id, devices[3].id}
+
+    def test_partial_run_does_not_skip_devices_of_full_run(self, test_license_key, sample_lynis_report, tmp_path):
+        from io import StringIO
+        from django.core.management import call_command
+        from api.models import DeviceReportKey
+        from api.utils.recompute import Checkpoint
+
+        devices = [
+            Device.objects.create(licensekey=test_license_key, hostid=f'host-{i}', hostid2=f'host2-{i}')
+            for i in range(3)
+        ]
+        for device in devices:
+            FullReport.objects.create(device=device, full_report=sample_lynis_report)
+        path = str(tmp_path / 'checkpoint.json')
+        # A checkpoint written by a --device run before they were excluded: its range spans devices[1]
+        with open(path, 'w') as checkpoint_file:
+            checkpoint_file.write(f'{{"targets": ["index"], "done": [[{devices[0].id}, {devices[2].id}]]}}')
+
+        call_command('recompute', target=['index'], device=[devices[0].id, devices[2].id], workers=0, checkpoint=path, stdout=StringIO())
+        assert set(DeviceReportKey.objects.values_list('device_id', flat=True)) == {devices[0].id, devices[2].id}
+
+        DeviceReportKey.objects.all().delete()
+        out = StringIO()
+        call_command('recompute', target=['index'], workers=0, chunk_size=1, checkpoint=path, stdout=out)
+
+        assert 'Resuming' not in out.getvalue()
+        assert set(DeviceReportKey.objects.values_list('device_id', flat=True)) == {device.id for device in devices}
+        assert not Checkpoint(path, ['index']).load()
+
+
+@pytest.mark.django_db
+class TestRuleCostGuards:
+    """Tests for static query cost analysis and runtime rule guards."""
+
+    @pytest.fixture(autouse=True)
+    def reset_guard(self):
+        from api.utils.rule_guard import guard
+        guard.reset()
+        yield
+        guard.reset()
+
+    def test_analyze_query(self):
+        from api.utils.policy_query import analyze_query
+
+        assert analyze_query('hardening_index > `70`') == {'projections': 0, 'filter_depth': 0, 'warnings': []}
+        cost = analyze_query("length(installed_packages_array[?contains(@, 'openssl')]) > `0`")
+        assert cost['projections'] == 1
+        assert cost['filter_depth'] == 1
+        assert cost['warnings'] == ['Filters every item of installed_packages_array']
+        assert analyze_query('a[?b[?c[?d]]]')['filter_depth'] == 3
+        assert analyze_query('sort_by(real_user, &@)[0]')['warnings'] == ['sort_by() walks every item of real_user']
+
+    def test_circuit_breaker_skips_slow_rule(self, settings, test_device, test_user):
+        from api.models import PolicyRule, PolicyRuleset
+        from api.utils.compliance import check_device_compliance
+        from api.utils.rule_guard import SKIPPED, evaluate_rule
+
+        settings.POLICY_RULE_BREAKER_MS = 0  # every evaluation counts as slow
+        settings.POLICY_RULE_BREAKER_THRESHOLD = 2
+        rule = PolicyRule.objects.create(name='Hardened', description='', rule_query='hardening_index > `90`')
+        report = {'hardening_index': 65}
+
+        assert evaluate_rule(rule, report) is False
+        assert evaluate_rule(rule, report) is False
+        assert evaluate_rule(rule, report) is SKIPPED
+
+        # A skipped rule does not make the device non-compliant
+        ruleset = PolicyRuleset.objects.create(name='Baseline', description='', created_by=test_user)
+        ruleset.rules.add(rule)
+        test_device.rulesets.add(ruleset)
+        compliant, rulesets = check_device_compliance(test_device, report)
+        assert compliant is True
+        assert rulesets[0]['rules'][0]['skipped'] is True
+
+        # Editing the query starts from a clean state
+        rule.rule_query = 'hardening_index > `60`'
+        assert evaluate_rule(rule, report) is True
+
+    def test_slow_rules_are_flagged(self, settings):
+        from api.models import PolicyRule
+        from api.utils.rule_guard import MIN_SAMPLES, evaluate_rule
+
+        settings.POLICY_RULE_SLOW_MS = 0
+        settings.POLICY_RULE_BREAKER_THRESHOLD = 0
+        rule = PolicyRule.objects.create(name='Packages', description='', rule_query='length(installed_packages_array) > `1`')
+        for _ in range(MIN_SAMPLES):
+            evaluate_rule(rule, {'installed_packages_array': ['a', 'b']})
+
+        rule.refresh_from_db()
+        assert rule.slow_since is not None
+
+        settings.POLICY_RULE_SLOW_MS = 10000
+        for _ in range(MIN_SAMPLES):
+            evaluate_rule(rule, {'installed_packages_array': ['a', 'b']})
+        rule.refresh_from_db()
+        assert rule.slow_since is None
+
+
+@pytest.mark.django_db
+class TestRuleStats:
+    """Tests for per-rule evaluation statistics."""
+
+    @pytest.fixture(autouse=True)
+    def reset_collector(self):
+        from api.utils.rule_guard import guard
+        from api.utils.rule_stats import collector
+        guard.reset()
+        collector.reset()
+        yield
+        collector.reset()
+
+    def test_histogram_percentile(self):
+        from api.utils.rule_stats import HISTOGRAM_BOUNDS_MS, histogram_percentile
+
+        histogram = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        assert histogram_percentile(histogram, 0, 0.95) is None
+        histogram[0] = 95  # <= 0.1ms
+        histogram[6] = 5   # <= 10ms
+        assert histogram_percentile(histogram, 8, 0.95) == 0.1
+        histogram[0] = 94
+        assert histogram_percentile(histogram, 8, 0.95) == 10
+        # The last bucket reports the maximum
+        histogram[-1] = 100
+        assert histogram_percentile(histogram, 4000, 0.95) == 4000
+
+    def test_evaluations_are_aggregated_per_day(self, settings):
+        from api.models import PolicyRule, RuleEvaluationStats
+        from api.utils.rule_guard import evaluate_rule
+        from api.utils.rule_stats import collector, rule_stats
+
+        settings.POLICY_RULE_BREAKER_THRESHOLD = 0
+        rule = PolicyRule.objects.create(name='Hardened', description='', rule_query='hardening_index > `70`')
+        broken = PolicyRule.objects.create(name='Broken', description='', rule_query="abs(os) > `1`")
+        report = {'hardening_index': 75, 'os': 'Linux'}
+
+        for _ in range(3):
+            evaluate_rule(rule, report)
+        evaluate_rule(broken, report)
+        deleted = PolicyRule.objects.create(name='Deleted', description='', rule_query='os')
+        evaluate_rule(deleted, report)
+        deleted.delete()
+        assert collector.flush() == 2
+
+        # A second flush is merged into the same row
+        evaluate_rule(rule, report)
+        collector.flush()
+        row = RuleEvaluationStats.objects.get(rule=rule)
+        assert row.evaluations == 4
+        assert sum(row.histogram) == 4
+        assert RuleEvaluationStats.objects.count() == 2
+
+        stats = rule_stats()
+        assert stats[rule.id]['evaluations'] == 4
+        assert stats[rule.id]['errors'] == 0
+        assert stats[rule.id]['p95_ms'] is not None
+        assert stats[broken.id]['error_rate'] == 100
+        assert stats[broken.id]['last_failure_at'] is not None
+
+    def test_expired_days_are_deleted(self, settings):
+        from datetime import timedelta
+        from django.utils import timezone
+        from api.models import PolicyRule, RuleEvaluationStats
+        from api.utils.rule_stats import collector, rule_stats
+
+        settings.POLICY_RULE_STATS_DAYS = 7
+        rule = PolicyRule.objects.create(name='Hardened', description='', rule_query='hardening_index > `70`')
+        RuleEvaluationStats.objects.create(rule=rule, day=timezone.localdate() - timedelta(days=7), evaluations=10)
+        RuleEvaluationStats.objects.create(rule=rule, day=timezone.localdate() - timedelta(days=6), evaluations=5)
+        assert rule_stats()[rule.id]['evaluations'] == 5
+
+        collector.record(rule.id, 0.001, failed=False)
+        collector.flush()
+        assert sorted(RuleEvaluationStats.objects.values_list('evaluations', flat=True)) == [1, 5]
+
+
+
+@pytest.mark.django_db
+class TestImpactPreview:
+    """Tests for the fleet-wide impact preview of draft rule queries."""
+
+    def test_preview_counts_devices(self, test_device, test_user, test_license_key, sample_lynis_report, sample_lynis_report_updated):
+        from api.models import PolicyRule, PolicyRuleset, RuleImpactPreview
+        from api.utils.impact_preview import start_preview
+        from api.utils.report_index import index_report
+
+        # test_device: hardening_index 65, parsed from its report
+        FullReport.objects.create(device=test_device, full_report=sample_lynis_report)
+        # Indexed device decided in SQL
+        indexed = Device.objects.create(licensekey=test_license_key, hostid='indexed', hostid2='indexed-2', hostname='indexed-host')
+        FullReport.objects.create(device=indexed, full_report=sample_lynis_report_updated)
+        index_report(indexed, LynisReport(sample_lynis_report_updated).get_parsed_report())
+        Device.objects.create(licensekey=test_license_key, hostid='no-report', hostid2='no-report-2', hostname='no-report-host')
+
+        rule = PolicyRule.objects.create(name='Hardened', description='', rule_query='hardening_index > `60`')
+        ruleset = PolicyRuleset.objects.create(name='Baseline', description='', created_by=test_user)
+        ruleset.rules.add(rule)
+        test_device.rulesets.add(ruleset)
+
+        updated_index = LynisReport(sample_lynis_report_updated).get_parsed_report()['hardening_index']
+        preview = start_preview('hardening_index > `66`', test_user, rule=rule)
+        preview = RuleImpactPreview.objects.get(id=preview.id)
+
+        assert preview.status == 'done'
+        assert preview.total == preview.processed == 3
+        result = preview.result
+        assert result['no_report'] == 1
+        assert result['decided_in_sql'] == 1
+        assert result['passed'] == (1 if updated_index > 66 else 0)
+        assert result['passed'] + result['failed'] == 2
+        assert test_device.id in [device['id'] for device in result['failing_samples']]
+        # Only test_device uses the rule: it passes `60` and fails `66`
+        assert result['assigned'] == 1
+        assert result['newly_failing'] == 1
+        assert result['newly_passing'] == 0
+
+    def test_preview_reads_cached_parsed_reports(self, test_device, test_user, sample_lynis_report):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from api.models import RuleImpactPreview
+        from api.utils.impact_preview import start_preview
+
+        FullReport.objects.create(device=test_device, full_report=sample_lynis_report)
+        start_preview('length(keys(@)) > `1`', test_user)
+
+        with CaptureQueriesContext(connection) as queries:
+            preview = start_preview('length(keys(@)) > `1`', test_user)
+        # The report parsed by the first preview is not read again
+        assert not any('"api_fullreport"."full_report"' in query['sql'] for query in queries.captured_queries)
+        assert RuleImpactPreview.objects.get(id=preview.id).result['passed'] == 1
+
+    def test_invalid_query_fails_preview(self, test_device, test_user, sample_lynis_report):
+        from api.models import RuleImpactPreview
+        from api.utils.impact_preview import start_preview
+
+        FullReport.objects.create(device=test_device, full_report=sample_lynis_report)
+        preview = start_preview('abs(os) > `1`', test_user)
+        preview = RuleImpactPreview.objects.get(id=preview.id)
+        # Evaluation errors are counted, they do not fail the preview
+        assert preview.status == 'done'
+        assert preview.result['errors'] == 1
+
+
+@pytest.mark.django_db
+class TestComplianceHistory:
+    """Tests for compliance snapshots and the daily fleet trend."""
+
+    def upload(self, client, license_key, hostid, data):
+        response = client.post('/api/lynis/upload/', {
+            'licensekey': license_key.licensekey,
+            'hostid': hostid,
+            'hostid2': f'{hostid}-2',
+            'data': data,
+        })
+        assert response.status_code == 200
+        return Device.objects.get(hostid=hostid)
+
+    def test_pack_ids(self):
+        from api.utils.compliance_history import pack_ids, unpack_ids
+
+        assert pack_ids([]) == b''
+        assert unpack_ids(pack_ids({1, 8, 300})) == {1, 8, 300}
+        assert len(pack_ids({1, 8, 300})) == 38
+
+    def test_ruleset_without_stored_results_is_not_passed(self, test_device, test_user):
+        from api.models import PolicyRule, PolicyRuleset, RuleEvaluation
+        from api.utils.compliance_history import record_snapshot, unpack_ids
+
+        evaluated = PolicyRuleset.objects.create(name='Evaluated', description='', created_by=test_user)
+        rule = PolicyRule.objects.create(name='Linux', description='', rule_query="os == 'Linux'")
+        evaluated.rules.add(rule)
+        # Assigned after the last evaluation: none of its rules has a result yet
+        pending = PolicyRuleset.objects.create(name='Pending', description='', created_by=test_user)
+        pending.rules.add(PolicyRule.objects.create(name='Hardened', description='', rule_query='hardening_index > `60`'))
+        test_device.rulesets.add(evaluated, pending)
+        RuleEvaluation.objects.create(device=test_device, rule=rule, compliant=True, evaluated_at=timezone.now())
+
+        snapshot = record_snapshot(test_device)
+
+        assert unpack_ids(snapshot.rulesets_assigned) == {evaluated.id, pending.id}
+        assert unpack_ids(snapshot.rulesets_passed) == {evaluated.id}
+
+    def test_ingest_appends_snapshots_and_updates_trend(self, client, test_license_key, test_user, sample_lynis_report, sample_lynis_report_updated):
+        from api.models import ComplianceSnapshot, ComplianceTrend, PolicyRule, PolicyRuleset
+        from api.utils.compliance_history import device_history, fleet_trend
+
+        device = self.upload(client, test_license_key, 'history-a', sample_lynis_report)
+        ruleset = PolicyRuleset.objects.create(name='Hardened', description='', created_by=test_user)
+        ruleset.rules.add(PolicyRule.objects.create(name='Hardened', description='', rule_query='hardening_index > `66`'))
+        device.rulesets.add(ruleset)
+
+        # Second report of the same day replaces the device's values in the trend
+        device = self.upload(client, test_license_key, 'history-a', sample_lynis_report_updated)
+        self.upload(client, test_license_key, 'history-b', sample_lynis_report)
+
+        assert ComplianceSnapshot.objects.filter(device=device).count() == 2
+        history = device_history(device)
+        assert [snapshot['hardening_index'] for snapshot in history] == [65, 70]
+        assert history[1]['warnings'] == 3
+        assert history[1]['rulesets_assigned'] == history[1]['rulesets_passed'] == [ruleset.id]
+
+        row = ComplianceTrend.objects.get()
+        assert row.devices == 2
+        assert row.compliant == 2
+        assert row.hardening_index_sum == 135
+        assert row.warnings_sum == 8
+        assert fleet_trend() == [{
+            'day': row.day,
+            'devices': 2,
+            'compliant_percent': 100.0,
+            'average_hardening_index': 67.5,
+        }]
+
+
+@pytest.mark.django_db
+class TestFleetExport:
+    """Tests for the chunked fleet export rows."""
+
+    def test_rows_span_chunks_and_decode_list_keys(self, test_license_key, django_assert_max_num_queries):
+        from api.utils.fleet_export import iter_rows
+        from api.utils.report_index import index_report
+        for i in range(5):
+            device = Device.objects.create(licensekey=test_license_key, hostid=f'chunk-{i}', hostid2=f'chunk-{i}')
+            index_report(device, {'hardening_index': 60 + i, 'installed_packages_array': [f'pkg-{i}', 'openssl']})
+
+        columns = ['hostid', 'report.hardening_index', 'report.installed_packages_array', 'report.missing']
+        with django_assert_max_num_queries(7):
+            rows = list(iter_rows(Device.objects.all(), columns, chunk_size=2))
+
+        assert [row['hostid'] for row in rows] == [f'chunk-{i}' for i in range(5)]
+        assert rows[4]['report.hardening_index'] == 64
+        assert rows[4]['report.installed_packages_array'] == ['pkg-4', 'openssl']
+        assert rows[0]['report.missing'] is None
+
+
+@pytest.mark.django_db
+class TestReadApi:
+    """Tests for the read-only v1 API."""
+
+    def _client(self, user):
+        from api.read_api import create_token
+        _, key = create_token(user, 'sync')
+        return Client(HTTP_AUTHORIZATION=f'Bearer {key}')
+
+    def test_requires_token(self, test_device):
+        response = Client(HTTP_AUTHORIZATION='Bearer wrong').get(reverse('api_v1:device_list'))
+        assert response.status_code == 401
+        assert Client().get(reverse('api_v1:device_list')).status_code == 401
+
+    def test_token_is_stored_hashed_and_touched(self, test_user):
+        from api.models import ApiToken
+        from api.read_api import create_token, hash_token
+        token, key = create_token(test_user, 'sync')
+        assert token.key_hash == hash_token(key) != key
+        assert token.last_used_at is None
+
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {key}')
+        assert client.get(reverse('api_v1:rule_list')).status_code == 200
+        token.refresh_from_db()
+        assert token.last_used_at is not None
+
+        ApiToken.objects.filter(id=token.id).update(is_active=False)
+        assert client.get(reverse('api_v1:rule_list')).status_code == 401
+
+    def test_pages_follow_cursor_with_fixed_queries(self, test_user, test_license_key, django_assert_num_queries):
+        from api.models import PolicyRuleset
+        from api.utils.profiling import get_sampling_config
+        ruleset = PolicyRuleset.objects.create(name='Base', description='')
+        for i in range(5):
+            device = Device.objects.create(licensekey=test_license_key, hostid=f'api-{i}', hostid2=f'api-{i}')
+            device.rulesets.add(ruleset)
+        client = self._client(test_user)
+        # The profiling configuration is read once per process every few seconds, not per request
+        get_sampling_config()
+
+        hostids, cursor = [], None
+        for _ in range(3):
+            params = {'limit': 2, **({'cursor': cursor} if cursor else {})}
+            # Token lookup, token touch, rows, rulesets
+            with django_assert_num_queries(4):
+                data = client.get(reverse('api_v1:device_list'), params).json()
+            hostids += [device['hostid'] for device in data['results']]
+            cursor = data['next_cursor']
+        assert hostids == [f'api-{i}' for i in range(5)]
+        assert data['has_more'] is False
+        assert data['results'][0]['rulesets'] == [ruleset.id]
+
+        # Resuming from the last cursor returns only devices updated since
+        Device.objects.filter(hostid='api-1').update(updated_at=timezone.now() + timedelta(seconds=1))
+        data = client.get(reverse('api_v1:device_list'), {'cursor': cursor}).json()
+        assert [device['hostid'] for device in data['results']] == ['api-1']
+
+    def test_fields_and_filters(self, test_user, test_device):
+        client = self._client(test_user)
+        url = reverse('api_v1:device_list')
+        data = client.get(url, {'fields': 'hostname,compliant'}).json()
+        assert set(data['results'][0]) == {'id', 'hostname', 'compliant'}
+
+        since = (timezone.now() + timedelta(hours=1)).isoformat()
+        assert client.get(url, {'updated_since': since}).json()['results'] == []
+        assert client.get(url, {'hostid': 'test-host-id-1'}).json()['results'][0]['id'] == test_device.id
+
+        assert client.get(url, {'fields': 'secret'}).status_code == 400
+        assert client.get(url, {'limit': 5000}).status_code == 400
+        assert client.get(url, {'cursor': 'garbage'}).status_code == 400
+        assert client.get(url, {'updated_since': 'yesterday'}).status_code == 400
+
+    def test_device_detail_and_activity(self, test_user, test_device):
+        client = self._client(test_user)
+        response = client.get(reverse('api_v1:device_detail', args=[test_device.id]))
+        assert response.json()['hostid'] == 'test-host-id-1'
+        assert client.get(reverse('api_v1:device_detail', args=[test_device.id + 100])).status_code == 404
+
+        DiffReport.objects.create(device=test_device, diff_report={'added': {'ssh_daemon': ['1']}, 'changed': [{'os': ['a', 'b']}]})
+        result = client.get(reverse('api_v1:activity_list')).json()['results'][0]
+        assert result['device'] == test_device.id
+        assert result['changes']['added'] == {'ssh_daemon': 1}
+        assert result['changes']['changed'] == ['os']
+
+    def test_compliance_follows_rule_edits_and_assignments(self, test_user, test_device, sample_lynis_report):
+        from api.models import PolicyRule, PolicyRuleset
+        from api.utils.compliance import refresh_device_compliance
+        from api.utils.report_index import index_report
+
+        FullReport.objects.create(device=test_device, full_report=sample_lynis_report)
+        index_report(test_device, LynisReport(sample_lynis_report).get_parsed_report())
+        rule = PolicyRule.objects.create(name='Hardened', description='', rule_query='hardening_index > `90`', created_by=test_user)
+        ruleset = PolicyRuleset.objects.create(name='Baseline', description='', created_by=test_user)
+        ruleset.rules.add(rule)
+        test_device.rulesets.add(ruleset)
+        refresh_device_compliance(Device.objects.filter(id=test_device.id))
+        client = self._client(test_user)
+        url = reverse('api_v1:compliance_list')
+
+        def results():
+            return {row['rule_name']: row['compliant'] for row in client.get(url, {'device': test_device.id}).json()['results']}
+
+        assert results() == {'Hardened': False}
+
+        editor = Client()
+        editor.force_login(test_user)
+        response = editor.post(reverse('rule_update', kwargs={'rule_id': rule.id}), {
+            'name': 'Hardened', 'description': 'Hardening index above 60', 'rule_query': 'hardening_index > `60`', 'enabled': 'on',
+        })
+        assert response.status_code == 302
+        assert results() == {'Hardened': True}
+
+        # A newly assigned rule evaluated against the report, not in SQL
+        other = PolicyRuleset.objects.create(name='Other', description='', created_by=test_user)
+        other.rules.add(PolicyRule.objects.create(name='Any key', description='', rule_query='length(keys(@)) > `1000`'))
+        test_device.rulesets.add(other)
+        refresh_device_compliance(Device.objects.filter(id=test_device.id))
+        assert results() == {'Hardened': True, 'Any key': False}
+        assert Device.objects.get(id=test_device.id).compliant is False
+
+    def test_read_only(self, test_user):
+        client = self._client(test_user)
+        assert client.post(reverse('api_v1:device_list')).status_code == 405
+
+
+@pytest.mark.django_db
+class TestDisplayModel:
+    """Tests for the cached display model of report diffs."""
+
+    def test_diff_display_classifies_values_once(self, test_device, django_assert_num_queries):
+        from api.utils.display_model import diff_displays
+        diff = DiffReport.objects.create(device=test_device, diff_report={
+            'added': {'network_listen_port': ['0.0.0.0:22|sshd|']},
+            'removed': {'vulnerable_packages_found': '0'},
+            'changed': [
+                {'hardening_index': {'old': '65', 'new': '70.5'}},
+                {'installed_packages_array': {'old': ['curl', 'vim'], 'new': ['curl', 'openssl']}},
+            ],
+        })
+
+        with django_assert_num_queries(1):
+            entries = diff_displays([diff.id])[diff.id]
+        added, removed, number, packages = entries
+        assert added['value'] == '0.0.0.0:22|sshd|' and added['technical'] is True
+        assert removed['type'] == 'removed' and removed['technical'] is False
+        assert (number['direction'], number['delta']) == ('up', '+5.5')
+        assert packages['array_added'] == [{'text': 'openssl', 'technical': False}]
+        assert packages['array_removed'] == [{'text': 'vim', 'technical': False}]
+
+        # Cached: the diff is not read again
+        with django_assert_num_queries(0):
+            assert diff_displays([diff.id])[diff.id] == entries
+
+    def test_list_items_show_their_test_id(self, test_device):
+        from api.utils.display_model import diff_displays
+        old = 'warning[]=SSH-7408|Weak SSH configuration|-|-|\nsuggestion[]=PKGS-7392|Update packages|-|-|\n'
+        new = 'warning[]=FIRE-4512|No firewall|-|-|\nsuggestion[]=PKGS-7392|Update packages|-|-|\nsuggestion[]=AUTH-9286|Password aging|-|-|\n'
+        diff = DiffReport.objects.create(device=test_device, diff_report=LynisReport(old).compare_reports(new, []))
+
+        entries = {entry['key']: entry for entry in diff_displays([diff.id])[diff.id]}
+        assert entries['warning']['array_added'] == [{'text': 'FIRE-4512', 'technical': False}]
+        assert entries['warning']['array_removed'] == [{'text': 'SSH-7408', 'technical': False}]
+        assert entries['suggestion']['array_added'] == [{'text': 'AUTH-9286', 'technical': False}]
+        assert entries['suggestion']['array_removed'] == []
+
+
+@pytest.mark.django_db
+class TestFleetDashboard:
+    """Tests for the fleet dashboard counters maintained at ingest."""
+
+    def upload(self, client, license_key, hostid, data):
+        response = client.post('/api/lynis/upload/', {
+            'licensekey': license_key.licensekey,
+            'hostid': hostid,
+            'hostid2': f'{hostid}-2',
+            'data': data,
+        })
+        assert response.status_code == 200
+        return Device.objects.get(hostid=hostid)
+
+    def counters(self):
+        from api.models import FleetAggregate
+
+        return {
+            (metric, bucket): devices
+            for metric, bucket, devices in FleetAggregate.objects.filter(devices__gt=0).values_list('metric', 'bucket', 'devices')
+        }
+
+    def test_counters_follow_ingest_and_deletion(self, client, test_license_key, sample_lynis_report, sample_lynis_report_updated):
+        from io import StringIO
+        from django.core.management import call_command
+        from api.utils.fleet_dashboard import fleet_dashboard
+
+        ssh_warning = 'warning[]=SSH-7408|Weak SSH configuration|-|-|\n'
+        self.upload(client, test_license_key, 'dash-a', sample_lynis_report + ssh_warning + 'warning[]=FIRE-4512|No firewall|-|-|\n')
+        other = self.upload(client, test_license_key, 'dash-b', sample_lynis_report)
+        # The second report of dash-a leaves the FIRE-4512 warning, the 60-69 bucket and Lynis 3.0.0
+        device = self.upload(client, test_license_key, 'dash-a', sample_lynis_report_updated + ssh_warning)
+
+        assert ['warning', 'SSH-7408'] in device.dashboard_buckets
+        dashboard = fleet_dashboard()
+        assert dashboard['devices'] == 2
+        assert dashboard['compliant_percent'] == 100.0
+        assert [row['devices'] for row in dashboard['hardening_index']][6:8] == [1, 1]
+        assert dashboard['distros'] == [('Ubuntu', 2)]
+        assert dashboard['lynis_versions'] == [
+            {'version': '3.0.1', 'devices': 1, 'outdated': False},
+            {'version': '3.0.0', 'devices': 1, 'outdated': True},
+        ]
+        assert dashboard['outdated_lynis'] == 1
+        assert dashboard['top_warnings'] == [('SSH-7408', 1)]
+        # The sample reports date from 2024
+        assert dashboard['stale'] == 2
+
+        counters = self.counters()
+        call_command('rebuild_dashboard', stdout=StringIO())
+        assert self.counters() == counters
+
+        other.delete()
+        dashboard = fleet_dashboard()
+        assert dashboard['devices'] == 1
+        assert dashboard['lynis_versions'] == [{'version': '3.0.1', 'devices': 1, 'outdated': False}]
+        assert dashboard['outdated_lynis'] == 0
+
+    def test_compliance_refresh_updates_counters(self, client, test_license_key, test_user, sample_lynis_report):
+        from api.models import PolicyRule, PolicyRuleset
+        from api.utils.compliance import refresh_device_compliance
+        from api.utils.fleet_dashboard import fleet_dashboard
+
+        device = self.upload(client, test_license_key, 'dash-c', sample_lynis_report)
+        ruleset = PolicyRuleset.objects.create(name='Hardened', description='', created_by=test_user)
+        ruleset.rules.add(PolicyRule.objects.create(name='Hardened', description='', rule_query='hardening_index > `80`'))
+        device.rulesets.add(ruleset)
+
+        assert refresh_device_compliance(Device.objects.filter(id=device.id)) == 1
+        dashboard = fleet_dashboard()
+        assert (dashboard['devices'], dashboard['compliant']) == (1, 0)
+        assert ['compliance', 'non_compliant'] in Device.objects.get(id=device.id).dashboard_buckets
@@ -0,0 +1,79 @@
+import json
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from api.models import PolicyRuleset
+from api.utils.benchmarks import baseline_results, build_fixtures, find_regressions, load_history, measure, save_run
+from api.utils.lynis_report import LynisReport
+
+
+class TestBenchmarkUtils:
+    def test_fixtures_grow_in_size(self):
+        fixtures = build_fixtures()
+        sizes = {name: len(LynisReport(raw).get('installed_packages_array') or []) for name, raw in fixtures.items()}
+        assert sizes['small'] == 0
+        assert 0 < sizes['typical'] < sizes['huge']
+
+    def test_measure_returns_time_per_call(self):
+        assert measure(lambda: None, repeat=2, min_time=0.001) > 0
+
+    def test_find_regressions_respects_tolerance(self):
+        baseline = {'a': {'ops_per_sec': 100.0}, 'b': {'ops_per_sec': 100.0}}
+        results = {
+            'a': {'ops_per_sec': 85.0},
+            'b': {'ops_per_sec': 70.0},
+            'c': {'ops_per_sec': 1.0},
+        }
+        assert find_regressions(results, baseline, 0.2) == [('b', 100.0, 70.0)]
+
+    def test_save_run_appends_to_history(self, tmp_path):
+        path = tmp_path / 'history.json'
+        save_run(path, {'a': {'ops_per_sec': 1.0, 'seconds_per_op': 1.0}}, label='first')
+        save_run(path, {'a': {'ops_per_sec': 2.0, 'seconds_per_op': 0.5}})
+        history = load_history(path)
+        assert [entry['label'] for entry in history] == ['first', '']
+        assert history[-1]['results']['a']['ops_per_sec'] == 2.0
+
+    def test_baseline_keeps_benchmarks_missing_from_filtered_runs(self):
+        history = [
+            {'results': {'a': {'ops_per_sec': 1.0}, 'b': {'ops_per_sec': 1.0}}},
+            {'results': {'a': {'ops_per_sec': 2.0}}},
+        ]
+        assert baseline_results(history) == {'a': {'ops_per_sec': 2.0}, 'b': {'ops_per_sec': 1.0}}
+
+
+@pytest.mark.django_db
+class TestBenchmarkCommand:
+    def run(self, history, *args):
+        call_command(
+            'benchmark', '--history', str(history), '--repeat', '1', '--min-time', '0.001', *args,
+        )
+
+    def test_records_run_and_rolls_back_rows(self, tmp_path):
+        history = tmp_path / 'history.json'
+        self.run(history, '--filter', 'check_device_compliance[small]')
+        results = load_history(history)[0]['results']
+        assert list(results) == ['check_device_compliance[small]']
+        assert not PolicyRuleset.objects.filter(name__startswith='benchmark-').exists()
+
+    def test_fails_on_regression(self, tmp_path):
+        history = tmp_path / 'history.json'
+        history.write_text(json.dumps([
+            {'timestamp': '', 'label': 'baseline', 'results': {'parse[small]': {'ops_per_sec': 1e12, 'seconds_per_op': 1e-12}}},
+        ]))
+        with pytest.raises(CommandError, match='regressed'):
+            self.run(history, '--filter', 'parse[small]')
+        assert len(load_history(history)) == 1
+
+    def test_filtered_run_does_not_hide_other_baselines(self, tmp_path):
+        history = tmp_path / 'history.json'
+        history.write_text(json.dumps([
+            {'timestamp': '', 'label': 'full', 'results': {'parse[small]': {'ops_per_sec': 1e12, 'seconds_per_op': 1e-12}}},
+            {'timestamp': '', 'label': 'filtered', 'results': {'diff[small]': {'ops_per_sec': 1.0, 'seconds_per_op': 1.0}}},
+        ]))
+        with pytest.raises(CommandError, match='parse\\[small\\]'):
+            self.run(history, '--filter', 'parse[small]')
+
+    def test_unknown_filter(self, tmp_path):
+        with pytest.raises(CommandError):
+            self.run(tmp_path / 'history.json', '--filter', 'does-not-exist')
@@ -1,11 +1,14 @@
 import pytest
 import logging
 from io import StringIO
-from django.test import Client, RequestFactory
+from django.test import Client, RequestFactory, override_settings
 from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
 from django.urls import reverse
-from api.middleware import AuditLoggingMiddleware
-from api.models import LicenseKey
+from api.middleware import AuditLoggingMiddleware, QueryProfilingMiddleware
+from api.models import LicenseKey, ProfilingSettings
+from api.utils.profiling import normalize_sql, get_sampling_config, set_sampling_config, SAMPLING_CACHE_KEY
 
 
 @pytest.mark.django_db
@@ -257,3 +260,91 @@ class TestAuditLoggingMiddleware:
         assert response.status_code == 200
         assert response.content == b'OK'
 
+
+@pytest.mark.django_db
+class TestQueryProfilingMiddleware:
+    """Tests for the query profiling middleware."""
+
+    def setup_method(self):
+        self.factory = RequestFactory()
+        self.log_capture = StringIO()
+        self.handler = logging.StreamHandler(self.log_capture)
+        self.performance_logger = logging.getLogger('performance')
+        self.performance_logger.addHandler(self.handler)
+        cache.delete(SAMPLING_CACHE_KEY)
+
+    def teardown_method(self):
+        self.performance_logger.removeHandler(self.handler)
+        self.handler.close()
+        cache.delete(SAMPLING_CACHE_KEY)
+
+    def _n_plus_one_view(self, request):
+        for _ in range(3):
+            list(LicenseKey.objects.filter(licensekey='missing'))
+        return HttpResponse('OK')
+
+    def test_records_query_count(self):
+        middleware = QueryProfilingMiddleware(self._n_plus_one_view)
+        request = self.factory.get('/devices/')
+
+        response = middleware(request)
+
+        assert response.status_code == 200
+        assert request.query_count == 3
+
+    @override_settings(SLOW_REQUEST_QUERY_BUDGET=2)
+    def test_logs_repeated_queries_over_budget(self):
+        middleware = QueryProfilingMiddleware(self._n_plus_one_view)
+
+        middleware(self.factory.get('/devices/'))
+
+        log_output = self.log_capture.getvalue()
+        assert 'SLOW REQUEST: GET /devices/' in log_output
+        assert 'Queries: 3' in log_output
+        assert '3x' in log_output
+        assert 'api_licensekey' in log_output
+
+    def test_fast_request_is_not_logged(self):
+        middleware = QueryProfilingMiddleware(self._n_plus_one_view)
+
+        middleware(self.factory.get('/devices/'))
+
+        assert 'SLOW REQUEST' not in self.log_capture.getvalue()
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=0)
+    def test_sampled_request_includes_profile(self, test_user):
+        test_user.is_staff = True
+        test_user.save()
+        client = Client()
+        client.force_login(test_user)
+        response = client.post(reverse('profiling_settings'), {'enabled': 'true', 'rate': '1'})
+        assert response.json()['sampling'] == {'enabled': True, 'rate': 1.0, 'path_prefix': ''}
+
+        middleware = QueryProfilingMiddleware(self._n_plus_one_view)
+        middleware(self.factory.get('/devices/'))
+
+        assert 'cumulative' in self.log_capture.getvalue()
+
+    def test_sampling_config_is_shared_between_processes(self):
+        """The configuration is stored in the database; other processes see it once their cached copy expires."""
+        set_sampling_config(True, rate=0.5, path_prefix='/devices/')
+        # Another process has no cached copy
+        cache.delete(SAMPLING_CACHE_KEY)
+
+        assert get_sampling_config() == {'enabled': True, 'rate': 0.5, 'path_prefix': '/devices/'}
+        assert ProfilingSettings.objects.count() == 1
+
+    def test_profiling_settings_requires_staff(self, test_user):
+        client = Client()
+        client.force_login(test_user)
+
+        response = client.post(reverse('profiling_settings'), {'enabled': 'true', 'rate': '1'})
+
+        assert response.status_code == 403
+        assert get_sampling_config()['enabled'] is False
+
+    def test_normalize_sql_collapses_parameters(self):
+        first = normalize_sql('SELECT * FROM t WHERE id IN (%s, %s, %s) LIMIT 21')
+        second = normalize_sql('SELECT * FROM t WHERE id IN (%s, %s)  LIMIT 5')
+
+        assert first == second
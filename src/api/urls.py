@@ -1,6 +1,6 @@
 """API v1 URLs - versioned API endpoints"""
 from django.urls import path
-from . import views
+from . import read_api, views
 
 app_name = 'api'
 
@@ -9,4 +9,10 @@ urlpatterns = [
     path('lynis/upload/', views.upload_report, name='upload_report'),
     path('lynis/license/', views.check_license, name='check_license'),
     path('lynis/enroll/', views.enroll_sh, name='enroll_sh'),
+    path('devices/', read_api.device_list, name='device_list'),
+    path('devices/<int:device_id>/', read_api.device_detail, name='device_detail'),
+    path('compliance/', read_api.compliance_list, name='compliance_list'),
+    path('rules/', read_api.rule_list, name='rule_list'),
+    path('rulesets/', read_api.ruleset_list, name='ruleset_list'),
+    path('activity/', read_api.activity_list, name='activity_list'),
 ]
@@ -0,0 +1,189 @@
+"""
+Live activity feed.
+
+New activity is read from the tables ingest already writes: report changes
+from DiffReport, with their cached display model (see
+api.utils.display_model), and DeviceEvent rows. A cursor is the pair of the
+last DiffReport and DeviceEvent ids a client has seen, e.g. ``1520-87``.
+
+Clients waiting for news do not query these tables. Each process keeps the
+ids of the newest rows (``head``), read again at most once every
+ACTIVITY_FEED_POLL_SECONDS, and at once when a diff or an event is saved in
+the same process (``notify``, see api.signals). Idle open pages cost two
+small queries per process and interval, however many there are. A thread
+waiting for news closes its database connection before each sleep, so open
+pages do not hold connections.
+"""
+import asyncio
+import fnmatch
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.db.models import Max
+
+from api.models import ActivityIgnorePattern, DeviceEvent, DiffReport, Organization
+from api.utils.display_model import diff_displays
+
+# Rows of each table read per batch; a client further behind gets the rest on its next read
+FEED_LIMIT = 100
+
+_head_lock = threading.Lock()
+_head = {'value': None, 'read_at': 0.0}
+
+
+class FeedCursorError(ValueError):
+    """Raised when a feed cursor is invalid."""
+
+
+def encode_cursor(diff_id, event_id):
+    return f'{diff_id}-{event_id}'
+
+
+def decode_cursor(value):
+    """Return the (diff id, event id) of a cursor."""
+    try:
+        diff_id, event_id = (int(part) for part in value.split('-'))
+    except ValueError:
+        raise FeedCursorError('Invalid cursor')
+    if diff_id < 0 or event_id < 0:
+        raise FeedCursorError('Invalid cursor')
+    return diff_id, event_id
+
+
+def poll_seconds():
+    return getattr(settings, 'ACTIVITY_FEED_POLL_SECONDS', 2)
+
+
+def _read_head():
+    return (
+        DiffReport.objects.aggregate(latest=Max('id'))['latest'] or 0,
+        DeviceEvent.objects.aggregate(latest=Max('id'))['latest'] or 0,
+    )
+
+
+def head(refresh=False):
+    """Return the (diff id, event id) of the newest rows, read at most once per poll interval."""
+    with _head_lock:
+        if refresh or _head['value'] is None or time.monotonic() - _head['read_at'] >= poll_seconds():
+            _head['value'] = _read_head()
+            _head['read_at'] = time.monotonic()
+        return _head['value']
+
+
+def notify():
+    """Make the next ``head`` call read the database, after a diff or an event was saved."""
+    with _head_lock:
+        _head['read_at'] = 0.0
+
+
+def release_connection():
+    """Close the database connection of this thread while it waits, unless a transaction is open."""
+    if not connection.in_atomic_block:
+        connection.close()
+
+
+def has_news(cursor):
+    latest_diff, latest_event = head()
+    return latest_diff > cursor[0] or latest_event > cursor[1]
+
+
+def silence_rules():
+    """Return the active silence rules of the default organization (single-tenant for now)."""
+    org = Organization.objects.first()
+    if org is None:
+        return []
+    return list(ActivityIgnorePattern.objects.filter(organization=org, is_active=True))
+
+
+def is_silenced(rules, key, change_type, hostname):
+    """Return True if a report change matches one of the silence ``rules``."""
+    for rule in rules:
+        # Match key pattern
+        if rule.key_pattern != '*' and not fnmatch.fnmatch(key, rule.key_pattern):
+            continue
+        # Match event type
+        if rule.event_type != 'all' and change_type != rule.event_type:
+            continue
+        # Match host pattern
+        if rule.host_pattern != '*' and hostname and not fnmatch.fnmatch(hostname, rule.host_pattern):
+            continue
+        return True
+    return False
+
+
+def read(cursor):
+    """
+    Return (entries, cursor) with the activity after ``cursor``, oldest first.
+
+    Entries are report changes (``kind`` 'change', with the fields of the
+    display model) not matching a silence rule, and device events (``kind``
+    'event'). The returned cursor is the one to read from next.
+    """
+    diff_after, event_after = cursor
+    diffs = list(
+        DiffReport.objects.select_related('device').defer('diff_report')
+        .filter(id__gt=diff_after).order_by('id')[:FEED_LIMIT]
+    )
+    events = list(DeviceEvent.objects.select_related('device').filter(id__gt=event_after).order_by('id')[:FEED_LIMIT])
+
+    entries = []
+    if diffs:
+        displays = diff_displays([diff.id for diff in diffs])
+        rules = silence_rules()
+        for diff in diffs:
+            hostname = diff.hostname or (diff.device.hostname if diff.device else None)
+            for entry in displays[diff.id]:
+                if is_silenced(rules, entry['key'], entry['type'], diff.device.hostname if diff.device else None):
+                    continue
+                entries.append({
+                    **entry,
+                    'kind': 'change',
+                    'device_id': diff.device_id,
+                    'hostname': hostname,
+                    'created_at': diff.created_at.isoformat(),
+                })
+    for event in events:
+        entries.append({
+            'kind': 'event',
+            'type': event.event_type,
+            'device_id': event.device_id,
+            'hostname': event.device.hostname if event.device else event.metadata.get('hostname'),
+            'metadata': event.metadata,
+            'created_at': event.created_at.isoformat(),
+        })
+    entries.sort(key=lambda entry: entry['created_at'])
+
+    cursor = (diffs[-1].id if diffs else diff_after, events[-1].id if events else event_after)
+    return entries, cursor
+
+
+def wait(cursor, timeout):
+    """
+    Block until there is activity after ``cursor`` or ``timeout`` seconds passed; return (entries, cursor).
+
+    With a timeout of 0 the activity is read at once, without waiting for the next check of the head.
+    """
+    if timeout <= 0:
+        return read(cursor)
+    deadline = time.monotonic() + timeout
+    while not has_news(cursor):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return [], cursor
+        release_connection()
+        time.sleep(min(poll_seconds(), remaining))
+    return read(cursor)
+
+
+async def async_wait(cursor, timeout):
+    """``wait`` for the event loop: waiting clients hold no thread."""
+    deadline = time.monotonic() + timeout
+    while not await sync_to_async(has_news)(cursor):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return [], cursor
+        await asyncio.sleep(min(poll_seconds(), remaining))
+    return await sync_to_async(read)(cursor)
@@ -0,0 +1,242 @@
+"""
+Micro-benchmarks for the report parser, the diff and policy evaluation.
+
+The fixtures are fixed so that results are comparable between runs:
+
+- small: a minimal report with a dozen keys
+- typical: the real report shipped in api/fixtures/lynis-report.dat
+- huge: the typical report with thousands of packages, listeners and details
+
+Results are throughput numbers (operations per second) and each benchmark is
+compared with its latest result stored in a JSON history file. See
+``manage.py benchmark``.
+"""
+import json
+import time
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+
+from django.db import transaction
+
+from api.utils.lynis_report import LynisReport
+from api.utils.policy_query import evaluate_query
+
+FIXTURES_DIR = Path(__file__).resolve().parent.parent / 'fixtures'
+
+SMALL_REPORT = """# Lynis Report
+report_version_major=1
+report_version_minor=0
+report_datetime_start=2024-01-01T10:00:00
+report_datetime_end=2024-01-01T10:05:00
+hostname=bench-small
+os=Linux
+os_fullname=Ubuntu
+os_version=22.04
+lynis_version=3.0.0
+kernel_version=5.15.0
+default_gateway[]=192.168.1.1
+network_ipv4_address[]=192.168.1.10
+network_ipv4_address[]=127.0.0.1
+hardening_index=65
+"""
+
+SIMPLE_RULES = {
+    'hardening_index': 'hardening_index > `60`',
+    'os_equals': "os == 'Linux'",
+    'and_or': "os == 'Linux' && (hardening_index >= `50` || warning_count == `0`)",
+}
+
+PROJECTION_RULES = {
+    'filter_packages': "length(installed_packages_array[?starts_with(@, 'lib')]) > `10`",
+    'listen_projection': "contains(network_listen[*][1], 'tcp')",
+    'nested_filter': "length(details[?[0] == 'KRNL-6000'][2]) > `0`",
+    'vulnerable_lookup': "!contains(vulnerable_package || `[]`, 'openssl')",
+}
+
+
+def _synthetic_lines(count, template):
+    return '\n'.join(template.format(i=i, a=i // 256 % 256, b=i % 256) for i in range(count))
+
+
+def build_fixtures():
+    """Return {'small': str, 'typical': str, 'huge': str} raw report fixtures."""
+    typical = (FIXTURES_DIR / 'lynis-report.dat').read_text()
+    base = '\n'.join(line for line in typical.split('\n') if not line.startswith('installed_packages_array='))
+    packages = '|'.join(f'lib-bench-{i},1.{i}.0-1ubuntu1' for i in range(5000))
+    huge = '\n'.join([
+        base,
+        f'installed_packages_array=|{packages}|',
+        _synthetic_lines(1000, 'network_listen[]=raw,ss,v1|tcp|10.{a}.{b}.1:{i}||'),
+        _synthetic_lines(2000, 'details[]=BENCH-{i}|sysctl|desc:Synthetic check {i};field:bench.{i};prefval:0;value:1;|'),
+        _synthetic_lines(1000, 'suggestion[]=BENCH-{i}|Synthetic suggestion number {i}|-|-|'),
+        _synthetic_lines(500, 'network_ipv4_address[]=10.{a}.{b}.20'),
+        _synthetic_lines(20, 'default_gateway[]=10.0.{b}.1'),
+        '',
+    ])
+    return {'small': SMALL_REPORT, 'typical': typical, 'huge': huge}
+
+
+def modified_report(raw_report):
+    """Return ``raw_report`` with a few changed, added and removed keys, as a new upload would look."""
+    lines = [line for line in raw_report.split('\n') if not line.startswith('kernel_version=')]
+    lines = [
+        'hardening_index=71' if line.startswith('hardening_index=') else line
+        for line in lines
+    ]
+    lines.append('network_listen[]=raw,ss,v1|tcp|0.0.0.0:2222||')
+    lines.append('bench_added_key=1')
+    return '\n'.join(lines)
+
+
+def measure(func, repeat=5, min_time=0.2):
+    """
+    Return the best time per call of ``func`` in seconds.
+
+    Like timeit's autorange, the number of calls per round grows until a round
+    takes at least ``min_time``; the best of ``repeat`` rounds is kept.
+    """
+    def timed(number):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        return time.perf_counter() - start
+
+    number = 1
+    elapsed = timed(number)
+    while elapsed < min_time:
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)) + 1)
+        elapsed = timed(number)
+
+    best = elapsed
+    for _ in range(repeat - 1):
+        best = min(best, timed(number))
+    return best / number
+
+
+def _compliance_benchmarks(reports):
+    """Build check_device_compliance callables against a throwaway device and ruleset."""
+    from django.contrib.auth.models import User
+    from api.models import Device, LicenseKey, PolicyRule, PolicyRuleset
+    from api.utils.compliance import check_device_compliance
+
+    user = User.objects.create(username='benchmark-user')
+    license_key = LicenseKey.objects.create(licensekey='benchmark-license', name='Benchmark', created_by=user)
+    device = Device.objects.create(licensekey=license_key, hostid='benchmark', hostid2='benchmark')
+    for name, rules in (('simple', SIMPLE_RULES), ('projection', PROJECTION_RULES)):
+        ruleset = PolicyRuleset.objects.create(name=f'benchmark-{name}', description='Benchmark')
+        ruleset.rules.set([
+            PolicyRule.objects.create(name=rule_name, rule_query=query, description='Benchmark')
+            for rule_name, query in rules.items()
+        ])
+        device.rulesets.add(ruleset)
+    device = Device.objects.prefetch_related('rulesets__rules').get(pk=device.pk)
+
+    return {
+        f'check_device_compliance[{size}]': (lambda report=report: check_device_compliance(device, report))
+        for size, report in reports.items()
+    }
+
+
+def build_benchmarks(include_compliance=True):
+    """
+    Return an ordered {name: callable} of all benchmarks.
+
+    Compliance benchmarks need database rows; they must be built inside a
+    transaction that is rolled back afterwards (see run_benchmarks).
+    """
+    fixtures = build_fixtures()
+    parsed = {size: LynisReport(raw) for size, raw in fixtures.items()}
+    modified = {size: modified_report(raw) for size, raw in fixtures.items()}
+    reports = {size: report.get_parsed_report() for size, report in parsed.items()}
+
+    benchmarks = {}
+    for size, raw in fixtures.items():
+        benchmarks[f'parse[{size}]'] = lambda raw=raw: LynisReport(raw)
+    for size, report in parsed.items():
+        benchmarks[f'compare_reports[{size}]'] = (
+            lambda report=report, new=modified[size]: report.compare_reports(new)
+        )
+    for size, report in parsed.items():
+        benchmarks[f'filtered_ipv4[{size}]'] = report._get_filtered_ipv4_addresses
+    for rule_name, query in {**SIMPLE_RULES, **PROJECTION_RULES}.items():
+        for size in ('typical', 'huge'):
+            benchmarks[f'evaluate_query[{rule_name}/{size}]'] = (
+                lambda report=reports[size], query=query: evaluate_query(report, query)
+            )
+    if include_compliance:
+        benchmarks.update(_compliance_benchmarks(reports))
+    return benchmarks
+
+
+def run_benchmarks(pattern=None, repeat=5, min_time=0.2, include_compliance=True):
+    """
+    Run the benchmarks whose name contains ``pattern`` and return
+    {name: {'seconds_per_op': float, 'ops_per_sec': float}}.
+
+    Rows created for the compliance benchmarks are rolled back.
+    """
+    results = {}
+    with transaction.atomic():
+        benchmarks = build_benchmarks(include_compliance=include_compliance)
+        for name, func in benchmarks.items():
+            if pattern and pattern not in name:
+                continue
+            seconds = measure(func, repeat=repeat, min_time=min_time)
+            results[name] = {'seconds_per_op': seconds, 'ops_per_sec': 1.0 / seconds}
+        transaction.set_rollback(True)
+    return results
+
+
+def load_history(path):
+    path = Path(path)
+    if not path.exists():
+        return []
+    with path.open() as history_file:
+        return json.load(history_file)
+
+
+def save_run(path, results, label=''):
+    """Append a run to the JSON history file at ``path`` and return the stored entry."""
+    path = Path(path)
+    history = load_history(path)
+    entry = {
+        'timestamp': datetime.now(dt_timezone.utc).isoformat(),
+        'label': label,
+        'results': results,
+    }
+    history.append(entry)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open('w') as history_file:
+        json.dump(history, history_file, indent=2, sort_keys=True)
+    return entry
+
+
+def baseline_results(history):
+    """
+    Return the latest stored result of each benchmark in ``history``.
+
+    Runs limited with ``--filter`` only hold some benchmarks, so the last run
+    alone is not a full baseline.
+    """
+    baseline = {}
+    for entry in history:
+        baseline.update(entry['results'])
+    return baseline
+
+
+def find_regressions(results, baseline, tolerance):
+    """
+    Compare ``results`` with the ``baseline`` results of a previous run.
+
+    Returns a list of (name, baseline_ops, current_ops) for benchmarks whose
+    throughput dropped by more than ``tolerance`` (0.2 means 20%).
+    Benchmarks missing from the baseline are ignored.
+    """
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if result['ops_per_sec'] < previous['ops_per_sec'] * (1 - tolerance):
+            regressions.append((name, previous['ops_per_sec'], result['ops_per_sec']))
+    return regressions
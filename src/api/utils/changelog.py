@@ -0,0 +1,122 @@
+"""
+Paginated changelog of a device.
+
+Pages are read with a keyset cursor on (created_at, id), newest first, so
+each page is one indexed range query however long the history is. Entries
+can be narrowed to report keys matching a glob pattern and to one change
+type; in compact mode only key names and value counts are returned, which
+is also all that is left of diffs summarized by the retention policy
+(see api.utils.retention.summarize_diff).
+"""
+import fnmatch
+
+from django.db.models import Q
+
+from api.models import DiffReport
+from api.utils.cursors import InvalidCursor, decode_cursor, encode_cursor
+from api.utils.retention import is_summary
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Rows read per page at most when filters skip most diffs; the page then ends early with a cursor
+MAX_SCANNED_ROWS = 5000
+CHANGE_TYPES = ('added', 'removed', 'changed')
+
+
+class ChangelogQueryError(ValueError):
+    """Raised when changelog query parameters are invalid."""
+
+
+def _count(values):
+    return len(values) if isinstance(values, list) else 1
+
+
+def _filter_diff(diff, key_pattern, change_type):
+    """Return (summary, added, removed, changed) of ``diff`` restricted to the filters; values are None for summaries."""
+    if is_summary(diff):
+        summary = diff['summary']
+        added = {key: None for key in summary.get('added', [])}
+        removed = {key: None for key in summary.get('removed', [])}
+        changed = [{key: None} for key in summary.get('changed', [])]
+    else:
+        added = diff.get('added', {})
+        removed = diff.get('removed', {})
+        changed = diff.get('changed', [])
+
+    def keep(key, kind):
+        return (not change_type or change_type == kind) and (not key_pattern or fnmatch.fnmatch(key, key_pattern))
+
+    return (
+        is_summary(diff),
+        {key: values for key, values in added.items() if keep(key, 'added')},
+        {key: values for key, values in removed.items() if keep(key, 'removed')},
+        [change for change in changed if any(keep(key, 'changed') for key in change)],
+    )
+
+
+def changelog_entry(diff_id, created_at, diff, key_pattern, change_type, compact):
+    """Return the changelog entry of one diff, or None when the filters leave nothing."""
+    summary, added, removed, changed = _filter_diff(diff or {}, key_pattern, change_type)
+    if not (added or removed or changed):
+        return None
+    entry = {'id': diff_id, 'created_at': created_at, 'summarized': summary}
+    if compact or summary:
+        # Key names with the number of values added or removed
+        entry.update({
+            'added': {key: None if summary else _count(values) for key, values in added.items()},
+            'removed': {key: None if summary else _count(values) for key, values in removed.items()},
+            'changed': [key for change in changed for key in change],
+        })
+    else:
+        entry.update({'added': added, 'removed': removed, 'changed': changed})
+    return entry
+
+
+class ChangelogPage:
+    """
+    One page of the changelog of a device, iterated entry by entry.
+
+    ``next_cursor`` is set once the page has been iterated: pass it as
+    ``cursor`` to get the next page, None when there are no older diffs.
+    """
+
+    def __init__(self, device_id, cursor=None, limit=None, key=None, change_type=None, compact=False):
+        try:
+            self.limit = int(limit) if limit else DEFAULT_PAGE_SIZE
+        except ValueError:
+            raise ChangelogQueryError('limit must be a number')
+        if not 1 <= self.limit <= MAX_PAGE_SIZE:
+            raise ChangelogQueryError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+        if change_type and change_type not in CHANGE_TYPES:
+            raise ChangelogQueryError(f'type must be one of {", ".join(CHANGE_TYPES)}')
+        self.device_id = device_id
+        try:
+            self.after = decode_cursor(cursor) if cursor else None
+        except InvalidCursor as e:
+            raise ChangelogQueryError(str(e))
+        self.key = key or None
+        self.change_type = change_type or None
+        self.compact = compact
+        self.next_cursor = None
+
+    def _rows(self):
+        rows = DiffReport.objects.filter(device_id=self.device_id)
+        if self.after:
+            created_at, diff_id = self.after
+            rows = rows.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=diff_id))
+        return rows.order_by('-created_at', '-id')
+
+    def __iter__(self):
+        self.next_cursor = None
+        returned = scanned = 0
+        rows = self._rows().values_list('id', 'created_at', 'diff_report')[:MAX_SCANNED_ROWS]
+        for diff_id, created_at, diff in rows.iterator(chunk_size=self.limit):
+            scanned += 1
+            entry = changelog_entry(diff_id, created_at, diff, self.key, self.change_type, self.compact)
+            if entry is not None:
+                yield entry
+                returned += 1
+            if returned == self.limit or scanned == MAX_SCANNED_ROWS:
+                if self._rows().filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=diff_id)).exists():
+                    self.next_cursor = encode_cursor(created_at, diff_id)
+                return
@@ -1,4 +1,14 @@
 import logging
+from collections import defaultdict
+
+from django.db.models import Max
+from django.utils import timezone
+from api.models import Device, FullReport, PolicyRule, RuleEvaluation
+from api.utils.fleet_dashboard import update_aggregates
+from api.utils.lynis_report import LynisReport, TIME_DEPENDENT_KEYS
+from api.utils.policy_planner import evaluate_rule_in_sql
+from api.utils.policy_query import query_fields
+from api.utils.rule_guard import SKIPPED, evaluate_rule
 
 def check_device_compliance(device, report):
     """
@@ -22,16 +32,19 @@ def check_device_compliance(device, report):
         
         ruleset_compliant = True
         for rule in policy_ruleset.rules.all():
-            rule_compliant = rule.evaluate(report)
+            rule_compliant = evaluate_rule(rule, report)
+            # A rule skipped by the circuit breaker does not decide compliance
+            skipped = rule_compliant is SKIPPED
             ruleset_dict['rules'].append({
                 'id': rule.id,
                 'name': rule.name,
                 'description': rule.description,
                 'enabled': rule.enabled,
                 'alert': rule.alert,
-                'compliant': rule_compliant
+                'compliant': None if skipped else rule_compliant,
+                'skipped': skipped,
             })
-            if not rule_compliant:
+            if not skipped and not rule_compliant:
                 ruleset_compliant = False
         
         ruleset_dict['compliant'] = ruleset_compliant
@@ -42,3 +55,196 @@ def check_device_compliance(device, report):
     
     return compliant, evaluated_rulesets
 
+
+def build_field_index(rules):
+    """
+    Index rules by the report keys they read.
+
+    Returns ({key: [rule, ...]}, always): ``always`` lists the rules that must
+    be evaluated on every report, because they read time-dependent keys or
+    their dependencies cannot be determined.
+    """
+    index = defaultdict(list)
+    always = []
+    for rule in rules:
+        fields = query_fields(rule.rule_query)
+        if fields is None or fields & TIME_DEPENDENT_KEYS:
+            always.append(rule)
+            continue
+        for field in fields:
+            index[field].append(rule)
+    return index, always
+
+
+def time_dependent_devices():
+    """
+    Return the devices assigned a rule that must be evaluated again as time passes.
+
+    These are the rules that read time-dependent keys (e.g. days_since_audit)
+    or whose keys cannot be determined; their result can change without a
+    new report, so ``manage.py refresh_compliance`` re-evaluates them daily.
+    """
+    _, always = build_field_index(PolicyRule.objects.all())
+    return Device.objects.filter(rulesets__rules__in=always).distinct()
+
+
+def store_evaluations(fresh, stored, assigned):
+    """
+    Write rule results to RuleEvaluation with one bulk create and one bulk update.
+
+    ``fresh`` is {device id: {rule id: compliant}} with the rules just
+    evaluated, ``stored`` {device id: {rule id: RuleEvaluation}} the rows
+    read before evaluating and ``assigned`` {device id: rule ids} the rules
+    assigned now: stored rows of other rules are deleted.
+    """
+    now = timezone.now()
+    to_create, to_update = [], []
+    for device_id, results in fresh.items():
+        device_stored = stored.get(device_id, {})
+        for rule_id, compliant in results.items():
+            evaluation = device_stored.get(rule_id)
+            if evaluation is None:
+                to_create.append(RuleEvaluation(device_id=device_id, rule_id=rule_id, compliant=compliant, evaluated_at=now))
+            else:
+                evaluation.compliant, evaluation.evaluated_at = compliant, now
+                to_update.append(evaluation)
+
+    RuleEvaluation.objects.bulk_create(to_create)
+    RuleEvaluation.objects.bulk_update(to_update, ['compliant', 'evaluated_at'])
+    # Rules no longer assigned to the device
+    stale = [
+        evaluation.id
+        for device_id, device_stored in stored.items()
+        for rule_id, evaluation in device_stored.items()
+        if rule_id not in assigned.get(device_id, ())
+    ]
+    if stale:
+        RuleEvaluation.objects.filter(id__in=stale).delete()
+
+
+def evaluate_device_compliance(device, report, changed_keys=None):
+    """
+    Evaluate the rules assigned to ``device`` against its new parsed ``report``.
+
+    ``changed_keys`` is the set of report keys that changed since the previous
+    report (see api.utils.lynis_report.diff_keys). Rules that read none of
+    them keep the result stored in RuleEvaluation, unless the rule was edited
+    since. Pass None to evaluate every rule.
+
+    Returns (compliant, evaluated, skipped).
+    """
+    rules = {rule.id: rule for ruleset in device.rulesets.prefetch_related('rules') for rule in ruleset.rules.all()}
+    stored = {evaluation.rule_id: evaluation for evaluation in RuleEvaluation.objects.filter(device=device)}
+
+    if changed_keys is None:
+        due = set(rules)
+    else:
+        index, always = build_field_index(rules.values())
+        due = {rule.id for rule in always}
+        for key in changed_keys:
+            due.update(rule.id for rule in index.get(key, ()))
+        due.update(
+            rule_id for rule_id, rule in rules.items()
+            if rule_id not in stored or stored[rule_id].evaluated_at < rule.updated_at
+        )
+
+    results, fresh = {}, {}
+    for rule_id, rule in rules.items():
+        result = evaluate_rule(rule, report) if rule_id in due else SKIPPED
+        if result is SKIPPED:
+            # Not due, or skipped by the circuit breaker: keep the last known result
+            if rule_id in stored:
+                results[rule_id] = stored[rule_id].compliant
+            continue
+        results[rule_id] = fresh[rule_id] = bool(result)
+    store_evaluations({device.id: fresh}, {device.id: stored}, {device.id: set(rules)})
+
+    evaluated, skipped = len(due), len(rules) - len(due)
+    logging.debug('Compliance of device %s: %d rules evaluated, %d carried forward', device, evaluated, skipped)
+    return all(results.values()), evaluated, skipped
+
+
+def latest_report_ids(device_ids):
+    """Return {device_id: id of its newest FullReport}, with one query."""
+    return dict(
+        FullReport.objects.filter(device_id__in=device_ids)
+        .values('device_id')
+        .annotate(latest_id=Max('id'))
+        .values_list('device_id', 'latest_id')
+    )
+
+
+def latest_reports_by_device(device_ids):
+    """
+    Return {device_id: FullReport} with the newest report of each device.
+
+    Uses two queries regardless of how many devices are requested.
+    """
+    latest_ids = latest_report_ids(device_ids)
+    return {report.device_id: report for report in FullReport.objects.filter(id__in=list(latest_ids.values()))}
+
+
+def refresh_device_compliance(devices):
+    """
+    Re-evaluate and store the compliance status of the given devices.
+
+    ``devices`` is a Device queryset. Rules that the planner can translate
+    (see api.utils.policy_planner) are evaluated for all devices with one
+    query each; reports are only loaded and parsed for devices that still
+    need a rule evaluated in Python. Reports, rulesets and rules are loaded
+    in bulk, so the number of queries does not grow with the number of devices.
+    Devices without any report are marked as non-compliant. The result of
+    each rule is stored in RuleEvaluation, as at ingest.
+
+    Returns the number of devices whose status changed.
+    """
+    device_list = list(devices.prefetch_related('rulesets__rules'))
+    device_rules = {
+        device.id: [rule for ruleset in device.rulesets.all() for rule in ruleset.rules.all()]
+        for device in device_list
+    }
+
+    planned = {}
+    for rule in {rule.id: rule for rules in device_rules.values() for rule in rules}.values():
+        result = evaluate_rule_in_sql(rule.rule_query, devices)
+        if result is not None:
+            planned[rule.id] = result
+
+    # Devices never indexed have no decided rule, which also covers devices without reports
+    python_ids = {
+        device.id for device in device_list
+        if device.report_index_updated_at is None
+        or any(rule.id not in planned or device.id in planned[rule.id][1] for rule in device_rules[device.id])
+    }
+    reports = latest_reports_by_device(python_ids)
+    stored = defaultdict(dict)
+    for evaluation in RuleEvaluation.objects.filter(device_id__in=[device.id for device in device_list]):
+        stored[evaluation.device_id][evaluation.rule_id] = evaluation
+
+    changed = []
+    fresh = {}
+    for device in device_list:
+        if device.id not in python_ids:
+            fresh[device.id] = {rule.id: device.id in planned[rule.id][0] for rule in device_rules[device.id]}
+            compliant = all(fresh[device.id].values())
+        elif device.id not in reports:
+            logging.error('No report found for device %s', device)
+            compliant = False
+        else:
+            report = LynisReport(reports[device.id].full_report).get_parsed_report()
+            compliant, evaluated_rulesets = check_device_compliance(device, report)
+            # Rules skipped by the circuit breaker keep their stored result
+            fresh[device.id] = {
+                rule['id']: bool(rule['compliant'])
+                for ruleset in evaluated_rulesets for rule in ruleset['rules'] if not rule['skipped']
+            }
+        if device.compliant != compliant:
+            device.compliant = compliant
+            # bulk_update skips auto_now; read API clients sync on updated_at
+            device.updated_at = timezone.now()
+            changed.append(device)
+
+    Device.objects.bulk_update(changed, ['compliant', 'updated_at'])
+    store_evaluations(fresh, stored, {device_id: {rule.id for rule in rules} for device_id, rules in device_rules.items()})
+    update_aggregates(changed)
+    return len(changed)
@@ -0,0 +1,132 @@
+"""
+Compliance history of devices and of the fleet.
+
+Every ingested report appends a ComplianceSnapshot to the device: whether
+it was compliant, its hardening index and warning count, and which of its
+rulesets passed, as two bitsets of ruleset ids. A snapshot is a few dozen
+bytes, so the history outlives the pruned reports it was taken from.
+
+The fleet trend is one ComplianceTrend row per day, updated with the same
+snapshot: a device counts once per day, with the values of its last report
+that day. A dashboard reads the last N rows, whatever the fleet size.
+"""
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from api.models import ComplianceSnapshot, ComplianceTrend, RuleEvaluation
+
+
+SMALLINT_MAX = 32767
+
+
+def pack_ids(ids):
+    """Pack a set of non-negative ids into a little-endian bitset."""
+    bits = 0
+    for id_ in ids:
+        bits |= 1 << id_
+    return bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+
+
+def unpack_ids(data):
+    """Return the set of ids packed by pack_ids."""
+    ids = set()
+    for position, byte in enumerate(bytes(data)):
+        ids.update(position * 8 + bit for bit in range(8) if byte >> bit & 1)
+    return ids
+
+
+def _small_int(value):
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    return value if 0 <= value <= SMALLINT_MAX else None
+
+
+def _trend_values(snapshot):
+    """Return the ComplianceTrend counters contributed by one snapshot."""
+    has_index = snapshot.hardening_index is not None
+    return {
+        'compliant': int(snapshot.compliant),
+        'hardening_index_sum': snapshot.hardening_index if has_index else 0,
+        'hardening_index_count': int(has_index),
+        'warnings_sum': snapshot.warnings or 0,
+    }
+
+
+def record_snapshot(device):
+    """
+    Append a ComplianceSnapshot of ``device`` and update today's ComplianceTrend.
+
+    Call after the device was saved with the compliance of its new report
+    (see evaluate_device_compliance). Returns the snapshot.
+    """
+    rulesets = list(device.rulesets.prefetch_related('rules'))
+    results = dict(RuleEvaluation.objects.filter(device=device).values_list('rule_id', 'compliant'))
+    # A ruleset passed if every rule has a stored passing result; a rule never evaluated
+    # (e.g. skipped by the circuit breaker) leaves it out
+    passed = [ruleset.id for ruleset in rulesets if all(results.get(rule.id) for rule in ruleset.rules.all())]
+    previous = device.compliance_snapshots.order_by('-created_at').first()
+
+    with transaction.atomic():
+        snapshot = ComplianceSnapshot.objects.create(
+            device=device,
+            compliant=device.compliant,
+            hardening_index=_small_int(device.hardening_index),
+            warnings=_small_int(device.warnings),
+            rulesets_assigned=pack_ids(ruleset.id for ruleset in rulesets),
+            rulesets_passed=pack_ids(passed),
+        )
+        day = timezone.localdate(snapshot.created_at)
+        ComplianceTrend.objects.get_or_create(day=day)
+
+        values = _trend_values(snapshot)
+        if previous is not None and timezone.localdate(previous.created_at) == day:
+            # Second report of the day: replace the device's earlier values
+            old = _trend_values(previous)
+            updates = {field: F(field) + value - old[field] for field, value in values.items()}
+        else:
+            updates = {field: F(field) + value for field, value in values.items()}
+            updates['devices'] = F('devices') + 1
+        ComplianceTrend.objects.filter(day=day).update(**updates)
+
+    return snapshot
+
+
+def fleet_trend(days=30):
+    """
+    Return the daily fleet trend of the last ``days`` days with data, oldest first.
+
+    Each item is a dict with day, devices, compliant_percent and
+    average_hardening_index (None without any hardening index that day).
+    """
+    rows = list(ComplianceTrend.objects.order_by('-day')[:days])
+    return [
+        {
+            'day': row.day,
+            'devices': row.devices,
+            'compliant_percent': round(100 * row.compliant / row.devices, 1) if row.devices else None,
+            'average_hardening_index': (
+                round(row.hardening_index_sum / row.hardening_index_count, 1) if row.hardening_index_count else None
+            ),
+        }
+        for row in reversed(rows)
+    ]
+
+
+def device_history(device, limit=100):
+    """Return the last ``limit`` snapshots of ``device`` as dicts with decoded ruleset ids, oldest first."""
+    snapshots = list(device.compliance_snapshots.order_by('-created_at')[:limit])
+    return [
+        {
+            'created_at': snapshot.created_at,
+            'compliant': snapshot.compliant,
+            'hardening_index': snapshot.hardening_index,
+            'warnings': snapshot.warnings,
+            'rulesets_assigned': sorted(unpack_ids(snapshot.rulesets_assigned)),
+            'rulesets_passed': sorted(unpack_ids(snapshot.rulesets_passed)),
+        }
+        for snapshot in reversed(snapshots)
+    ]
@@ -0,0 +1,26 @@
+"""Opaque keyset pagination cursors: the (timestamp, id) of the last row of a page."""
+import base64
+import binascii
+from datetime import datetime
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor cannot be decoded."""
+
+
+def encode_cursor(timestamp, row_id):
+    return base64.urlsafe_b64encode(f'{timestamp.isoformat()}|{row_id}'.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return the (timestamp, id) encoded in ``cursor``."""
+    try:
+        text = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        timestamp, row_id = text.rsplit('|', 1)
+        timestamp = datetime.fromisoformat(timestamp)
+        row_id = int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor('Invalid cursor')
+    if timestamp.tzinfo is None:
+        raise InvalidCursor('Invalid cursor')
+    return timestamp, row_id
@@ -0,0 +1,173 @@
+"""
+Display model of report diffs for the activity page.
+
+``diff_display`` turns a diff into the entries the page shows. Each value
+is classified once: technical formatting, direction and delta of numeric
+changes, items added and removed in list values. ``diff_displays`` caches
+the result by diff id, so a render reads precomputed attributes instead of
+running string heuristics and Decimal parsing per value. A diff does not
+change once written, except when the retention policy summarizes it: its
+cached entries are then dropped (``forget``) and it is shown by key name
+only, with ``summarized`` set.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.core.cache import cache
+
+from api.models import DiffReport
+
+CACHE_SECONDS = 24 * 3600
+
+
+def is_technical(value):
+    """
+    Return True if a value should be displayed with technical formatting:
+    long strings (>50 chars), tuples, parentheses, IP and MAC addresses,
+    paths and network interfaces.
+    """
+    if not value:
+        return False
+
+    value_str = str(value)
+
+    # Check length
+    if len(value_str) > 50:
+        return True
+
+    # Check for technical patterns
+    technical_patterns = [
+        '(' in value_str and ')' in value_str,  # Tuples, function calls
+        ':' in value_str and '.' in value_str,  # IP addresses, ports
+        ':' in value_str and len(value_str.split(':')) > 2,  # MAC addresses
+        value_str.startswith('(') and value_str.endswith(')'),  # Tuple-like
+        '/' in value_str and len(value_str.split('/')) > 2,  # Paths
+        '@' in value_str and 'if' in value_str,  # Network interfaces like eth0@if252
+    ]
+
+    return any(technical_patterns)
+
+
+def _coerce_decimal(value):
+    string_value = str(value).strip()
+    if not string_value:
+        raise InvalidOperation
+    string_value = string_value.replace(',', '')
+    return Decimal(string_value)
+
+
+def numeric_change(old_value, new_value):
+    """
+    Return (direction, delta) of a change: direction is 'up', 'down' or
+    'neutral', delta the signed difference as text ('' if the values are not
+    numbers or are equal).
+    """
+    if old_value in (None, '') or new_value in (None, ''):
+        return 'neutral', ''
+
+    try:
+        old_dec = _coerce_decimal(old_value)
+        new_dec = _coerce_decimal(new_value)
+    except (InvalidOperation, ValueError):
+        return 'neutral', ''
+
+    delta = new_dec - old_dec
+    if delta == 0:
+        return 'neutral', ''
+
+    if delta == delta.to_integral():
+        delta_value = int(delta)
+    else:
+        delta_value = delta.normalize()
+
+    if delta > 0:
+        return 'up', f'+{delta_value}'
+    return 'down', f'{delta_value}'
+
+
+def _display_item(item):
+    # Items of lists such as warning[] are [test id, text, ...]: show the first element (the test id)
+    if isinstance(item, (list, tuple)):
+        text = str(item[0]) if item else ''
+    else:
+        text = str(item)
+    return {'text': text, 'technical': is_technical(text)}
+
+
+def _array_change(old_value, new_value):
+    """Return the (added, removed) items of a list value, sorted, for display."""
+    # Items that are lists themselves are compared as tuples
+    old_set = {tuple(item) if isinstance(item, list) else item for item in old_value}
+    new_set = {tuple(item) if isinstance(item, list) else item for item in new_value}
+    added = sorted(new_set - old_set, key=str)
+    removed = sorted(old_set - new_set, key=str)
+    return [_display_item(item) for item in added], [_display_item(item) for item in removed]
+
+
+def _summary_display(summary):
+    """Return the display entries of a summarized diff: one per key, without values."""
+    return [
+        {'type': change_type, 'key': key, 'summarized': True}
+        for change_type in ('added', 'removed', 'changed')
+        for key in summary.get(change_type, [])
+    ]
+
+
+def diff_display(diff):
+    """Return the display entries of a diff: one per value added or removed, one per key changed."""
+    # Diffs summarized by the retention policy only keep their keys (see api.utils.retention)
+    if 'summary' in diff:
+        return _summary_display(diff['summary'])
+
+    entries = []
+    if 'added' in diff and 'removed' in diff:
+        for change_type in ('added', 'removed'):
+            for key, values in diff[change_type].items():
+                # Normalize to list: if it's a string, wrap it in a list
+                for value in values if isinstance(values, list) else [values]:
+                    entries.append({'type': change_type, 'key': key, 'value': value, 'technical': is_technical(value)})
+
+    for change in diff.get('changed', []):
+        # change = {'slow_test': {'old': [...], 'new': [...]}}
+        key = list(change.keys())[0]
+        old_value, new_value = change[key]['old'], change[key]['new']
+        entry = {
+            'type': 'changed',
+            'key': key,
+            'old_value': old_value,
+            'new_value': new_value,
+            'is_array': isinstance(old_value, list) and isinstance(new_value, list),
+            'array_added': [],
+            'array_removed': [],
+        }
+        if entry['is_array']:
+            entry['array_added'], entry['array_removed'] = _array_change(old_value, new_value)
+        else:
+            entry['old_technical'] = is_technical(old_value)
+            entry['new_technical'] = is_technical(new_value)
+            entry['direction'], entry['delta'] = numeric_change(old_value, new_value)
+        entries.append(entry)
+    return entries
+
+
+def _cache_key(diff_id):
+    return f'diff_display:{diff_id}'
+
+
+def diff_displays(diff_ids):
+    """Return {diff id: display entries}; diffs not in the cache are read in one query, built and cached."""
+    keys = {_cache_key(diff_id): diff_id for diff_id in diff_ids}
+    displays = {keys[key]: entries for key, entries in cache.get_many(list(keys)).items()}
+    missing = [diff_id for diff_id in diff_ids if diff_id not in displays]
+    if missing:
+        built = {
+            diff_id: diff_display(diff or {})
+            for diff_id, diff in DiffReport.objects.filter(id__in=missing).values_list('id', 'diff_report')
+        }
+        cache.set_many({_cache_key(diff_id): entries for diff_id, entries in built.items()}, CACHE_SECONDS)
+        displays.update(built)
+    return displays
+
+
+def forget(diff_ids):
+    """Drop the cached display entries of diffs that were rewritten."""
+    cache.delete_many([_cache_key(diff_id) for diff_id in diff_ids])
@@ -0,0 +1,182 @@
+"""
+Fleet dashboard aggregates.
+
+The dashboard shows compliance, the hardening index distribution, the
+OS breakdown, Lynis versions, the most common warnings and the
+devices that stopped reporting. Each is a FleetAggregate counter: the
+number of devices in one bucket of a metric. A device remembers the buckets
+it is counted in (Device.dashboard_buckets), so when a report is ingested
+or a device is deleted only the buckets it leaves and enters are updated,
+and the dashboard reads the counters with one query whatever the fleet
+size. The 'rule_evaluations' metric holds totals instead: the rule
+evaluations run and skipped at ingest, shown on the policies page.
+``manage.py rebuild_dashboard`` recomputes them from scratch.
+"""
+import re
+from collections import Counter, defaultdict
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from api.models import Device, FleetAggregate
+
+HARDENING_INDEX_STEP = 10
+TOP_WARNINGS = 10
+
+
+def warning_ids(report):
+    """Return the test ids of the warnings of a parsed report."""
+    ids = set()
+    for warning in report.get('warning') or []:
+        # Items are 'TEST-ID|text|...' split into a list, or a bare string
+        test_id = warning[0] if isinstance(warning, list) and warning else str(warning).split('|')[0]
+        test_id = str(test_id).strip()
+        if test_id:
+            ids.add(test_id[:255])
+    return ids
+
+
+def _report_day(value):
+    """Return the local date of a report timestamp, a datetime or the string read from the report."""
+    if isinstance(value, str):
+        value = parse_datetime(value.strip())
+    if not isinstance(value, datetime):
+        return None
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return timezone.localdate(value)
+
+
+def device_buckets(device, warnings):
+    """Return the sorted [metric, bucket] pairs counting ``device``, with the test ids in ``warnings``."""
+    buckets = {('compliance', 'compliant' if device.compliant else 'non_compliant')}
+    if isinstance(device.hardening_index, int):
+        step = min(max(device.hardening_index, 0) // HARDENING_INDEX_STEP, 100 // HARDENING_INDEX_STEP - 1)
+        buckets.add(('hardening_index', str(step * HARDENING_INDEX_STEP)))
+    buckets.add(('distro', (device.distro or device.os or 'Unknown')[:255]))
+    buckets.add(('lynis_version', (device.lynis_version or 'Unknown')[:255]))
+    day = _report_day(device.last_update)
+    if day is not None:
+        buckets.add(('last_report', day.isoformat()))
+    buckets.update(('warning', test_id) for test_id in warnings)
+    return sorted([metric, bucket] for metric, bucket in buckets)
+
+
+def _apply(deltas):
+    """Add {(metric, bucket): delta} to the counters; one update per metric and delta."""
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    FleetAggregate.objects.bulk_create(
+        [FleetAggregate(metric=metric, bucket=bucket) for metric, bucket in deltas], ignore_conflicts=True
+    )
+    grouped = defaultdict(list)
+    for (metric, bucket), delta in deltas.items():
+        grouped[metric, delta].append(bucket)
+    for (metric, delta), buckets in grouped.items():
+        FleetAggregate.objects.filter(metric=metric, bucket__in=buckets).update(devices=F('devices') + delta)
+
+
+def update_aggregates(devices, reports=None):
+    """
+    Count ``devices`` in the buckets of their current fields.
+
+    ``reports`` maps device ids to parsed reports; devices without one keep
+    the warnings they are counted with, which is enough when only their
+    compliance changed.
+    """
+    reports = reports or {}
+    deltas = Counter()
+    for device in devices:
+        old = {tuple(bucket) for bucket in device.dashboard_buckets}
+        if device.id in reports:
+            warnings = warning_ids(reports[device.id])
+        else:
+            warnings = {bucket for metric, bucket in old if metric == 'warning'}
+        device.dashboard_buckets = device_buckets(device, warnings)
+        new = {tuple(bucket) for bucket in device.dashboard_buckets}
+        deltas.update(dict.fromkeys(new - old, 1))
+        deltas.subtract(dict.fromkeys(old - new, 1))
+
+    with transaction.atomic():
+        _apply(deltas)
+        Device.objects.bulk_update(devices, ['dashboard_buckets'], batch_size=500)
+
+
+def remove_device_aggregates(device):
+    """Stop counting a device about to be deleted."""
+    _apply({tuple(bucket): -1 for bucket in device.dashboard_buckets})
+
+
+def count_evaluations(evaluated, skipped):
+    """Add the rule evaluations run and skipped by one ingest to the fleet totals."""
+    _apply({('rule_evaluations', 'evaluated'): evaluated, ('rule_evaluations', 'skipped'): skipped})
+
+
+def evaluation_counts():
+    """Return the fleet totals of rule evaluations run and skipped at ingest, read with one query."""
+    counts = dict(FleetAggregate.objects.filter(metric='rule_evaluations').values_list('bucket', 'devices'))
+    return counts.get('evaluated', 0), counts.get('skipped', 0)
+
+
+def _version_key(version):
+    return tuple(int(part) for part in re.findall(r'\d+', version))
+
+
+def _stale_cutoff():
+    """Devices whose last report is older than this day are stale."""
+    return timezone.localdate() - timedelta(days=getattr(settings, 'DASHBOARD_STALE_DAYS', 7))
+
+
+def fleet_dashboard():
+    """Return the dashboard figures, read from the counters with one query."""
+    counts = defaultdict(dict)
+    for metric, bucket, devices in FleetAggregate.objects.filter(devices__gt=0).values_list('metric', 'bucket', 'devices'):
+        counts[metric][bucket] = devices
+
+    total = sum(counts['compliance'].values())
+    compliant = counts['compliance'].get('compliant', 0)
+
+    histogram = []
+    for start in range(0, 100, HARDENING_INDEX_STEP):
+        end = start + HARDENING_INDEX_STEP - 1 if start + HARDENING_INDEX_STEP < 100 else 100
+        histogram.append({'label': f'{start}-{end}', 'devices': counts['hardening_index'].get(str(start), 0)})
+    highest = max((row['devices'] for row in histogram), default=0)
+    for row in histogram:
+        row['percent'] = round(100 * row['devices'] / highest) if highest else 0
+
+    known = [version for version in counts['lynis_version'] if version != 'Unknown']
+    latest = max(known, key=_version_key, default=None)
+    lynis_versions = [
+        {
+            'version': version,
+            'devices': devices,
+            'outdated': latest is not None and version != 'Unknown' and _version_key(version) < _version_key(latest),
+        }
+        for version, devices in sorted(counts['lynis_version'].items(), key=lambda item: _version_key(item[0]), reverse=True)
+    ]
+
+    cutoff = _stale_cutoff().isoformat()
+    return {
+        'devices': total,
+        'compliant': compliant,
+        'compliant_percent': round(100 * compliant / total, 1) if total else None,
+        'hardening_index': histogram,
+        'distros': sorted(counts['distro'].items(), key=lambda item: (-item[1], item[0])),
+        'lynis_versions': lynis_versions,
+        'latest_lynis_version': latest,
+        'outdated_lynis': sum(row['devices'] for row in lynis_versions if row['outdated']),
+        'top_warnings': sorted(counts['warning'].items(), key=lambda item: (-item[1], item[0]))[:TOP_WARNINGS],
+        'stale': sum(devices for day, devices in counts['last_report'].items() if day < cutoff),
+        'stale_days': getattr(settings, 'DASHBOARD_STALE_DAYS', 7),
+    }
+
+
+def stale_devices(limit=10):
+    """Return the ``limit`` stale devices that reported least recently (one indexed query)."""
+    cutoff = timezone.make_aware(datetime.combine(_stale_cutoff(), time()))
+    return list(Device.objects.filter(last_update__lt=cutoff).order_by('last_update')[:limit])
@@ -0,0 +1,148 @@
+"""
+Fleet-wide export of devices as CSV or NDJSON.
+
+Rows are built from the fields stored on each device at ingest and, for
+``report.<key>`` columns, from the report key index (api.utils.report_index),
+so no report is parsed. Devices are read with a server-side cursor and
+handled in chunks of CHUNK_SIZE, with one index query per chunk; the output
+is produced as it is read, so memory does not grow with the fleet.
+"""
+import csv
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from api.models import DeviceReportKey
+
+CHUNK_SIZE = 500
+REPORT_PREFIX = 'report.'
+
+# Column name: field path on Device
+DEVICE_COLUMNS = {
+    'id': 'id',
+    'hostname': 'hostname',
+    'hostid': 'hostid',
+    'hostid2': 'hostid2',
+    'license': 'licensekey__name',
+    'os': 'os',
+    'distro': 'distro',
+    'distro_version': 'distro_version',
+    'lynis_version': 'lynis_version',
+    'hardening_index': 'hardening_index',
+    'warnings': 'warnings',
+    'compliant': 'compliant',
+    'last_update': 'last_update',
+    'created_at': 'created_at',
+}
+DEFAULT_COLUMNS = [
+    'id', 'hostname', 'license', 'os', 'distro', 'distro_version', 'lynis_version',
+    'hardening_index', 'warnings', 'compliant', 'last_update',
+]
+
+
+class ExportColumnError(ValueError):
+    """Raised when an export column is unknown."""
+
+
+def parse_columns(text):
+    """Return the columns of a comma-separated list (DEFAULT_COLUMNS when empty)."""
+    columns = [column.strip() for column in text.split(',') if column.strip()]
+    for column in columns:
+        if column not in DEVICE_COLUMNS and not (column.startswith(REPORT_PREFIX) and len(column) > len(REPORT_PREFIX)):
+            raise ExportColumnError(
+                f"Unknown column '{column}': use {', '.join(DEVICE_COLUMNS)} or {REPORT_PREFIX}<report key>"
+            )
+    return columns or list(DEFAULT_COLUMNS)
+
+
+def _report_values(device_ids, keys):
+    """Return {(device_id, key): value} from the report key index; list keys map to lists."""
+    values = {}
+    rows = (
+        DeviceReportKey.objects
+        .filter(device_id__in=device_ids, key__in=keys)
+        .order_by('device_id', 'key', 'item')
+        .values_list('device_id', 'key', 'item', 'value_type', 'value_text', 'value_num')
+    )
+    for device_id, key, item, value_type, value_text, value_num in rows:
+        if value_type == 'number' and value_num is not None:
+            value = int(value_num) if value_num.is_integer() else value_num
+        else:
+            value = value_text
+        if item is None:
+            values[(device_id, key)] = value
+        else:
+            values.setdefault((device_id, key), []).append(value)
+    return values
+
+
+def iter_rows(devices, columns, chunk_size=CHUNK_SIZE):
+    """Yield one dict per device of the ``devices`` queryset, ordered by id, with the values of ``columns``."""
+    device_columns = [column for column in columns if column in DEVICE_COLUMNS]
+    report_keys = {column: column[len(REPORT_PREFIX):] for column in columns if column not in DEVICE_COLUMNS}
+    fields = {DEVICE_COLUMNS[column] for column in device_columns} | {'id'}
+
+    cursor = devices.order_by('id').values(*fields).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(cursor, chunk_size))
+        if not chunk:
+            return
+        values = _report_values([row['id'] for row in chunk], set(report_keys.values())) if report_keys else {}
+        for row in chunk:
+            yield {
+                column: (
+                    row[DEVICE_COLUMNS[column]] if column in DEVICE_COLUMNS
+                    else values.get((row['id'], report_keys[column]))
+                )
+                for column in columns
+            }
+
+
+class _Echo:
+    """File-like object returning what is written, so csv.writer produces strings."""
+
+    def write(self, value):
+        return value
+
+
+# Cells starting with these are run as formulas by spreadsheet applications
+FORMULA_PREFIXES = ('=', '+', '-', '@')
+
+
+def csv_value(value):
+    """Return ``value`` as a CSV cell, with text that a spreadsheet would run as a formula quoted."""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, list):
+        value = ';'.join(str(item) for item in value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        # Report values come from the devices and names from users: keep them as text
+        return "'" + value
+    return value
+
+
+def _batched(lines, size=CHUNK_SIZE):
+    # One chunk per batch of rows rather than per row
+    lines = iter(lines)
+    while True:
+        batch = ''.join(islice(lines, size))
+        if not batch:
+            return
+        yield batch
+
+
+def stream_csv(rows, columns):
+    """Yield CSV text for ``rows`` (see iter_rows), with a header row."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    yield from _batched(writer.writerow([csv_value(row[column]) for column in columns]) for row in rows)
+
+
+def stream_ndjson(rows):
+    """Yield newline-delimited JSON for ``rows`` (see iter_rows), one object per line."""
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    yield from _batched(encoder.encode(row) + '\n' for row in rows)
@@ -0,0 +1,138 @@
+"""
+Fleet-wide impact preview of a draft rule query.
+
+Before a rule is saved, ``start_preview`` records a RuleImpactPreview and
+queues ``run_preview`` as a deferred task, so the web worker answers at
+once and the page polls the preview for progress. The draft is evaluated
+like refresh_device_compliance evaluates rules: devices that the SQL
+planner can decide from the report index are counted with one query, and
+the remaining devices are evaluated in batches against their latest
+report, read from the parsed report cache (see api.utils.report_cache).
+Counts and sample failing devices are saved after each batch.
+
+When the draft edits an existing rule, the current query is evaluated on
+the same reports to count, among the devices the rule applies to, those
+that would start or stop passing it.
+"""
+import logging
+from datetime import timedelta
+
+from django.utils import timezone
+
+from api.models import Device, RuleImpactPreview
+from api.utils.compliance import latest_report_ids
+from api.utils.policy_planner import evaluate_rule_in_sql
+from api.utils.policy_query import evaluate_query
+from api.utils.report_cache import parsed_reports
+from api.utils.tasks import defer
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 200
+SAMPLE_SIZE = 10
+# Finished previews are deleted when a new one starts
+PREVIEW_MAX_AGE = timedelta(days=1)
+
+
+def start_preview(rule_query, user, rule=None):
+    """Create a preview of ``rule_query`` and queue its evaluation; return the RuleImpactPreview."""
+    RuleImpactPreview.objects.filter(created_at__lt=timezone.now() - PREVIEW_MAX_AGE).delete()
+    preview = RuleImpactPreview.objects.create(rule_query=rule_query, rule=rule, created_by=user)
+    defer(run_preview, preview.id)
+    return preview
+
+
+def _sql_results(query, device_ids):
+    """Return {device_id: bool} for the devices decided in SQL, or {} when the query cannot be planned."""
+    result = evaluate_rule_in_sql(query, Device.objects.all())
+    if result is None:
+        return {}
+    compliant, undecided = result
+    return {device_id: device_id in compliant for device_id in device_ids if device_id not in undecided}
+
+
+class _Tally:
+    def __init__(self, preview, hostnames, assigned):
+        self.preview = preview
+        self.hostnames = hostnames
+        self.assigned = assigned
+        self.result = {
+            'passed': 0,
+            'failed': 0,
+            'errors': 0,
+            'no_report': 0,
+            'decided_in_sql': 0,
+            'assigned': len(assigned),
+            'newly_failing': 0,
+            'newly_passing': 0,
+            'failing_samples': [],
+        }
+
+    def add(self, device_id, draft, current=None):
+        result = self.result
+        if draft is None:
+            result['errors'] += 1
+        elif draft:
+            result['passed'] += 1
+        else:
+            result['failed'] += 1
+        if not draft and len(result['failing_samples']) < SAMPLE_SIZE:
+            result['failing_samples'].append({'id': device_id, 'hostname': self.hostnames.get(device_id)})
+        if self.preview.rule_id and device_id in self.assigned and bool(current) != bool(draft):
+            result['newly_passing' if draft else 'newly_failing'] += 1
+
+    def save(self, processed):
+        RuleImpactPreview.objects.filter(id=self.preview.id).update(processed=processed, result=self.result)
+
+
+def run_preview(preview_id):
+    """Evaluate a RuleImpactPreview, saving progress after each batch."""
+    preview = RuleImpactPreview.objects.select_related('rule').get(id=preview_id)
+    RuleImpactPreview.objects.filter(id=preview_id).update(status='running')
+    try:
+        _run(preview)
+    except Exception as e:
+        logger.exception('Impact preview %s failed', preview_id)
+        RuleImpactPreview.objects.filter(id=preview_id).update(status='failed', error=str(e), finished_at=timezone.now())
+        return
+    RuleImpactPreview.objects.filter(id=preview_id).update(status='done', finished_at=timezone.now())
+
+
+def _run(preview):
+    hostnames = dict(Device.objects.values_list('id', 'hostname'))
+    device_ids = sorted(hostnames)
+    assigned = set()
+    queries = [preview.rule_query]
+    if preview.rule_id:
+        assigned = set(Device.objects.filter(rulesets__rules=preview.rule_id).values_list('id', flat=True))
+        queries.append(preview.rule.rule_query)
+    RuleImpactPreview.objects.filter(id=preview.id).update(total=len(device_ids))
+
+    decided = [_sql_results(query, device_ids) for query in queries]
+    tally = _Tally(preview, hostnames, assigned)
+    remaining = []
+    for device_id in device_ids:
+        if all(device_id in results for results in decided):
+            tally.add(device_id, *(results[device_id] for results in decided))
+            tally.result['decided_in_sql'] += 1
+        else:
+            remaining.append(device_id)
+    processed = len(device_ids) - len(remaining)
+    tally.save(processed)
+
+    for start in range(0, len(remaining), BATCH_SIZE):
+        batch = remaining[start:start + BATCH_SIZE]
+        report_ids = latest_report_ids(batch)
+        reports = parsed_reports(report_ids.values())
+        for device_id in batch:
+            if device_id not in report_ids:
+                tally.result['no_report'] += 1
+                continue
+            report = reports[report_ids[device_id]]
+            tally.add(device_id, *(
+                results[device_id] if device_id in results else evaluate_query(report, query)
+                for query, results in zip(queries, decided)
+            ))
+        processed += len(batch)
+        tally.save(processed)
+
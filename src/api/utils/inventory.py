@@ -0,0 +1,214 @@
+"""
+Fleet inventory extracted from parsed Lynis reports.
+
+At ingest, the lists below are copied from the report into normalized,
+indexed tables (one row per package, listening port, user, kernel module or
+address). Each sync compares the report with the rows already stored for the
+device and only inserts or deletes the differences; kinds whose source keys
+did not change since the previous report are skipped entirely.
+"""
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from api.models import (
+    InventoryAddress,
+    InventoryKernelModule,
+    InventoryListeningPort,
+    InventoryPackage,
+    InventoryUser,
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_FIELD_LENGTH = 255
+DELETE_BATCH_SIZE = 500
+
+
+def _items(value):
+    """Return a report list value as a list (single values become one-item lists)."""
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    return [value]
+
+
+def _text(value):
+    return str(value).strip()[:MAX_FIELD_LENGTH]
+
+
+def _split_endpoint(endpoint):
+    """Split '0.0.0.0:22', ':::22' or '[::1]:631' into (address, port); port is None if missing."""
+    address, _, port = str(endpoint).rpartition(':')
+    if not port.isdigit():
+        return None, None
+    return address.strip('[]'), int(port)
+
+
+def extract_packages(report):
+    packages = set()
+    for item in _items(report.get('installed_packages_array')):
+        if isinstance(item, list):
+            item = ','.join(item)
+        name, _, version = str(item).partition(',')
+        if name.strip():
+            packages.add((_text(name), _text(version)))
+    return packages
+
+
+def extract_ports(report):
+    ports = set()
+    # Older Lynis: network_listen_port[]=address:port|program|
+    for item in _items(report.get('network_listen_port')):
+        fields = item if isinstance(item, list) else [item]
+        address, port = _split_endpoint(fields[0])
+        if port is not None:
+            process = fields[1] if len(fields) > 1 else ''
+            ports.add(('', _text(address), port, _text(process)))
+    # Newer Lynis: network_listen[]=raw,ss,v1|protocol|address:port|program|
+    for item in _items(report.get('network_listen')):
+        if not isinstance(item, list) or len(item) < 3:
+            continue
+        address, port = _split_endpoint(item[2])
+        if port is not None:
+            process = item[3] if len(item) > 3 else ''
+            ports.add((_text(item[1]).lower(), _text(address), port, _text(process)))
+    return ports
+
+
+def extract_users(report):
+    users = set()
+    for item in _items(report.get('real_user')):
+        fields = item if isinstance(item, list) else [item]
+        uid = fields[1] if len(fields) > 1 else None
+        users.add((_text(fields[0]), int(uid) if uid is not None and str(uid).isdigit() else None))
+    return users
+
+
+def extract_kernel_modules(report):
+    return {(_text(item),) for item in _items(report.get('loaded_kernel_module')) if not isinstance(item, list)}
+
+
+def extract_addresses(report):
+    addresses = set()
+    for family, key in (('ipv4', 'network_ipv4_address'), ('ipv6', 'network_ipv6_address'), ('mac', 'network_mac_address')):
+        for item in _items(report.get(key)):
+            if not isinstance(item, list) and str(item).strip():
+                addresses.add((family, _text(item)))
+    return addresses
+
+
+# kind -> label, model, natural key fields, report keys the kind is built from, extractor
+INVENTORY_KINDS = {
+    'packages': {
+        'label': 'Packages',
+        'model': InventoryPackage,
+        'fields': ('name', 'version'),
+        'keys': {'installed_packages_array'},
+        'extract': extract_packages,
+    },
+    'ports': {
+        'label': 'Listening ports',
+        'model': InventoryListeningPort,
+        'fields': ('protocol', 'address', 'port', 'process'),
+        'keys': {'network_listen_port', 'network_listen'},
+        'extract': extract_ports,
+    },
+    'users': {
+        'label': 'Users',
+        'model': InventoryUser,
+        'fields': ('name', 'uid'),
+        'keys': {'real_user'},
+        'extract': extract_users,
+    },
+    'kernel_modules': {
+        'label': 'Kernel modules',
+        'model': InventoryKernelModule,
+        'fields': ('name',),
+        'keys': {'loaded_kernel_module'},
+        'extract': extract_kernel_modules,
+    },
+    'addresses': {
+        'label': 'Network addresses',
+        'model': InventoryAddress,
+        'fields': ('family', 'address'),
+        'keys': {'network_ipv4_address', 'network_ipv6_address', 'network_mac_address'},
+        'extract': extract_addresses,
+    },
+}
+
+
+def sync_device_inventory(device, report, changed_keys=None):
+    """
+    Bring the inventory rows of ``device`` in line with the parsed ``report``.
+
+    ``changed_keys`` is the set of report keys that changed since the previous
+    report (see api.utils.lynis_report.diff_keys). Kinds built from unchanged
+    keys are skipped. Pass None, or sync a device whose inventory was never
+    extracted, to compare every kind.
+
+    Returns {kind: (added, removed)} for the kinds that were compared.
+    """
+    full_sync = changed_keys is None or device.inventory_updated_at is None
+    stats = {}
+
+    with transaction.atomic():
+        for kind, source in INVENTORY_KINDS.items():
+            if not full_sync and not (changed_keys & source['keys']):
+                continue
+
+            model, fields = source['model'], source['fields']
+            wanted = source['extract'](report)
+            existing = {
+                tuple(row[1:]): row[0]
+                for row in model.objects.filter(device=device).values_list('id', *fields)
+            }
+
+            removed = [pk for key, pk in existing.items() if key not in wanted]
+            added = [model(device=device, **dict(zip(fields, key))) for key in wanted if key not in existing]
+            for start in range(0, len(removed), DELETE_BATCH_SIZE):
+                model.objects.filter(id__in=removed[start:start + DELETE_BATCH_SIZE]).delete()
+            if added:
+                model.objects.bulk_create(added, batch_size=500)
+            stats[kind] = (len(added), len(removed))
+
+        device.inventory_updated_at = timezone.now()
+        device.save(update_fields=['inventory_updated_at'])
+
+    logger.debug('Inventory of device %s synced: %s', device, stats)
+    return stats
+
+
+def search_inventory(kind, term, version=None, protocol=None):
+    """
+    Return the inventory rows of ``kind`` matching ``term``, with their devices.
+
+    ``term`` matches the name (packages, users, kernel modules), the port
+    number (ports) or the address (addresses). A trailing '*' matches by prefix.
+    """
+    source = INVENTORY_KINDS[kind]
+    queryset = source['model'].objects.select_related('device')
+    field = {'ports': 'port', 'addresses': 'address'}.get(kind, 'name')
+
+    term = term.strip()
+    if kind == 'ports':
+        if not term.isdigit():
+            return queryset.none()
+        queryset = queryset.filter(port=int(term))
+        if protocol:
+            queryset = queryset.filter(protocol=protocol.lower())
+    elif term.endswith('*'):
+        queryset = queryset.filter(**{f'{field}__startswith': term[:-1]})
+    else:
+        queryset = queryset.filter(**{field: term})
+
+    if kind == 'packages' and version:
+        version = version.strip()
+        if version.endswith('*'):
+            queryset = queryset.filter(version__startswith=version[:-1])
+        else:
+            queryset = queryset.filter(version=version)
+
+    return queryset.order_by('device__hostname', *source['fields'])
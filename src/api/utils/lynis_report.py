@@ -4,6 +4,18 @@ from typing import Dict, List, Tuple, Any
 
 from django.utils import timezone
 
+# Generated keys whose value depends on when the report is parsed, not on its content
+TIME_DEPENDENT_KEYS = {'days_since_audit'}
+
+
+def diff_keys(diff: Dict[str, Any]) -> set:
+    """Return the set of report keys touched by a diff produced by LynisReport.compare_reports."""
+    keys = set(diff.get('added', {})) | set(diff.get('removed', {}))
+    for change in diff.get('changed', []):
+        keys.update(change)
+    return keys
+
+
 class LynisReport:
     """
     Class to represent a Lynis report.
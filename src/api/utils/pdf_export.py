@@ -0,0 +1,231 @@
+"""
+PDF export of device reports.
+
+Rendering a report with WeasyPrint takes seconds, so ``start_export``
+records a DevicePdfExport and renders it with a deferred task: the page
+asking for it is answered at once and reloads until the PDF is ready. An
+export is keyed by the device's latest report, a hash of its assigned
+rulesets and rules and TEMPLATE_VERSION, so downloading it again reads the
+stored bytes, while a new report, a policy edit or a template change
+renders a new one. Only the latest export of each device is kept.
+
+``export_archive`` streams the PDFs of many devices as a zip archive. The
+missing ones are queued like ``start_export`` does and added as they finish,
+so an export already being rendered is reused rather than rendered twice.
+"""
+import hashlib
+import logging
+import time
+import zipfile
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import prefetch_related_objects
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from api.models import DevicePdfExport, FullReport
+from api.utils.activity_feed import release_connection
+from api.utils.compliance import check_device_compliance, latest_report_ids
+from api.utils.lynis_report import LynisReport
+from api.utils.tasks import defer
+
+logger = logging.getLogger(__name__)
+
+# Bump when device/device_pdf.html changes so stored PDFs are rendered again
+TEMPLATE_VERSION = 1
+
+# Seconds between two checks of the exports a bulk export waits for
+ARCHIVE_POLL_SECONDS = 1
+
+
+class ExportError(Exception):
+    """Raised when a report cannot be rendered to PDF."""
+
+
+def rulesets_version(device):
+    """Return a hash of the rulesets assigned to ``device`` and of their rules, reusing them when prefetched."""
+    prefetch_related_objects([device], 'rulesets__rules')
+    digest = hashlib.sha1()
+    for ruleset in sorted(device.rulesets.all(), key=lambda ruleset: ruleset.id):
+        digest.update(f'{ruleset.id}:{ruleset.updated_at.isoformat()}'.encode())
+        for rule in sorted(ruleset.rules.all(), key=lambda rule: rule.id):
+            digest.update(f'|{rule.id}:{rule.updated_at.isoformat()}'.encode())
+        digest.update(b';')
+    return digest.hexdigest()
+
+
+def render_pdf(device, full_report):
+    """Render ``full_report`` of ``device`` with device/device_pdf.html; return (hostname, PDF bytes)."""
+    report = LynisReport(full_report.full_report).get_parsed_report()
+    # The hostname is needed for the file name
+    if not report or not isinstance(report, dict) or 'hostname' not in report:
+        raise ExportError('Failed to parse the report')
+
+    compliant, evaluated_rulesets = check_device_compliance(device, report)
+    device.compliant = compliant
+    html_string = render_to_string('device/device_pdf.html', {
+        'device': device,
+        'report': report,
+        'evaluated_rulesets': evaluated_rulesets,
+        'generated_at': datetime.now(),
+    })
+
+    # Imported lazily: WeasyPrint loads Pango/Cairo at import time
+    from weasyprint import HTML
+    return report['hostname'], HTML(string=html_string).render().write_pdf()
+
+
+def export_timeout():
+    return getattr(settings, 'PDF_EXPORT_TIMEOUT', 300)
+
+
+def _get_export(device, report_id):
+    """Return (export, needs_rendering) for the report ``report_id`` of ``device``."""
+    export, created = DevicePdfExport.objects.defer('pdf').get_or_create(
+        report_id=report_id,
+        rulesets_version=rulesets_version(device),
+        template_version=TEMPLATE_VERSION,
+        defaults={'device': device},
+    )
+    if created:
+        DevicePdfExport.objects.filter(device=device).exclude(id=export.id).delete()
+        return export, True
+    timeout = timedelta(seconds=export_timeout())
+    if export.status == 'pending' and export.created_at < timezone.now() - timeout:
+        # The worker rendering it went away: start over
+        export.created_at = timezone.now()
+        DevicePdfExport.objects.filter(id=export.id).update(created_at=export.created_at)
+        return export, True
+    return export, False
+
+
+def start_export(device, report_id=None):
+    """
+    Return the DevicePdfExport of the latest report of ``device``, queueing its
+    rendering if needed; None without a report. ``report_id`` is the id of that
+    report when the caller already looked it up.
+    """
+    if report_id is None:
+        full_report = FullReport.objects.filter(device=device).only('id').order_by('-created_at').first()
+        if full_report is None:
+            return None
+        report_id = full_report.id
+    export, needs_rendering = _get_export(device, report_id)
+    if needs_rendering:
+        defer(render_export, export.id)
+    return export
+
+
+def render_export(export_id):
+    """Render a DevicePdfExport and store the PDF or the error; return ``export_id``."""
+    try:
+        export = DevicePdfExport.objects.select_related('device').defer('pdf').get(id=export_id)
+    except DevicePdfExport.DoesNotExist:
+        # Replaced by the export of a newer report
+        return export_id
+    try:
+        full_report = FullReport.objects.filter(id=export.report_id).first()
+        if full_report is None:
+            raise ExportError('No report found for the device')
+        hostname, pdf = render_pdf(export.device, full_report)
+    except ExportError as e:
+        error = str(e)
+    except Exception:
+        logger.exception('PDF export %s of device %s failed', export_id, export.device_id)
+        error = 'Failed to render the PDF'
+    else:
+        DevicePdfExport.objects.filter(id=export_id).update(
+            status='done', hostname=hostname, pdf=pdf, error='', finished_at=timezone.now(),
+        )
+        return export_id
+    DevicePdfExport.objects.filter(id=export_id).update(status='failed', error=error, finished_at=timezone.now())
+    return export_id
+
+
+def pdf_filename(export):
+    return f'device-{export.hostname}-{timezone.localtime(export.finished_at):%Y%m%d_%H%M%S}.pdf'
+
+
+class _ZipStream:
+    """Write-only file object collecting what zipfile writes, drained after each member."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def export_archive(devices):
+    """
+    Yield a zip archive of the PDFs of ``devices`` in chunks, for a streaming response.
+
+    Stored PDFs are written first; the others are rendered by deferred tasks
+    (see api.utils.tasks) and written as they finish. Devices without a report
+    are left out; devices whose PDF failed, or for which no PDF finished
+    within PDF_EXPORT_TIMEOUT seconds of the previous one, are listed in
+    errors.txt.
+    """
+    # The rulesets, their rules and the latest reports are loaded once for all devices
+    devices = list(devices.prefetch_related('rulesets__rules'))
+    report_ids = latest_report_ids([device.id for device in devices])
+    ready, pending = [], []
+    for device in devices:
+        if device.id in report_ids:
+            export = start_export(device, report_ids[device.id])
+            (ready if export.status == 'done' else pending).append(export.id)
+
+    stream = _ZipStream()
+    archive = zipfile.ZipFile(stream, 'w', zipfile.ZIP_STORED)
+    errors = []
+
+    def add(export_id):
+        export = DevicePdfExport.objects.filter(id=export_id).first()
+        if export is None:
+            # Replaced by the export of a newer report while rendering
+            return
+        if export.status != 'done':
+            errors.append(f'device {export.device_id}: {export.error or "not rendered"}')
+            return
+        name = f'device-{get_valid_filename(export.hostname or "unknown")}-{export.device_id}.pdf'
+        archive.writestr(name, bytes(export.pdf))
+
+    for export_id in ready:
+        add(export_id)
+        yield stream.drain()
+
+    deadline = time.monotonic() + export_timeout()
+    while pending:
+        still_pending = set(
+            DevicePdfExport.objects.filter(id__in=pending, status='pending').values_list('id', flat=True)
+        )
+        finished = [export_id for export_id in pending if export_id not in still_pending]
+        if finished:
+            deadline = time.monotonic() + export_timeout()
+        elif time.monotonic() >= deadline:
+            logger.warning('Bulk PDF export gave up waiting for %d export(s)', len(pending))
+            finished = pending
+        for export_id in finished:
+            add(export_id)
+            yield stream.drain()
+        pending = [export_id for export_id in pending if export_id not in finished]
+        if pending:
+            # Do not hold a database connection while waiting for the renderers
+            release_connection()
+            time.sleep(ARCHIVE_POLL_SECONDS)
+
+    if errors:
+        archive.writestr('errors.txt', '\n'.join(errors) + '\n')
+    archive.close()
+    yield stream.drain()
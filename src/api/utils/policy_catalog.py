@@ -0,0 +1,76 @@
+"""
+Policy catalog: every rule and ruleset, serialized for the pages editing them.
+
+device_detail, policy_list and ruleset_detail embed the catalog as JSON for
+their side panels. It is built with three queries once per catalog version
+and kept in the cache. The version is read from the rule and ruleset tables
+(latest updated_at and row count), so a rule or ruleset saved, added or
+deleted by any process gives a new version even with a per-process cache;
+changes of ruleset membership touch the rulesets' updated_at (see
+api.signals).
+"""
+import json
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from api.models import PolicyRule, PolicyRuleset
+
+# Keys are versioned: an entry is only dropped to free memory
+CACHE_SECONDS = 24 * 3600
+RULE_FIELDS = ('id', 'name', 'description', 'rule_query', 'enabled', 'created_at', 'updated_at')
+RULESET_FIELDS = ('id', 'name', 'description', 'created_at', 'updated_at')
+
+
+def _stamp(queryset):
+    stats = queryset.aggregate(latest=Max('updated_at'), count=Count('id'))
+    return f'{stats["count"]}.{stats["latest"].timestamp() if stats["latest"] else 0}'
+
+
+def catalog_version():
+    """Return the version of the catalog (two aggregate queries)."""
+    return f'{_stamp(PolicyRule.objects)}-{_stamp(PolicyRuleset.objects)}'
+
+
+def _isoformat(row):
+    return {field: value.isoformat() if hasattr(value, 'isoformat') else value for field, value in row.items()}
+
+
+def _build(version):
+    rules = [_isoformat(row) for row in PolicyRule.objects.order_by('id').values(*RULE_FIELDS)]
+    rules_by_id = {rule['id']: rule for rule in rules}
+    members = {}
+    through = PolicyRuleset.rules.through.objects.order_by('policyrule_id')
+    for ruleset_id, rule_id in through.values_list('policyruleset_id', 'policyrule_id'):
+        members.setdefault(ruleset_id, []).append(rule_id)
+
+    rulesets = []
+    for row in PolicyRuleset.objects.order_by('id').values(*RULESET_FIELDS):
+        ruleset = _isoformat(row)
+        ruleset['rules'] = [
+            {field: rules_by_id[rule_id][field] for field in ('id', 'name', 'enabled', 'description', 'rule_query')}
+            for rule_id in members.get(ruleset['id'], [])
+        ]
+        rulesets.append(ruleset)
+
+    return {
+        'version': version,
+        'rulesets': {ruleset['id']: ruleset for ruleset in rulesets},
+        'rules_json': json.dumps(rules),
+        'rulesets_json': json.dumps(rulesets),
+    }
+
+
+def get_catalog():
+    """
+    Return the current catalog: ``rulesets`` by id (with their rules) and
+    ``rules_json``/``rulesets_json``, the serialized lists of all rules and
+    rulesets.
+    """
+    version = catalog_version()
+    key = f'policy_catalog:{version}'
+    catalog = cache.get(key)
+    if catalog is None:
+        catalog = _build(version)
+        cache.set(key, catalog, CACHE_SECONDS)
+    return catalog
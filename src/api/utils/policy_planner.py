@@ -0,0 +1,181 @@
+"""
+SQL planner for policy rules.
+
+Most rule queries are comparisons between a report key and a literal
+(``hardening_index > `70```, ``os == 'Linux'``), membership tests
+(``contains(loaded_kernel_module, 'usb_storage')``) or AND/OR/NOT
+combinations of those. Such rules are translated from the JMESPath AST into
+EXISTS conditions over the report key/value index (api.utils.report_index),
+so one query tells which devices of the fleet comply with a rule.
+
+The translation follows JMESPath semantics exactly: equality is type-strict,
+ordering comparisons only hold between numbers, and ``contains`` tests list
+membership or a substring. Rules using anything else (functions, nested
+fields, projections, truthiness of a bare key) return no plan and are
+evaluated in Python as before.
+"""
+import functools
+import logging
+
+import jmespath
+from django.db.models import Exists, OuterRef, Q, Value
+from django.db.models.functions import Length, StrIndex
+from jmespath.exceptions import JMESPathError
+
+from api.models import Device, DeviceReportKey
+from api.utils.report_index import MAX_VALUE_LENGTH, NON_INDEXED_KEYS
+
+logger = logging.getLogger(__name__)
+
+ORDERING_LOOKUPS = {'lt': 'lt', 'lte': 'lte', 'gt': 'gt', 'gte': 'gte'}
+# Operator to use when the literal is on the left: `70` < x is x > `70`
+FLIPPED_OPERATORS = {'eq': 'eq', 'ne': 'ne', 'lt': 'gt', 'lte': 'gte', 'gt': 'lt', 'gte': 'lte'}
+
+
+class Unplannable(Exception):
+    """Raised internally when part of a rule cannot be translated to SQL."""
+
+
+class RulePlan:
+    """
+    SQL translation of a rule query.
+
+    ``condition`` is a Q over Device matching the devices that comply with
+    the rule. It can only be trusted for devices outside ``undecided``:
+    devices that were never indexed and, for keys tested with contains(),
+    devices where the key is not a non-empty list or a string (JMESPath
+    raises an error there) or where its indexed text was truncated.
+    """
+
+    def __init__(self, condition, keys, contains_keys):
+        self.condition = condition
+        self.keys = keys
+        self.contains_keys = contains_keys
+
+    @property
+    def undecided(self):
+        undecided = Q(report_index_updated_at__isnull=True)
+        for key in self.contains_keys:
+            searchable = _rows(key).filter(Q(item__isnull=False) | Q(value_type='text'))
+            truncated = _rows(key, item__isnull=True, value_type='text').annotate(
+                length=Length('value_text')
+            ).filter(length__gte=MAX_VALUE_LENGTH)
+            undecided |= ~Q(Exists(searchable)) | Q(Exists(truncated))
+        return undecided
+
+
+def _rows(key, **lookups):
+    return DeviceReportKey.objects.filter(device=OuterRef('pk'), key=key, **lookups)
+
+
+def _field(node):
+    if node['type'] != 'field':
+        raise Unplannable(f'unsupported operand {node["type"]}')
+    key = node['value']
+    if key in NON_INDEXED_KEYS:
+        raise Unplannable(f'{key} is not indexed')
+    return key
+
+
+def _literal(node):
+    if node['type'] != 'literal':
+        raise Unplannable(f'unsupported operand {node["type"]}')
+    value = node['value']
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise Unplannable(f'unsupported literal {value!r}')
+    # Indexed text is truncated: only literals shorter than the column compare exactly
+    if isinstance(value, str) and len(value) >= MAX_VALUE_LENGTH:
+        raise Unplannable('literal too long')
+    return value
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _comparison(node):
+    left, right = node['children']
+    op = node['value']
+    if left['type'] == 'literal':
+        left, right, op = right, left, FLIPPED_OPERATORS[op]
+    key, value = _field(left), _literal(right)
+
+    if op == 'ne':
+        return ~_equality(key, value), key
+    if op == 'eq':
+        return _equality(key, value), key
+    if not _is_number(value):
+        # JMESPath ordering comparisons are only defined between numbers
+        raise Unplannable('ordering comparison with a non-number')
+    return Q(Exists(_rows(key, item__isnull=True, value_type='number', **{f'value_num__{ORDERING_LOOKUPS[op]}': value}))), key
+
+
+def _equality(key, value):
+    if _is_number(value):
+        return Q(Exists(_rows(key, item__isnull=True, value_type='number', value_num=value)))
+    return Q(Exists(_rows(key, item__isnull=True, value_type='text', value_text=value)))
+
+
+def _contains(node):
+    if len(node['children']) != 2:
+        raise Unplannable('contains() takes two arguments')
+    key, value = _field(node['children'][0]), _literal(node['children'][1])
+    if not isinstance(value, str) or '|' in value:
+        raise Unplannable('contains() only planned for string literals')
+
+    list_item = _rows(key, item__isnull=False, value_type='text', value_text=value)
+    # StrIndex (instr/strpos) is case-sensitive like JMESPath, unlike LIKE on SQLite
+    substring = _rows(key, item__isnull=True, value_type='text').annotate(
+        position=StrIndex('value_text', Value(value))
+    ).filter(position__gt=0)
+    return Q(Exists(list_item)) | Q(Exists(substring)), key
+
+
+def _translate(node, keys, contains_keys):
+    node_type = node['type']
+    if node_type in ('and_expression', 'or_expression'):
+        left = _translate(node['children'][0], keys, contains_keys)
+        right = _translate(node['children'][1], keys, contains_keys)
+        return left & right if node_type == 'and_expression' else left | right
+    if node_type == 'not_expression':
+        return ~_translate(node['children'][0], keys, contains_keys)
+    if node_type == 'comparator':
+        condition, key = _comparison(node)
+        keys.add(key)
+        return condition
+    if node_type == 'function_expression' and node['value'] == 'contains':
+        condition, key = _contains(node)
+        keys.add(key)
+        contains_keys.add(key)
+        return condition
+    raise Unplannable(f'unsupported expression {node_type}')
+
+
+@functools.lru_cache(maxsize=1024)
+def plan_rule(query):
+    """Return the RulePlan of a rule query, or None when it must be evaluated in Python."""
+    try:
+        ast = jmespath.compile(query).parsed
+        keys, contains_keys = set(), set()
+        condition = _translate(ast, keys, contains_keys)
+    except (JMESPathError, Unplannable) as e:
+        logger.debug('Rule query "%s" evaluated in Python: %s', query, e)
+        return None
+    return RulePlan(condition, frozenset(keys), frozenset(contains_keys))
+
+
+def evaluate_rule_in_sql(query, devices):
+    """
+    Evaluate a rule query for a Device queryset with the report index.
+
+    Returns (compliant_ids, undecided_ids), two sets of device ids; undecided
+    devices must be evaluated in Python. Returns None when the rule cannot be
+    planned.
+    """
+    plan = plan_rule(query)
+    if plan is None:
+        return None
+    scope = Device.objects.filter(id__in=devices.values('id'))
+    undecided = set(scope.filter(plan.undecided).values_list('id', flat=True))
+    compliant = set(scope.filter(plan.condition).values_list('id', flat=True)) - undecided
+    return compliant, undecided
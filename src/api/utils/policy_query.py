@@ -1,3 +1,4 @@
+import functools
 import jmespath
 import logging
 
@@ -37,3 +38,109 @@ def evaluate_query(report, query):
     except Exception as e:
         logging.error(f'Unexpected error evaluating query "{query}": {e}', exc_info=True)
         return None
+
+
+# Nodes whose first child is evaluated against the current value and the
+# remaining children against each element (or the result) of the first one
+_DERIVED_CONTEXT_NODES = {
+    'subexpression', 'index_expression', 'projection', 'value_projection', 'filter_projection', 'pipe',
+}
+# Nodes whose children are all evaluated against the current value
+_SAME_CONTEXT_NODES = {
+    'comparator', 'and_expression', 'or_expression', 'not_expression', 'function_expression',
+    'multi_select_list', 'multi_select_dict', 'key_val_pair', 'flatten',
+}
+
+
+@functools.lru_cache(maxsize=1024)
+def query_fields(query):
+    """
+    Return the frozenset of top-level report keys a query reads.
+
+    Returns None when the query may read any key (it uses ``@`` or ``*`` on
+    the whole report, or cannot be parsed), so callers must treat it as
+    depending on everything.
+    """
+    try:
+        ast = jmespath.compile(query).parsed
+    except jmespath.exceptions.JMESPathError:
+        return None
+
+    fields = set()
+
+    def walk(node, top):
+        node_type = node['type']
+        if node_type == 'field':
+            if top:
+                fields.add(node['value'])
+        elif node_type in ('current', 'identity'):
+            if top:
+                raise LookupError(node_type)
+        elif node_type in _DERIVED_CONTEXT_NODES:
+            walk(node['children'][0], top)
+            for child in node['children'][1:]:
+                walk(child, False)
+        elif node_type in _SAME_CONTEXT_NODES:
+            for child in node['children']:
+                walk(child, top)
+        elif node_type == 'expref':
+            walk(node['children'][0], False)
+        elif node_type not in ('literal', 'index', 'slice'):
+            raise LookupError(node_type)
+
+    try:
+        walk(ast, True)
+    except LookupError:
+        return None
+    return frozenset(fields)
+
+
+_PROJECTION_NODES = {'projection', 'value_projection', 'filter_projection', 'flatten'}
+# Functions whose cost grows with the size of the list they are given
+_SCANNING_FUNCTIONS = {'sort', 'sort_by', 'max_by', 'min_by', 'map', 'join', 'max', 'min', 'sum', 'avg', 'reverse'}
+
+
+def analyze_query(query):
+    """
+    Estimate the cost of a query from its AST.
+
+    Returns a dict with the number of projections, the deepest nesting of
+    filters, and warnings for patterns that walk whole report lists
+    (projections, filters and sorting functions applied to report keys).
+    Raises jmespath.exceptions.JMESPathError when the query is invalid.
+    """
+    ast = jmespath.compile(query).parsed
+    cost = {'projections': 0, 'filter_depth': 0, 'warnings': []}
+
+    def scanned_key(node):
+        # The report key a projection or function walks, when it is a plain key
+        while node and node['type'] in ('flatten', 'index_expression') and node['children']:
+            node = node['children'][0]
+        return node['value'] if node and node['type'] == 'field' else None
+
+    def walk(node, filter_depth):
+        node_type = node['type']
+        if node_type in _PROJECTION_NODES:
+            cost['projections'] += 1
+            key = scanned_key(node['children'][0])
+            if node_type == 'filter_projection':
+                cost['filter_depth'] = max(cost['filter_depth'], filter_depth + 1)
+                if key:
+                    cost['warnings'].append(f'Filters every item of {key}')
+                # Only the filter condition and what follows it run inside the filter
+                walk(node['children'][0], filter_depth)
+                for child in node['children'][1:]:
+                    walk(child, filter_depth + 1)
+                return
+            if key and node_type != 'flatten':
+                cost['warnings'].append(f'Projects every item of {key}')
+        elif node_type == 'function_expression' and node['value'] in _SCANNING_FUNCTIONS:
+            key = scanned_key(node['children'][0]) if node['children'] else None
+            if key:
+                cost['warnings'].append(f'{node["value"]}() walks every item of {key}')
+        for child in node.get('children', []):
+            if isinstance(child, dict):
+                walk(child, filter_depth)
+
+    walk(ast, 0)
+    return cost
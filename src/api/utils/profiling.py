@@ -0,0 +1,134 @@
+"""
+Request profiling helpers used by QueryProfilingMiddleware.
+
+Query statistics are collected through a database execute wrapper, so they
+cost one perf_counter() call per query. The optional cProfile sampler is
+controlled at runtime through the ProfilingSettings row, so it can be
+switched on for a slow endpoint without restarting the server. Each process
+keeps the configuration in its cache for SAMPLING_CACHE_SECONDS, so a change
+reaches every server process within that delay at the cost of one small
+query per process and interval.
+"""
+import cProfile
+import io
+import logging
+import pstats
+import random
+import re
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+
+from api.models import ProfilingSettings
+
+logger = logging.getLogger(__name__)
+
+SAMPLING_CACHE_KEY = 'request_profiling:sampling'
+SAMPLING_CACHE_SECONDS = 5
+
+# Collapse variable-length placeholder lists and literals so that the same
+# statement issued with different parameters is counted as one pattern.
+_IN_LIST_RE = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL_RE = re.compile(r'\b\d+\b')
+
+
+def normalize_sql(sql):
+    """Return a parameter-independent fingerprint of a SQL statement."""
+    sql = _IN_LIST_RE.sub('(...)', sql)
+    sql = _STRING_LITERAL_RE.sub('?', sql)
+    sql = _NUMBER_LITERAL_RE.sub('?', sql)
+    return ' '.join(sql.split())
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper that counts queries and accumulates SQL time.
+
+    Install it with ``connection.execute_wrapper(recorder)``.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+        self.statement_durations = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            fingerprint = normalize_sql(sql)
+            self.count += 1
+            self.duration += elapsed
+            self.statements[fingerprint] += 1
+            self.statement_durations[fingerprint] += elapsed
+
+    def top_repeated(self, limit=5):
+        """Return the most repeated statements as (sql, count, total_seconds) tuples."""
+        return [
+            (sql, count, self.statement_durations[sql])
+            for sql, count in self.statements.most_common(limit)
+            if count > 1
+        ]
+
+
+def get_sampling_config():
+    """
+    Return the active sampling configuration.
+
+    Falls back to REQUEST_PROFILING_SAMPLE_RATE when nothing has been set at runtime.
+    """
+    config = cache.get(SAMPLING_CACHE_KEY)
+    if config is None:
+        stored = ProfilingSettings.objects.first()
+        if stored is None:
+            rate = getattr(settings, 'REQUEST_PROFILING_SAMPLE_RATE', 0.0)
+            config = {'enabled': rate > 0, 'rate': rate, 'path_prefix': ''}
+        else:
+            config = {'enabled': stored.enabled, 'rate': stored.rate, 'path_prefix': stored.path_prefix}
+        cache.set(SAMPLING_CACHE_KEY, config, SAMPLING_CACHE_SECONDS)
+    return config
+
+
+def set_sampling_config(enabled, rate=None, path_prefix=None):
+    """Enable or disable cProfile sampling at runtime and return the new configuration."""
+    config = dict(get_sampling_config())
+    config['enabled'] = bool(enabled)
+    if rate is not None:
+        config['rate'] = min(max(float(rate), 0.0), 1.0)
+    if path_prefix is not None:
+        config['path_prefix'] = path_prefix
+    ProfilingSettings.objects.update_or_create(pk=1, defaults=config)
+    cache.set(SAMPLING_CACHE_KEY, config, SAMPLING_CACHE_SECONDS)
+    logger.info('Request profiling sampling updated: %s', config)
+    return config
+
+
+def should_sample(path):
+    """Decide whether the request for ``path`` should run under cProfile."""
+    config = get_sampling_config()
+    if not config.get('enabled') or config.get('rate', 0) <= 0:
+        return False
+    if config.get('path_prefix') and not path.startswith(config['path_prefix']):
+        return False
+    return random.random() < config['rate']
+
+
+def start_profiler():
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def format_profile(profiler, limit=15):
+    """Stop ``profiler`` and return its top functions by cumulative time."""
+    profiler.disable()
+    output = io.StringIO()
+    stats = pstats.Stats(profiler, stream=output)
+    stats.sort_stats('cumulative').print_stats(limit)
+    return output.getvalue()
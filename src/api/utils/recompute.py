@@ -0,0 +1,149 @@
+"""
+Fleet-wide recomputation of the data derived from each device's latest report.
+
+After a rule edit or a parser upgrade, ``manage.py recompute`` parses the
+latest report of every device again and rewrites the stored compliance
+status and rule results, the report key index and the inventory. Devices
+are processed in chunks of consecutive ids, spread over a process pool;
+each chunk is written in bulk in one transaction, and the id range of every
+finished chunk is saved to a checkpoint file so an interrupted run resumes
+where it stopped.
+"""
+import json
+import logging
+import os
+import time
+
+from django.db import OperationalError, transaction
+from django.utils import timezone
+
+from api.models import Device, DeviceReportKey, RuleEvaluation
+from api.utils.compliance import latest_reports_by_device
+from api.utils.fleet_dashboard import update_aggregates
+from api.utils.inventory import sync_device_inventory
+from api.utils.lynis_report import LynisReport
+from api.utils.report_index import build_rows
+from api.utils.rule_stats import collector as stats_collector
+from api.utils.rule_guard import SKIPPED, evaluate_rule
+
+logger = logging.getLogger(__name__)
+
+TARGETS = ('compliance', 'index', 'inventory')
+CHUNK_ATTEMPTS = 3
+
+
+def chunked(ids, size):
+    return [ids[start:start + size] for start in range(0, len(ids), size)]
+
+
+def _recompute(device_ids, targets):
+    devices = list(Device.objects.filter(id__in=device_ids).prefetch_related('rulesets__rules'))
+    reports = latest_reports_by_device(device_ids)
+    now = timezone.now()
+    changed, evaluations, index_rows, indexed = [], [], [], []
+
+    with transaction.atomic():
+        for device in devices:
+            full_report = reports.get(device.id)
+            report = LynisReport(full_report.full_report).get_parsed_report() if full_report else None
+
+            if 'compliance' in targets:
+                # Same rules as check_device_compliance: every rule of every assigned ruleset
+                compliant = report is not None
+                if report is not None:
+                    for ruleset in device.rulesets.all():
+                        for rule in ruleset.rules.all():
+                            result = evaluate_rule(rule, report)
+                            if result is SKIPPED:
+                                continue
+                            compliant = compliant and bool(result)
+                            evaluations.append(RuleEvaluation(device=device, rule=rule, compliant=bool(result), evaluated_at=now))
+                if device.compliant != compliant:
+                    device.compliant = compliant
+                    device.updated_at = now
+                    changed.append(device)
+            if report is None:
+                continue
+            if 'index' in targets:
+                index_rows.extend(build_rows(device, report, set(report)))
+                indexed.append(device.id)
+            if 'inventory' in targets:
+                sync_device_inventory(device, report)
+
+        if 'compliance' in targets:
+            Device.objects.bulk_update(changed, ['compliant', 'updated_at'], batch_size=500)
+            update_aggregates(changed)
+            RuleEvaluation.objects.filter(device_id__in=device_ids).delete()
+            RuleEvaluation.objects.bulk_create(evaluations, batch_size=1000)
+        if 'index' in targets:
+            DeviceReportKey.objects.filter(device_id__in=device_ids).delete()
+            DeviceReportKey.objects.bulk_create(index_rows, batch_size=1000)
+            Device.objects.filter(id__in=indexed).update(report_index_updated_at=now)
+
+    # Workers may exit before a periodic flush
+    stats_collector.flush()
+    return {'devices': len(devices), 'changed': len(changed)}
+
+
+def recompute_chunk(device_ids, targets):
+    """
+    Recompute ``targets`` for the devices of one chunk and return {'devices', 'changed'}.
+
+    Runs in a pool worker. The chunk is written in one transaction and retried
+    when the database is busy (SQLite allows a single writer at a time).
+    """
+    for attempt in range(1, CHUNK_ATTEMPTS + 1):
+        try:
+            return _recompute(device_ids, targets)
+        except OperationalError as e:
+            if attempt == CHUNK_ATTEMPTS:
+                raise
+            logger.warning('Chunk starting at device %s failed (%s), retrying', device_ids[0], e)
+            time.sleep(attempt)
+
+
+class Checkpoint:
+    """
+    Id ranges of the chunks already recomputed by a run, stored as JSON.
+
+    A range covers every device id between its ends, so only runs over all
+    devices are checkpointed (see the recompute command): a checkpoint is
+    resumed by a full run with the same targets.
+    """
+
+    def __init__(self, path, targets):
+        self.path = path
+        self.targets = sorted(targets)
+        self.done = []
+
+    def load(self):
+        """Load the finished ranges of a previous run; return True if there was one."""
+        try:
+            with open(self.path) as checkpoint_file:
+                data = json.load(checkpoint_file)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            logger.warning('Ignoring unreadable checkpoint %s: %s', self.path, e)
+            return False
+        # Files without the 'devices' scope may hold ranges of a --device run, spanning ids it skipped
+        if data.get('targets') != self.targets or data.get('devices') != 'all':
+            return False
+        self.done = [tuple(id_range) for id_range in data.get('done', [])]
+        return True
+
+    def is_done(self, device_id):
+        return any(first <= device_id <= last for first, last in self.done)
+
+    def mark_done(self, device_ids):
+        self.done.append((device_ids[0], device_ids[-1]))
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w') as checkpoint_file:
+            json.dump({'targets': self.targets, 'devices': 'all', 'done': self.done}, checkpoint_file)
+        os.replace(temporary, self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,142 @@
+"""
+Cold archive for pruned full reports.
+
+Reports are appended to one compressed, append-only segment file per month
+(``reports-YYYY-MM.seg`` in REPORT_ARCHIVE_DIR). Each record is a fixed
+header followed by the zlib-compressed report:
+
+    magic (4 bytes) | report id (8 bytes) | payload length (4 bytes) | payload
+
+The position of every record is stored in ArchivedReport, so reading an old
+report is a single slice of a memory-mapped segment. Enable archiving with
+FULLREPORT_ARCHIVE_HOOK = 'api.utils.report_archive.archive_reports'.
+"""
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+
+from api.models import ArchivedReport, Device
+
+logger = logging.getLogger(__name__)
+
+RECORD_MAGIC = b'TSR1'
+RECORD_HEADER = struct.Struct('>4sQI')
+
+_segment_maps = {}
+_segment_maps_lock = threading.Lock()
+
+
+class ArchiveError(Exception):
+    """Raised when an archived report cannot be read back."""
+
+
+def get_archive_dir():
+    return Path(getattr(settings, 'REPORT_ARCHIVE_DIR', settings.BASE_DIR / 'archive'))
+
+
+def segment_name(created_at):
+    """Return the segment file name for a report received at ``created_at``."""
+    return f'reports-{created_at:%Y-%m}.seg'
+
+
+def _segment_path(segment):
+    if Path(segment).name != segment:
+        raise ArchiveError(f'Invalid segment name: {segment}')
+    return get_archive_dir() / segment
+
+
+def archive_reports(reports):
+    """
+    Append ``reports`` (FullReport instances) to their monthly segments and index them.
+
+    Usable as FULLREPORT_ARCHIVE_HOOK. Any exception propagates, so the
+    caller keeps the reports when they could not be archived.
+    """
+    if not reports:
+        return []
+    devices = Device.objects.in_bulk({report.device_id for report in reports})
+    level = getattr(settings, 'REPORT_ARCHIVE_COMPRESSION_LEVEL', 6)
+
+    by_segment = defaultdict(list)
+    for report in sorted(reports, key=lambda report: report.id):
+        by_segment[segment_name(report.created_at)].append(report)
+
+    archive_dir = get_archive_dir()
+    archive_dir.mkdir(parents=True, exist_ok=True)
+
+    entries = []
+    for segment, segment_reports in by_segment.items():
+        with open(archive_dir / segment, 'ab') as segment_file:
+            # Serialize writers across threads and processes; readers never lock
+            fcntl.flock(segment_file, fcntl.LOCK_EX)
+            try:
+                offset = segment_file.seek(0, os.SEEK_END)
+                for report in segment_reports:
+                    raw = report.full_report.encode('utf-8')
+                    payload = zlib.compress(raw, level)
+                    segment_file.write(RECORD_HEADER.pack(RECORD_MAGIC, report.id, len(payload)))
+                    segment_file.write(payload)
+                    device = devices.get(report.device_id)
+                    entries.append(ArchivedReport(
+                        device=device,
+                        hostid=device.hostid if device else '',
+                        hostname=device.hostname if device else None,
+                        report_id=report.id,
+                        created_at=report.created_at,
+                        segment=segment,
+                        offset=offset,
+                        length=len(payload),
+                        size=len(raw),
+                    ))
+                    offset += RECORD_HEADER.size + len(payload)
+                segment_file.flush()
+                os.fsync(segment_file.fileno())
+            finally:
+                fcntl.flock(segment_file, fcntl.LOCK_UN)
+
+    ArchivedReport.objects.bulk_create(entries)
+    logger.info('Archived %d reports into %d segment(s)', len(entries), len(by_segment))
+    return entries
+
+
+def _get_segment_map(segment, end):
+    """Return a read-only mmap of ``segment`` covering at least ``end`` bytes."""
+    path = _segment_path(segment)
+    with _segment_maps_lock:
+        mapped = _segment_maps.get(path)
+        if mapped is None or len(mapped) < end:
+            # Segments only grow; map again when a record lies past the current mapping.
+            # Old maps are left to the garbage collector as other threads may still read them.
+            try:
+                with open(path, 'rb') as segment_file:
+                    mapped = mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError) as e:
+                raise ArchiveError(f'Cannot open archive segment {segment}: {e}') from e
+            _segment_maps[path] = mapped
+        return mapped
+
+
+def read_archived_report(entry):
+    """Return the raw report text stored for the ArchivedReport ``entry``."""
+    end = entry.offset + RECORD_HEADER.size + entry.length
+    mapped = _get_segment_map(entry.segment, end)
+    if len(mapped) < end:
+        raise ArchiveError(f'Archive segment {entry.segment} is truncated')
+
+    magic, report_id, length = RECORD_HEADER.unpack_from(mapped, entry.offset)
+    if magic != RECORD_MAGIC or report_id != entry.report_id or length != entry.length:
+        raise ArchiveError(f'Archive index does not match segment {entry.segment} at offset {entry.offset}')
+
+    start = entry.offset + RECORD_HEADER.size
+    try:
+        return zlib.decompress(mapped[start:start + length]).decode('utf-8')
+    except (zlib.error, UnicodeDecodeError) as e:
+        raise ArchiveError(f'Corrupted record in {entry.segment} at offset {entry.offset}: {e}') from e
@@ -0,0 +1,42 @@
+"""
+Cache of parsed reports.
+
+A stored report never changes, so it is parsed once and its parsed form
+kept in the default cache for REPORT_BODY_CACHE_SECONDS. The parsed report
+has time-dependent keys (days_since_audit), so entries are also keyed by
+the day, like the cached bodies of the device page. Device pages and the
+impact preview of rules read reports from here.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from api.models import FullReport
+from api.utils.lynis_report import LynisReport
+
+
+def _cache_key(report_id):
+    return f'parsed_report:{report_id}:{timezone.localdate():%Y%m%d}'
+
+
+def parsed_reports(report_ids):
+    """Return {report id: parsed report}; reports not in the cache are read in one query, parsed and cached."""
+    keys = {_cache_key(report_id): report_id for report_id in report_ids}
+    reports = {keys[key]: report for key, report in cache.get_many(list(keys)).items()}
+    missing = [report_id for report_id in keys.values() if report_id not in reports]
+    if missing:
+        parsed = {
+            report_id: LynisReport(full_report).get_parsed_report()
+            for report_id, full_report in FullReport.objects.filter(id__in=missing).values_list('id', 'full_report')
+        }
+        cache.set_many(
+            {_cache_key(report_id): report for report_id, report in parsed.items()},
+            getattr(settings, 'REPORT_BODY_CACHE_SECONDS', 3600),
+        )
+        reports.update(parsed)
+    return reports
+
+
+def parsed_report(report_id):
+    """Return the parsed report ``report_id``, or None if it does not exist."""
+    return parsed_reports([report_id]).get(report_id)
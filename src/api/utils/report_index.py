@@ -0,0 +1,264 @@
+"""
+Key/value index over the latest parsed report of every device.
+
+Each scalar key and each list item of the report is stored as a
+DeviceReportKey row with a text and, when numeric, a number column. The
+value type records whether the parsed value was a number, a string or a
+nested list, so policy rules can be translated exactly (see
+api.utils.policy_planner). With
+composite (key, value) indexes, questions such as
+``hardening_index < 60 AND os == 'Linux'`` become indexed EXISTS queries
+instead of parsing every report.
+
+The index is updated at ingest from the report diff: only the keys that
+changed since the previous report are rewritten.
+"""
+import logging
+import re
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from api.models import DeviceReportKey
+from api.utils.lynis_report import TIME_DEPENDENT_KEYS
+
+logger = logging.getLogger(__name__)
+
+MAX_VALUE_LENGTH = 255
+
+NON_INDEXED_KEYS = TIME_DEPENDENT_KEYS
+
+
+class FleetFilterError(ValueError):
+    """Raised when a fleet filter expression cannot be parsed."""
+
+
+NUMBER_RE = re.compile(r'-?\d+(?:\.\d+)?')
+
+
+def _as_number(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str) and NUMBER_RE.fullmatch(value.strip()):
+        return float(value)
+    return None
+
+
+def _value_type(value):
+    """Return the JMESPath type of a parsed value, as stored in DeviceReportKey.value_type."""
+    if isinstance(value, list):
+        return 'list'
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return 'number'
+    return 'text'
+
+
+def _row(device, key, item, value):
+    value_type = _value_type(value)
+    if isinstance(value, list):
+        value = '|'.join(str(part) for part in value)
+    return DeviceReportKey(
+        device=device,
+        key=key,
+        item=item,
+        value_type=value_type,
+        value_text=str(value)[:MAX_VALUE_LENGTH],
+        value_num=_as_number(value),
+    )
+
+
+def build_rows(device, report, keys):
+    """Return the DeviceReportKey rows of ``keys`` in the parsed ``report``."""
+    rows = []
+    for key in keys:
+        if key in NON_INDEXED_KEYS or key not in report:
+            continue
+        value = report[key]
+        if value is None:
+            continue
+        if isinstance(value, list):
+            rows.extend(_row(device, key, position, item) for position, item in enumerate(value))
+        else:
+            rows.append(_row(device, key, None, value))
+    return rows
+
+
+def index_report(device, report, changed_keys=None):
+    """
+    Update the key/value index of ``device`` from its parsed ``report``.
+
+    ``changed_keys`` is the set of keys that changed since the previous report
+    (see api.utils.lynis_report.diff_keys); only those are rewritten. Pass None,
+    or index a device that was never indexed, to rebuild every key.
+
+    Returns the number of rows written.
+    """
+    full_rebuild = changed_keys is None or device.report_index_updated_at is None
+
+    with transaction.atomic():
+        if full_rebuild:
+            keys = set(report)
+            DeviceReportKey.objects.filter(device=device).delete()
+        else:
+            keys = set(changed_keys) - NON_INDEXED_KEYS
+            if keys:
+                DeviceReportKey.objects.filter(device=device, key__in=keys).delete()
+        rows = build_rows(device, report, keys)
+        DeviceReportKey.objects.bulk_create(rows, batch_size=500)
+
+        device.report_index_updated_at = timezone.now()
+        device.save(update_fields=['report_index_updated_at'])
+
+    logger.debug('Report index of device %s: %d rows written (%s)', device, len(rows), 'full' if full_rebuild else 'incremental')
+    return len(rows)
+
+
+COMPARISON_LOOKUPS = {
+    '==': 'exact',
+    '<': 'lt',
+    '<=': 'lte',
+    '>': 'gt',
+    '>=': 'gte',
+}
+
+
+def key_condition(key, op, value):
+    """
+    Return a Q over Device matching devices where any indexed value of ``key`` satisfies ``op value``.
+
+    Numbers are compared with the numeric column, strings with the text
+    column. ``!=`` matches devices with no value equal to ``value``
+    (including devices without the key). ``contains`` matches a list item
+    equal to ``value`` or a scalar containing ``value``.
+    """
+    if isinstance(value, str) and len(value) > MAX_VALUE_LENGTH:
+        raise FleetFilterError(f'Values longer than {MAX_VALUE_LENGTH} characters cannot be filtered')
+
+    rows = DeviceReportKey.objects.filter(device=OuterRef('pk'), key=key)
+    if op == 'contains':
+        text = str(value)
+        return Q(Exists(rows.filter(Q(item__isnull=False, value_text=text) | Q(item__isnull=True, value_text__contains=text))))
+    if op == '!=':
+        return ~key_condition(key, '==', value)
+    if op not in COMPARISON_LOOKUPS:
+        raise FleetFilterError(f'Unsupported operator: {op}')
+
+    lookup = COMPARISON_LOOKUPS[op]
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return Q(Exists(rows.filter(**{f'value_num__{lookup}': float(value)})))
+    return Q(Exists(rows.filter(**{f'value_text__{lookup}': str(value)})))
+
+
+_TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<lparen>\() |
+        (?P<rparen>\)) |
+        (?P<op>==|!=|<=|>=|<|>) |
+        (?P<and>&&) |
+        (?P<or>\|\|) |
+        (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*") |
+        (?P<number>-?\d+(?:\.\d+)?(?![\w.])) |
+        (?P<word>[^\s()'"<>=!&|]+)
+    )""", re.VERBOSE)
+
+_KEY_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+def _tokenize(text):
+    tokens = []
+    position = 0
+    text = text.strip()
+    while position < len(text):
+        match = _TOKEN_RE.match(text, position)
+        if not match or match.end() == position:
+            raise FleetFilterError(f'Unexpected character at position {position}: {text[position:position + 10]!r}')
+        position = match.end()
+        kind = match.lastgroup
+        token = match.group(kind)
+        if kind == 'word' and token.upper() in ('AND', 'OR', 'NOT', 'CONTAINS'):
+            kind = token.lower()
+        elif kind == 'string':
+            token = re.sub(r'\\(.)', r'\1', token[1:-1])
+        elif kind == 'number':
+            token = float(token) if '.' in token else int(token)
+        tokens.append((kind, token))
+    return tokens
+
+
+class _FilterParser:
+    """
+    Recursive descent parser for fleet filters:
+
+        expression := term (OR term)*
+        term       := factor (AND factor)*
+        factor     := NOT factor | '(' expression ')' | KEY operator VALUE
+        operator   := == | != | < | <= | > | >= | contains
+    """
+
+    def __init__(self, text):
+        self.tokens = _tokenize(text)
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position][0] if self.position < len(self.tokens) else None
+
+    def take(self, *kinds):
+        if self.peek() not in kinds:
+            found = self.tokens[self.position][1] if self.position < len(self.tokens) else 'end of filter'
+            raise FleetFilterError(f'Expected {" or ".join(kinds)}, found {found!r}')
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def parse(self):
+        if not self.tokens:
+            raise FleetFilterError('Empty filter')
+        condition = self.expression()
+        if self.peek() is not None:
+            raise FleetFilterError(f'Unexpected {self.tokens[self.position][1]!r}')
+        return condition
+
+    def expression(self):
+        condition = self.term()
+        while self.peek() == 'or':
+            self.take('or')
+            condition = condition | self.term()
+        return condition
+
+    def term(self):
+        condition = self.factor()
+        while self.peek() == 'and':
+            self.take('and')
+            condition = condition & self.factor()
+        return condition
+
+    def factor(self):
+        if self.peek() == 'not':
+            self.take('not')
+            return ~self.factor()
+        if self.peek() == 'lparen':
+            self.take('lparen')
+            condition = self.expression()
+            self.take('rparen')
+            return condition
+
+        _, key = self.take('word')
+        if not _KEY_RE.match(key):
+            raise FleetFilterError(f'Invalid key name: {key!r}')
+        if key in NON_INDEXED_KEYS:
+            raise FleetFilterError(f'{key} is computed when the report is read and cannot be filtered on')
+        op_kind, op = self.take('op', 'contains')
+        _, value = self.take('string', 'number', 'word')
+        return key_condition(key, op if op_kind == 'op' else 'contains', value)
+
+
+def parse_fleet_filter(text):
+    """
+    Parse a fleet filter such as ``hardening_index < 60 AND os == 'Linux'`` into a Q over Device.
+
+    Raises FleetFilterError when the filter is invalid.
+    """
+    return _FilterParser(text).parse()
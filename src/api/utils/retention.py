@@ -0,0 +1,248 @@
+"""
+Retention policies for stored reports and the history tables.
+
+Full reports are pruned to the newest N per device (see prune_full_reports).
+
+DiffReport, DeviceEvent and ComplianceSnapshot have these optional limits,
+configured in settings (0 disables):
+
+- max age in days: older rows are deleted
+- max rows per device: only the newest rows of each device are kept
+- summary after N days (DiffReport only): the full diff is replaced by the
+  list of changed keys, which keeps the history but drops the values
+
+Rows are always deleted or rewritten in batches of primary keys, so every
+statement touches a bounded number of rows and locks are short-lived.
+"""
+import json
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, OuterRef, Subquery, Sum, TextField
+from django.db.models.functions import Cast, Length
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from api.models import ComplianceSnapshot, Device, DeviceEvent, DiffReport, FullReport
+from api.utils.display_model import forget as forget_diff_displays
+
+logger = logging.getLogger(__name__)
+
+# name -> (model, payload field used to estimate reclaimed space, settings prefix)
+RETENTION_TABLES = {
+    'diffreport': (DiffReport, 'diff_report', 'RETENTION_DIFFREPORT'),
+    'deviceevent': (DeviceEvent, 'metadata', 'RETENTION_DEVICEEVENT'),
+    'compliancesnapshot': (ComplianceSnapshot, 'rulesets_passed', 'RETENTION_COMPLIANCESNAPSHOT'),
+}
+
+
+def get_policy(table):
+    """Return the retention limits configured for ``table`` (a RETENTION_TABLES key)."""
+    model, _, prefix = RETENTION_TABLES[table]
+    policy = {
+        'max_age_days': getattr(settings, f'{prefix}_MAX_AGE_DAYS', 0),
+        'max_rows_per_device': getattr(settings, f'{prefix}_MAX_ROWS_PER_DEVICE', 0),
+    }
+    if model is DiffReport:
+        policy['summary_after_days'] = getattr(settings, f'{prefix}_SUMMARY_AFTER_DAYS', 0)
+    return policy
+
+
+def payload_size(queryset, field):
+    """Return the approximate size in bytes of ``field`` across ``queryset``."""
+    total = queryset.aggregate(total=Sum(Length(Cast(field, TextField()))))['total']
+    return total or 0
+
+
+def summarize_diff(diff):
+    """Return the summary-only form of a diff: the keys that changed, without values."""
+    return {
+        'summary': {
+            'added': sorted(diff.get('added', {})),
+            'removed': sorted(diff.get('removed', {})),
+            'changed': sorted(key for change in diff.get('changed', []) for key in change),
+        }
+    }
+
+
+def is_summary(diff):
+    return isinstance(diff, dict) and 'summary' in diff
+
+
+class RetentionRun:
+    """
+    Applies the retention policy of one table and accumulates statistics.
+
+    With ``dry_run`` nothing is modified; the statistics show what would be done.
+    """
+
+    def __init__(self, table, batch_size=1000, pause=0.0, dry_run=False, now=None):
+        self.model, self.field, _ = RETENTION_TABLES[table]
+        self.policy = get_policy(table)
+        self.batch_size = batch_size
+        self.pause = pause
+        self.dry_run = dry_run
+        self.now = now or timezone.now()
+        self.deleted = 0
+        self.summarized = 0
+        self.bytes_reclaimed = 0
+
+    def run(self):
+        # Later steps only look at unexpired rows, so a dry run does not count a row twice
+        rows = self.model.objects.all()
+        if self.policy['max_age_days']:
+            cutoff = self.now - timedelta(days=self.policy['max_age_days'])
+            self.delete(rows.filter(created_at__lt=cutoff))
+            rows = rows.filter(created_at__gte=cutoff)
+        if self.policy['max_rows_per_device']:
+            self.enforce_max_rows_per_device(rows, self.policy['max_rows_per_device'])
+        if self.policy.get('summary_after_days'):
+            cutoff = self.now - timedelta(days=self.policy['summary_after_days'])
+            self.summarize(rows.filter(created_at__lt=cutoff))
+        return {
+            'deleted': self.deleted,
+            'summarized': self.summarized,
+            'bytes_reclaimed': self.bytes_reclaimed,
+        }
+
+    def _sleep(self):
+        if self.pause:
+            time.sleep(self.pause)
+
+    def delete(self, queryset):
+        """Delete ``queryset`` in batches of at most ``batch_size`` rows."""
+        if self.dry_run:
+            self.deleted += queryset.count()
+            self.bytes_reclaimed += payload_size(queryset, self.field)
+            return
+
+        while True:
+            ids = list(queryset.order_by('id').values_list('id', flat=True)[:self.batch_size])
+            if not ids:
+                break
+            batch = self.model.objects.filter(id__in=ids)
+            self.bytes_reclaimed += payload_size(batch, self.field)
+            deleted, _ = batch.delete()
+            self.deleted += deleted
+            logger.debug('Retention: deleted %d %s rows', deleted, self.model.__name__)
+            self._sleep()
+
+    def enforce_max_rows_per_device(self, rows, max_rows):
+        """Delete all but the newest ``max_rows`` of ``rows`` for every device over the limit."""
+        over_limit = (
+            rows.filter(device__isnull=False)
+            .values('device_id')
+            .annotate(rows=Count('id'))
+            .filter(rows__gt=max_rows)
+            .values_list('device_id', flat=True)
+        )
+        for device_id in list(over_limit):
+            device_rows = rows.filter(device_id=device_id)
+            # The newest rows have the highest ids; everything at or below the cutoff goes
+            cutoff_id = device_rows.order_by('-id').values_list('id', flat=True)[max_rows]
+            self.delete(device_rows.filter(id__lte=cutoff_id))
+
+    def summarize(self, queryset):
+        """Replace full diffs in ``queryset`` with their summary, in batches."""
+        last_id = 0
+        while True:
+            batch = list(
+                queryset.filter(id__gt=last_id).order_by('id').only('id', 'device_id', self.field)[:self.batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            changed = []
+            for row in batch:
+                diff = getattr(row, self.field)
+                if is_summary(diff):
+                    continue
+                summary = summarize_diff(diff or {})
+                self.bytes_reclaimed += max(len(json.dumps(diff)) - len(json.dumps(summary)), 0)
+                setattr(row, self.field, summary)
+                changed.append(row)
+
+            self.summarized += len(changed)
+            if changed and not self.dry_run:
+                self.model.objects.bulk_update(changed, [self.field])
+                forget_diff_displays([row.id for row in changed])
+                # The changelog ETag of a device includes its updated_at (see frontend.views)
+                Device.objects.filter(id__in={row.device_id for row in changed}).update(updated_at=timezone.now())
+                self._sleep()
+
+
+def get_archive_hook():
+    """Return the callable configured in FULLREPORT_ARCHIVE_HOOK, or None."""
+    path = getattr(settings, 'FULLREPORT_ARCHIVE_HOOK', '')
+    return import_string(path) if path else None
+
+
+def prune_full_reports(device_ids=None, measure_size=False):
+    """
+    Keep only the newest N full reports (by id) of each device and delete the rest.
+
+    N is the device license's ``report_retention`` or FULLREPORT_RETENTION_COUNT.
+    Each distinct N is handled with a single set-based DELETE, so pruning one
+    device costs two queries however many reports it has.
+
+    When FULLREPORT_ARCHIVE_HOOK is set, the surplus reports are loaded and
+    passed to the hook first; they are only deleted if the hook succeeds.
+
+    Returns {'deleted': int, 'bytes_reclaimed': int}; the size is only
+    computed with ``measure_size`` since it costs an extra query.
+    """
+    default_keep = getattr(settings, 'FULLREPORT_RETENTION_COUNT', 2)
+    archive_hook = get_archive_hook()
+    devices = Device.objects.all()
+    if device_ids is not None:
+        devices = devices.filter(id__in=device_ids)
+
+    deleted = bytes_reclaimed = 0
+    for retention in set(devices.values_list('licensekey__report_retention', flat=True)):
+        # Never prune a device down to zero reports: the latest one is needed for diffs
+        keep = max(retention or default_keep, 1)
+        group = devices.filter(licensekey__report_retention=retention) if retention is not None \
+            else devices.filter(licensekey__report_retention__isnull=True)
+        nth_newest = FullReport.objects.filter(device_id=OuterRef('device_id')).order_by('-id').values('id')[keep - 1:keep]
+        surplus = FullReport.objects.filter(device__in=group, id__lt=Subquery(nth_newest))
+
+        if archive_hook:
+            reports = list(surplus)
+            if not reports:
+                continue
+            try:
+                archive_hook(reports)
+            except Exception:
+                logger.exception('Full report archive hook failed; %d reports kept', len(reports))
+                continue
+            surplus = FullReport.objects.filter(id__in=[report.id for report in reports])
+
+        if measure_size:
+            bytes_reclaimed += payload_size(surplus, 'full_report')
+        count, _ = surplus.delete()
+        deleted += count
+
+    if deleted:
+        logger.debug('Pruned %d full reports', deleted)
+    return {'deleted': deleted, 'bytes_reclaimed': bytes_reclaimed}
+
+
+def apply_retention(tables=None, batch_size=1000, pause=0.0, dry_run=False):
+    """
+    Apply the retention policies of ``tables`` (default: all, including 'fullreport').
+
+    Returns {table: {'deleted': int, 'summarized': int, 'bytes_reclaimed': int}}.
+    Full reports are not pruned in a dry run.
+    """
+    results = {}
+    for table in tables or ['fullreport', *RETENTION_TABLES]:
+        if table == 'fullreport':
+            if not dry_run:
+                results[table] = {'summarized': 0, **prune_full_reports(measure_size=True)}
+            continue
+        results[table] = RetentionRun(table, batch_size=batch_size, pause=pause, dry_run=dry_run).run()
+        logger.info('Retention %s%s: %s', table, ' (dry run)' if dry_run else '', results[table])
+    return results
@@ -0,0 +1,135 @@
+"""
+Runtime guards for policy rule evaluation.
+
+Every evaluation made by the compliance engine goes through
+``evaluate_rule``, which times it and keeps the latest durations of each
+rule in a rolling window. Rules whose 95th percentile exceeds
+POLICY_RULE_SLOW_MS are flagged (PolicyRule.slow_since) so they show up in
+the policy pages.
+
+A circuit breaker protects ingest and page loads from pathological rules:
+after POLICY_RULE_BREAKER_THRESHOLD consecutive evaluations slower than
+POLICY_RULE_BREAKER_MS, the rule is skipped for POLICY_RULE_BREAKER_COOLDOWN
+seconds, then tried again once. State is kept per process and per rule
+query, so editing a rule starts from a clean state.
+
+Durations and failures are also recorded in api.utils.rule_stats, which
+keeps them in the database for the policy pages.
+"""
+import logging
+import math
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.utils import timezone
+
+from api.models import PolicyRule
+from api.utils import rule_stats
+
+logger = logging.getLogger(__name__)
+
+WINDOW_SIZE = 200
+# Minimum number of samples before a rule can be flagged
+MIN_SAMPLES = 20
+# Recompute the percentile every N samples
+CHECK_EVERY = 10
+
+SKIPPED = 'skipped'
+
+
+def percentile(values, fraction):
+    """Return the nearest-rank percentile of ``values`` (fraction between 0 and 1)."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class RuleGuard:
+    """Per-process evaluation timings and circuit breakers, keyed by (rule id, query)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._counts = {}
+        self._breakers = {}
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+            self._breakers.clear()
+
+    def allow(self, key):
+        """Return False while the breaker of ``key`` is open."""
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if not breaker or breaker['open_until'] is None:
+                return True
+            if time.monotonic() >= breaker['open_until']:
+                # Half-open: let one evaluation through; a slow one opens the breaker again
+                breaker['open_until'] = None
+                breaker['slow'] = max(0, getattr(settings, 'POLICY_RULE_BREAKER_THRESHOLD', 3) - 1)
+                return True
+            return False
+
+    def record(self, key, seconds):
+        """Record one evaluation; return the p95 in milliseconds when it is due for a check, else None."""
+        breaker_ms = getattr(settings, 'POLICY_RULE_BREAKER_MS', 500)
+        threshold = getattr(settings, 'POLICY_RULE_BREAKER_THRESHOLD', 3)
+        with self._lock:
+            samples = self._samples.setdefault(key, deque(maxlen=WINDOW_SIZE))
+            samples.append(seconds)
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+            breaker = self._breakers.setdefault(key, {'slow': 0, 'open_until': None})
+            if threshold and seconds * 1000 > breaker_ms:
+                breaker['slow'] += 1
+                if breaker['slow'] >= threshold:
+                    breaker['open_until'] = time.monotonic() + getattr(settings, 'POLICY_RULE_BREAKER_COOLDOWN', 300)
+                    logger.warning('Rule %s skipped for %ss: %d consecutive evaluations over %sms', key[0],
+                                   getattr(settings, 'POLICY_RULE_BREAKER_COOLDOWN', 300), breaker['slow'], breaker_ms)
+            else:
+                breaker['slow'] = 0
+
+            if len(samples) < MIN_SAMPLES or self._counts[key] % CHECK_EVERY:
+                return None
+            return percentile(samples, 0.95) * 1000
+
+
+guard = RuleGuard()
+
+
+def _update_slow_flag(rule, p95_ms):
+    slow = p95_ms > getattr(settings, 'POLICY_RULE_SLOW_MS', 50)
+    if slow and rule.slow_since is None:
+        rule.slow_since = timezone.now()
+        logger.warning('Rule %s flagged as slow: p95 %.1fms', rule, p95_ms)
+    elif not slow and rule.slow_since is not None:
+        rule.slow_since = None
+    else:
+        return
+    PolicyRule.objects.filter(id=rule.id).update(slow_since=rule.slow_since)
+
+
+def evaluate_rule(rule, report):
+    """
+    Evaluate ``rule`` against a parsed report with timing and the circuit breaker.
+
+    Returns the result of PolicyRule.evaluate (True, False or None on error),
+    or SKIPPED when the breaker of the rule is open.
+    """
+    key = (rule.id, rule.rule_query)
+    if not guard.allow(key):
+        return SKIPPED
+    start = time.perf_counter()
+    result = rule.evaluate(report)
+    elapsed = time.perf_counter() - start
+    p95_ms = guard.record(key, elapsed)
+    if rule.id is not None:
+        rule_stats.collector.record(rule.id, elapsed, failed=result is None)
+        if p95_ms is not None:
+            _update_slow_flag(rule, p95_ms)
+    return result
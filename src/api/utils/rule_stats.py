@@ -0,0 +1,192 @@
+"""
+Per-rule evaluation statistics.
+
+``evaluate_rule`` (api.utils.rule_guard) records the duration and outcome
+of every evaluation here. Each process buffers them per rule and merges the
+buffer every POLICY_RULE_STATS_FLUSH_SECONDS into one RuleEvaluationStats
+row per rule and day: counters, total and maximum time, a fixed-bucket
+histogram for percentiles and the time of the last failure. Rows older than
+POLICY_RULE_STATS_DAYS are deleted when stats are written, so the table
+stays at a few rows per rule.
+
+A failure is an evaluation that raised an error (PolicyRule.evaluate
+returned None). Rules decided in SQL by api.utils.policy_planner are not
+timed per device and do not appear here.
+"""
+import logging
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from api.models import PolicyRule, RuleEvaluationStats
+from api.utils.tasks import defer
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the histogram buckets; a last bucket counts slower evaluations
+HISTOGRAM_BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+def _bucket(ms):
+    for position, bound in enumerate(HISTOGRAM_BOUNDS_MS):
+        if ms <= bound:
+            return position
+    return len(HISTOGRAM_BOUNDS_MS)
+
+
+def _empty():
+    return {
+        'evaluations': 0,
+        'errors': 0,
+        'total_ms': 0.0,
+        'max_ms': 0.0,
+        'histogram': [0] * (len(HISTOGRAM_BOUNDS_MS) + 1),
+        'last_failure_at': None,
+    }
+
+
+def _merge(target, source):
+    target['evaluations'] += source['evaluations']
+    target['errors'] += source['errors']
+    target['total_ms'] += source['total_ms']
+    target['max_ms'] = max(target['max_ms'], source['max_ms'])
+    histogram = list(target['histogram']) or [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+    for position, count in enumerate(source['histogram']):
+        histogram[position] += count
+    target['histogram'] = histogram
+    if source['last_failure_at'] and (not target['last_failure_at'] or source['last_failure_at'] > target['last_failure_at']):
+        target['last_failure_at'] = source['last_failure_at']
+
+
+def histogram_percentile(histogram, max_ms, fraction):
+    """Return the upper bound of the bucket holding the nearest-rank percentile, or None without samples."""
+    total = sum(histogram)
+    if not total:
+        return None
+    rank = max(1, math.ceil(fraction * total))
+    seen = 0
+    for position, count in enumerate(histogram):
+        seen += count
+        if seen >= rank:
+            return HISTOGRAM_BOUNDS_MS[position] if position < len(HISTOGRAM_BOUNDS_MS) else max_ms
+    return max_ms
+
+
+class StatsCollector:
+    """Buffer of evaluation statistics of this process, keyed by rule id."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._last_flush = time.monotonic()
+
+    def record(self, rule_id, seconds, failed):
+        ms = seconds * 1000
+        interval = getattr(settings, 'POLICY_RULE_STATS_FLUSH_SECONDS', 60)
+        with self._lock:
+            entry = self._pending.setdefault(rule_id, _empty())
+            entry['evaluations'] += 1
+            entry['total_ms'] += ms
+            entry['max_ms'] = max(entry['max_ms'], ms)
+            entry['histogram'][_bucket(ms)] += 1
+            if failed:
+                entry['errors'] += 1
+                entry['last_failure_at'] = timezone.now()
+            due = interval and time.monotonic() - self._last_flush >= interval
+            if due:
+                # Schedule one flush; later records start a new interval
+                self._last_flush = time.monotonic()
+        if due:
+            defer(self.flush)
+
+    def take(self):
+        """Return and clear the buffered statistics."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        return pending
+
+    def reset(self):
+        self.take()
+
+    def flush(self):
+        """Write the buffered statistics to the database; return the number of rules updated."""
+        return write_stats(self.take())
+
+
+collector = StatsCollector()
+
+
+def _oldest_day(today):
+    return today - timedelta(days=getattr(settings, 'POLICY_RULE_STATS_DAYS', 7) - 1)
+
+
+def write_stats(pending):
+    """Merge buffered statistics into today's RuleEvaluationStats rows and delete expired rows."""
+    if not pending:
+        return 0
+    today = timezone.localdate()
+    # Rules deleted since they were evaluated are dropped
+    rule_ids = set(PolicyRule.objects.filter(id__in=pending).values_list('id', flat=True))
+    with transaction.atomic():
+        for rule_id in rule_ids:
+            row, _ = RuleEvaluationStats.objects.select_for_update().get_or_create(rule_id=rule_id, day=today)
+            totals = {field: getattr(row, field) for field in _empty()}
+            _merge(totals, pending[rule_id])
+            for field, value in totals.items():
+                setattr(row, field, value)
+            row.save()
+        RuleEvaluationStats.objects.filter(day__lt=_oldest_day(today)).delete()
+    logger.debug('Evaluation statistics written for %d rules', len(rule_ids))
+    return len(rule_ids)
+
+
+def daily_stats(row):
+    """Return the statistics of one RuleEvaluationStats row as a dict (see rule_stats)."""
+    return {
+        'day': row.day,
+        'evaluations': row.evaluations,
+        'errors': row.errors,
+        'error_rate': round(100 * row.errors / row.evaluations, 2) if row.evaluations else 0,
+        'mean_ms': round(row.total_ms / row.evaluations, 3) if row.evaluations else None,
+        'p95_ms': histogram_percentile(row.histogram, row.max_ms, 0.95),
+        'max_ms': round(row.max_ms, 3),
+        'last_failure_at': row.last_failure_at,
+    }
+
+
+def rule_stats(rule_ids=None):
+    """
+    Return the statistics of the retained days per rule id.
+
+    Each value is a dict with evaluations, errors, error_rate (percent),
+    mean_ms, p95_ms, max_ms and last_failure_at. Rules never evaluated are
+    missing from the result.
+    """
+    rows = RuleEvaluationStats.objects.filter(day__gte=_oldest_day(timezone.localdate()))
+    if rule_ids is not None:
+        rows = rows.filter(rule_id__in=rule_ids)
+    totals = {}
+    for row in rows:
+        _merge(totals.setdefault(row.rule_id, _empty()), {field: getattr(row, field) for field in _empty()})
+
+    stats = {}
+    for rule_id, total in totals.items():
+        evaluations = total['evaluations']
+        if not evaluations:
+            continue
+        stats[rule_id] = {
+            'evaluations': evaluations,
+            'errors': total['errors'],
+            'error_rate': round(100 * total['errors'] / evaluations, 2),
+            'mean_ms': round(total['total_ms'] / evaluations, 3),
+            'p95_ms': histogram_percentile(total['histogram'], total['max_ms'], 0.95),
+            'max_ms': round(total['max_ms'], 3),
+            'last_failure_at': total['last_failure_at'],
+        }
+    return stats
@@ -0,0 +1,59 @@
+"""
+Minimal deferred task runner for work that does not need to delay a response.
+
+Tasks run in a small in-process thread pool once the current transaction has
+committed. Housekeeping after an upload (e.g. pruning old reports) is queued
+here so the Lynis client gets its answer without waiting for it.
+
+Set DEFERRED_TASKS_ENABLED = False to run tasks inline (used by the test
+settings so that results are visible as soon as the call returns).
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'DEFERRED_TASKS_WORKERS', 1),
+                thread_name_prefix='deferred-task',
+            )
+        return _executor
+
+
+def _run(func, args, kwargs):
+    close_old_connections()
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception('Deferred task %s failed', getattr(func, '__name__', func))
+    finally:
+        # Worker threads hold their own connection; do not leave it open between tasks
+        connection.close()
+
+
+def defer(func, *args, **kwargs):
+    """
+    Run ``func(*args, **kwargs)`` in the background after the current transaction commits.
+
+    Exceptions are logged, never raised to the caller.
+    """
+    if not getattr(settings, 'DEFERRED_TASKS_ENABLED', True):
+        try:
+            func(*args, **kwargs)
+        except Exception:
+            logger.exception('Task %s failed', getattr(func, '__name__', func))
+        return
+
+    transaction.on_commit(lambda: _get_executor().submit(_run, func, args, kwargs))
@@ -6,9 +6,16 @@ from django.db import DatabaseError
 from django.conf import settings
 from .models import LicenseKey, Device, FullReport, DiffReport, DeviceEvent, EnrollmentSettings
 from .forms import ReportUploadForm
-from api.utils.lynis_report import LynisReport
+from api.utils.lynis_report import LynisReport, diff_keys
 from api.utils.error_responses import internal_error
 from api.utils.license_utils import validate_license, check_license_capacity
+from api.utils.compliance import evaluate_device_compliance
+from api.utils.compliance_history import record_snapshot
+from api.utils.fleet_dashboard import count_evaluations, update_aggregates
+from api.utils.inventory import sync_device_inventory
+from api.utils.report_index import index_report
+from api.utils.retention import prune_full_reports
+from api.utils.tasks import defer
 #from utils.diff_utils import generate_diff, analyze_diff
 import os
 import logging
@@ -105,6 +112,8 @@ def upload_report(request):
                 logging.error(f'Database error retrieving previous report: {e}')
                 return internal_error('Database error while retrieving previous report')
             
+            # Keys changed since the previous report; None means everything must be (re)indexed
+            changed_keys = None
             if latest_full_report:
                 # Generate the diff and save it
                 try:
@@ -118,6 +127,7 @@ def upload_report(request):
                     # Store hostname to preserve it even if device is deleted
                     hostname = device.hostname or report.get('hostname') or device.hostid
                     DiffReport.objects.create(device=device, hostname=hostname, diff_report=diff_data)
+                    changed_keys = diff_keys(diff_data)
                     logging.info(f'Diff created for device {post_hostid}')
                     logging.debug('Changed items: %s', diff_data)
                 except DatabaseError as e:
@@ -132,6 +142,8 @@ def upload_report(request):
             except DatabaseError as e:
                 logging.error(f'Database error saving full report: {e}')
                 return internal_error('Database error while saving report')
+            # Older reports are pruned after the response, outside the upload path
+            defer(prune_full_reports, [device.id])
 
             # Parse the new report
             try:
@@ -150,11 +162,43 @@ def upload_report(request):
                 device.lynis_version = report.get('lynis_version')
                 device.last_update = report.get('report_datetime_end')
                 device.warnings = report.get('warning_count')
+                hardening_index = report.get('hardening_index')
+                device.hardening_index = hardening_index if isinstance(hardening_index, int) else None
+                # Evaluate compliance at ingest so list views never have to; only rules
+                # reading keys changed by this report are evaluated again
+                device.compliant, evaluated, skipped = evaluate_device_compliance(device, report.get_parsed_report(), changed_keys)
+                device.rules_evaluated += evaluated
+                device.rules_skipped += skipped
                 device.save()
             except DatabaseError as e:
                 logging.error(f'Database error updating device: {e}')
                 return internal_error('Database error while updating device')
 
+            try:
+                record_snapshot(device)
+            except DatabaseError as e:
+                # History is not needed to answer the client; a missing snapshot only leaves a gap
+                logging.error(f'Database error recording compliance snapshot: {e}')
+
+            try:
+                sync_device_inventory(device, report.get_parsed_report(), changed_keys)
+            except DatabaseError as e:
+                # Inventory is derived data and can be rebuilt with `manage.py rebuild_inventory`
+                logging.error(f'Database error updating inventory: {e}')
+
+            try:
+                index_report(device, report.get_parsed_report(), changed_keys)
+            except DatabaseError as e:
+                # Derived data as well, rebuilt with `manage.py rebuild_report_index`
+                logging.error(f'Database error updating report index: {e}')
+
+            try:
+                update_aggregates([device], {device.id: report.get_parsed_report()})
+                count_evaluations(evaluated, skipped)
+            except DatabaseError as e:
+                # Dashboard counters are rebuilt with `manage.py rebuild_dashboard`
+                logging.error(f'Database error updating dashboard aggregates: {e}')
+
             logging.info(f'Device updated: {report.get("hostname")}')
             return HttpResponse('OK')
         return HttpResponse('Invalid form data', status=400)
@@ -53,6 +53,13 @@ class DeviceFactory(DjangoModelFactory):
     compliant = True
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Cached response bodies are keyed by row ids, which are reused once a test rolls back."""
+    from django.core.cache import cache
+    cache.clear()
+
+
 @pytest.fixture
 def test_user(db):
     """Create a test user."""
@@ -13,6 +13,8 @@ from api.models import (
     EnrollmentSkipTest,
 )
 from django.forms import inlineformset_factory
+from django.conf import settings
+from api.utils.policy_query import analyze_query
 import jmespath
 
 class DeviceForm(forms.ModelForm):
@@ -53,7 +55,50 @@ class PolicyRulesetForm(forms.ModelForm):
                 field.widget.attrs['disabled'] = 'disabled'
 
 
+def validate_rule_query(rule_query):
+    """
+    Validate a rule query and estimate its cost.
+
+    Returns the stripped query and its cost warnings (see
+    api.utils.policy_query.analyze_query). Raises ValidationError when the
+    query is invalid or over the configured cost limits.
+    """
+    rule_query = rule_query.strip()
+
+    # Validate JMESPath syntax and estimate the cost of the query
+    try:
+        cost = analyze_query(rule_query)
+    except jmespath.exceptions.JMESPathError as e:
+        raise forms.ValidationError(
+            f'Invalid JMESPath query syntax: {str(e)}. '
+            'Please check your query expression. Examples: '
+            'os == \'Linux\', hardening_index > `70`, '
+            'vulnerable_packages_found == `0`'
+        )
+    except Exception as e:
+        raise forms.ValidationError(
+            f'Error validating JMESPath query: {str(e)}'
+        )
+
+    max_projections = getattr(settings, 'POLICY_RULE_MAX_PROJECTIONS', 4)
+    max_filter_depth = getattr(settings, 'POLICY_RULE_MAX_FILTER_DEPTH', 2)
+    if cost['projections'] > max_projections:
+        raise forms.ValidationError(
+            f'Query uses {cost["projections"]} projections; at most {max_projections} are allowed '
+            'because every rule is evaluated for every device.'
+        )
+    if cost['filter_depth'] > max_filter_depth:
+        raise forms.ValidationError(
+            f'Query nests filters {cost["filter_depth"]} levels deep; at most {max_filter_depth} are allowed.'
+        )
+    # Not blocking: shown when the rule is saved
+    return rule_query, cost['warnings']
+
+
 class PolicyRuleForm(forms.ModelForm):
+    # Cost warnings of the validated rule_query (see api.utils.policy_query.analyze_query)
+    cost_warnings = ()
+
     class Meta:
         model = PolicyRule
         fields = ['enabled', 'name', 'description', 'rule_query']
@@ -80,25 +125,17 @@ class PolicyRuleForm(forms.ModelForm):
         rule_query = self.cleaned_data.get('rule_query')
         if not rule_query:
             return rule_query
-        
-        # Strip whitespace
-        rule_query = rule_query.strip()
-        
-        # Validate JMESPath syntax by attempting to compile it
-        try:
-            jmespath.compile(rule_query)
-        except jmespath.exceptions.JMESPathError as e:
-            raise forms.ValidationError(
-                f'Invalid JMESPath query syntax: {str(e)}. '
-                'Please check your query expression. Examples: '
-                'os == \'Linux\', hardening_index > `70`, '
-                'vulnerable_packages_found == `0`'
-            )
-        except Exception as e:
-            raise forms.ValidationError(
-                f'Error validating JMESPath query: {str(e)}'
-            )
-        
+        rule_query, self.cost_warnings = validate_rule_query(rule_query)
+        return rule_query
+
+
+class RuleImpactPreviewForm(forms.Form):
+    """Draft rule query to evaluate against the fleet (see api.utils.impact_preview)."""
+    rule_query = forms.CharField(max_length=255)
+    rule_id = forms.IntegerField(required=False)
+
+    def clean_rule_query(self):
+        rule_query, _ = validate_rule_query(self.cleaned_data['rule_query'])
         return rule_query
 
 
@@ -0,0 +1,109 @@
+// Live activity feed: entries created after the page was loaded are streamed with
+// Server-Sent Events from data-stream-url, or long-polled from data-poll-url when
+// the browser has no EventSource, and listed in the "New activity" panel.
+
+const ACTIVITY_FEED_MAX_ENTRIES = 200;
+
+function describeActivityEntry(entry) {
+    if (entry.kind === 'event') {
+        const labels = {
+            enrolled: 'Device enrolled',
+            deleted: 'Device deleted',
+            license_changed: 'License changed',
+        };
+        return labels[entry.type] || entry.type;
+    }
+    if (entry.summarized) {
+        // Values removed by the retention policy
+        return `${entry.key} ${entry.type}`;
+    }
+    if (entry.type === 'changed') {
+        if (entry.is_array) {
+            return `${entry.key}: ${entry.array_added.length} added, ${entry.array_removed.length} removed`;
+        }
+        return `${entry.key}: ${entry.old_value} → ${entry.new_value}`;
+    }
+    return `${entry.key} ${entry.type}: ${entry.value}`;
+}
+
+function showActivityEntries(panel, entries) {
+    const list = panel.querySelector('#activity-live-entries');
+    entries.forEach(entry => {
+        const item = document.createElement('li');
+        item.className = 'py-1 flex gap-4';
+
+        const time = document.createElement('span');
+        time.className = 'text-gray-500 whitespace-nowrap';
+        time.textContent = new Date(entry.created_at).toLocaleTimeString();
+
+        const host = document.createElement('span');
+        host.className = 'font-medium whitespace-nowrap';
+        host.textContent = entry.hostname || 'Unknown device';
+
+        const text = document.createElement('span');
+        text.className = 'text-gray-700 break-all';
+        text.textContent = describeActivityEntry(entry);
+
+        item.append(time, host, text);
+        // Newest first
+        list.prepend(item);
+    });
+    while (list.children.length > ACTIVITY_FEED_MAX_ENTRIES) {
+        list.lastElementChild.remove();
+    }
+    if (entries.length) {
+        panel.classList.remove('hidden');
+    }
+}
+
+function streamActivity(panel) {
+    const url = `${panel.dataset.streamUrl}?cursor=${encodeURIComponent(panel.dataset.cursor)}`;
+    // On reconnection the browser resumes from the id of the last event received
+    const source = new EventSource(url);
+    source.addEventListener('activity', function(event) {
+        showActivityEntries(panel, JSON.parse(event.data));
+    });
+}
+
+function pollActivity(panel, cursor) {
+    fetch(`${panel.dataset.pollUrl}?cursor=${encodeURIComponent(cursor)}`, {
+        method: 'GET',
+        headers: {
+            'X-Requested-With': 'XMLHttpRequest',
+        },
+    })
+    .then(response => {
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        return response.json();
+    })
+    .then(data => {
+        showActivityEntries(panel, data.entries);
+        pollActivity(panel, data.cursor);
+    })
+    .catch(error => {
+        console.error('Error polling activity:', error);
+        setTimeout(() => pollActivity(panel, cursor), 10000);
+    });
+}
+
+function attachActivityFeed() {
+    const panel = document.getElementById('activity-live');
+    if (!panel) {
+        return;
+    }
+    if ('EventSource' in window) {
+        streamActivity(panel);
+    } else {
+        pollActivity(panel, panel.dataset.cursor);
+    }
+}
+
+// Attach listeners when DOM is ready
+if (document.readyState === 'loading') {
+    document.addEventListener('DOMContentLoaded', attachActivityFeed);
+} else {
+    // DOM is already ready
+    attachActivityFeed();
+}
@@ -0,0 +1,60 @@
+// Sections of the device page (compliance, warnings, suggestions, network, packages)
+// are HTML fragments loaded from their data-section-url when scrolled into view.
+
+function loadDeviceSection(container, url) {
+    fetch(url, {
+        method: 'GET',
+        headers: {
+            'X-Requested-With': 'XMLHttpRequest',
+        },
+    })
+    .then(response => {
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        return response.text();
+    })
+    .then(html => {
+        container.innerHTML = html;
+    })
+    .catch(error => {
+        console.error('Error loading section:', error);
+        container.innerHTML = '<p class="text-sm text-red-600">Failed to load this section.</p>';
+    });
+}
+
+function attachDeviceSectionListeners() {
+    const containers = document.querySelectorAll('[data-section-url]');
+
+    if ('IntersectionObserver' in window) {
+        const observer = new IntersectionObserver(function(entries) {
+            entries.forEach(function(entry) {
+                if (entry.isIntersecting) {
+                    observer.unobserve(entry.target);
+                    loadDeviceSection(entry.target, entry.target.dataset.sectionUrl);
+                }
+            });
+        }, { rootMargin: '200px' });
+        containers.forEach(container => observer.observe(container));
+    } else {
+        containers.forEach(container => loadDeviceSection(container, container.dataset.sectionUrl));
+    }
+
+    // Pagination links of a section reload the section in place
+    document.addEventListener('click', function(event) {
+        const link = event.target.closest('a[data-section-link]');
+        if (!link) {
+            return;
+        }
+        event.preventDefault();
+        loadDeviceSection(link.closest('[data-section-url]'), link.getAttribute('href'));
+    });
+}
+
+// Attach listeners when DOM is ready
+if (document.readyState === 'loading') {
+    document.addEventListener('DOMContentLoaded', attachDeviceSectionListeners);
+} else {
+    // DOM is already ready
+    attachDeviceSectionListeners();
+}
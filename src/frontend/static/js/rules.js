@@ -72,6 +72,7 @@ function loadRuleDetails(ruleId) {
         if (queryField) queryField.value = '';
         if (idField) idField.value = '';
         hideRuleFormErrors();
+        resetRuleImpact();
         return;
     }
     
@@ -105,6 +106,7 @@ function loadRuleDetails(ruleId) {
     if (queryField) queryField.value = rule.rule_query;
     if (idField) idField.value = rule.id;
     hideRuleFormErrors();
+    resetRuleImpact();
 }
 function toggleRuleStatus() {
     const checkbox = document.getElementById('rule_enabled');
@@ -151,6 +153,99 @@ function submitRuleForm() {
     });
 }
 
+// Evaluate the draft query against every device in the background and poll for progress
+let rulePreviewTimer = null;
+
+function previewRuleImpact() {
+    const form = document.getElementById('rule-edit-form');
+    const container = document.getElementById('rule-preview');
+    const summary = document.getElementById('rule-preview-summary');
+    const samples = document.getElementById('rule-preview-samples');
+    const formData = new FormData();
+    formData.append('rule_query', document.getElementById('rule_query').value);
+    formData.append('rule_id', document.getElementById('rule_id').value);
+    formData.append('csrfmiddlewaretoken', form.querySelector('[name=csrfmiddlewaretoken]').value);
+
+    clearTimeout(rulePreviewTimer);
+    hideRuleFormErrors();
+    container.classList.remove('hidden');
+    document.getElementById('rule-preview-progress').style.width = '0%';
+    summary.textContent = 'Starting...';
+    samples.innerHTML = '';
+
+    fetch('/rules/preview/', {
+        method: 'POST',
+        body: formData,
+        headers: {
+            'X-Requested-With': 'XMLHttpRequest',
+        },
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            pollRuleImpact(data.status_url);
+        } else {
+            container.classList.add('hidden');
+            showRuleFormErrors(data.errors);
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        summary.textContent = 'The preview could not be started.';
+    });
+}
+
+function resetRuleImpact() {
+    clearTimeout(rulePreviewTimer);
+    const container = document.getElementById('rule-preview');
+    if (container) container.classList.add('hidden');
+}
+
+function pollRuleImpact(statusUrl) {
+    fetch(statusUrl, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+    .then(response => response.json())
+    .then(data => {
+        showRuleImpact(data);
+        if (data.status === 'pending' || data.status === 'running') {
+            rulePreviewTimer = setTimeout(() => pollRuleImpact(statusUrl), 1000);
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        document.getElementById('rule-preview-summary').textContent = 'Lost track of the preview.';
+    });
+}
+
+function showRuleImpact(data) {
+    const result = data.result || {};
+    const summary = document.getElementById('rule-preview-summary');
+    const samples = document.getElementById('rule-preview-samples');
+    document.getElementById('rule-preview-progress').style.width = `${data.percent}%`;
+
+    if (data.status === 'failed') {
+        summary.textContent = `The preview failed: ${data.error}`;
+        return;
+    }
+    let text = `${data.processed} of ${data.total} devices: ${result.passed || 0} pass, ${result.failed || 0} fail`;
+    if (result.errors) text += `, ${result.errors} errors`;
+    if (result.no_report) text += `, ${result.no_report} without report`;
+    if (result.assigned) {
+        text += `. Of the ${result.assigned} devices using this rule, ${result.newly_failing} would start failing it and ${result.newly_passing} would start passing it`;
+    }
+    summary.textContent = data.status === 'done' ? `${text}.` : `${text}...`;
+
+    samples.innerHTML = '';
+    (result.failing_samples || []).forEach(device => {
+        const li = document.createElement('li');
+        const link = document.createElement('a');
+        link.href = `/device/${device.id}/`;
+        link.className = 'text-blue-600 hover:text-blue-800';
+        link.textContent = device.hostname || `Device ${device.id}`;
+        li.appendChild(link);
+        samples.appendChild(li);
+    });
+}
+
 // Show form errors
 function showRuleFormErrors(errors) {
     const errorContainer = document.getElementById('rule-form-errors');
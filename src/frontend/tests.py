@@ -5,7 +5,8 @@ from django.urls import reverse
 from django.contrib.auth.models import User
 from django.utils import timezone
 from datetime import timedelta
-from api.models import Device, FullReport, DiffReport, EnrollmentSettings, EnrollmentPlugin, EnrollmentPackage, EnrollmentSkipTest
+from api.models import Device, DeviceEvent, FullReport, DiffReport, EnrollmentSettings, EnrollmentPlugin, EnrollmentPackage, EnrollmentSkipTest
+from api.utils.lynis_report import LynisReport
 from frontend.templatetags import custom_filters
 from frontend.views import DEVICE_LIST_PAGE_SIZE
 from frontend.forms import (
@@ -288,6 +289,133 @@ class TestDeviceListPagination:
         assert len(page_obj.object_list) == total_devices - DEVICE_LIST_PAGE_SIZE
         assert response.context['is_paginated'] is True
 
+    def test_device_list_compliance_trend(self, test_user, test_device):
+        from api.models import ComplianceTrend
+
+        today = timezone.localdate()
+        ComplianceTrend.objects.create(day=today - timedelta(days=1), devices=4, compliant=2, hardening_index_sum=240, hardening_index_count=4)
+        ComplianceTrend.objects.create(day=today, devices=4, compliant=3, hardening_index_sum=280, hardening_index_count=4)
+
+        client = Client()
+        client.force_login(test_user)
+        response = client.get(reverse('device_list'))
+
+        assert response.status_code == 200
+        assert [day['compliant_percent'] for day in response.context['trend']] == [50.0, 75.0]
+        assert response.context['trend_compliance_points'] == '0.0,50.0 600.0,25.0'
+        assert b'id="compliance-trend"' in response.content
+
+    def test_dashboard_shows_fleet_counters(self, test_user, test_device):
+        from api.utils.fleet_dashboard import update_aggregates
+
+        test_device.last_update = timezone.now() - timedelta(days=30)
+        test_device.save()
+        update_aggregates([test_device], {test_device.id: {'warning': [['SSH-7408', 'Weak SSH configuration']]}})
+
+        client = Client()
+        client.force_login(test_user)
+        response = client.get(reverse('index'))
+
+        assert response.status_code == 200
+        assert response.context['dashboard']['devices'] == 1
+        assert response.context['dashboard']['stale'] == 1
+        assert response.context['stale_devices'] == [test_device]
+        assert b'SSH-7408' in response.content
+        assert b'id="stale-devices"' in response.content
+
+    def test_device_list_fleet_filter(self, test_user, test_license_key, sample_lynis_report):
+        from api.utils.report_index import index_report
+        client = Client()
+        client.force_login(test_user)
+        self._create_devices(test_license_key, 3, sample_lynis_report)
+        for i, device in enumerate(Device.objects.order_by('hostid')):
+            index_report(device, {'hardening_index': 50 + i * 10, 'os': 'Linux'})
+
+        response = client.get(reverse('device_list'), {'q': "hardening_index < 65 AND os == 'Linux'"})
+        assert response.status_code == 200
+        assert {device.hostname for device in response.context['devices']} == {'device-0', 'device-1'}
+        assert 'q=hardening_index' in response.context['pagination_query']
+
+        response = client.get(reverse('device_list'), {'q': 'hardening_index <'})
+        assert response.status_code == 200
+        assert response.context['paginator'].count == 0
+        assert response.context['filter_error']
+
+
+@pytest.mark.django_db
+class TestDeviceExport:
+    """Tests for the streaming fleet export."""
+
+    def _create_devices(self, license_key):
+        from api.utils.report_index import index_report
+        for i in range(3):
+            device = Device.objects.create(
+                licensekey=license_key, hostid=f'export-{i}', hostid2=f'export2-{i}', hostname=f'device-{i}',
+                os='Linux', hardening_index=50 + i * 10, compliant=i != 1,
+            )
+            index_report(device, {'hardening_index': 50 + i * 10, 'os': 'Linux', 'kernel_version': f'6.{i}'})
+
+    def test_export_csv_with_report_columns_and_filter(self, test_user, test_license_key):
+        import csv
+        import io
+        client = Client()
+        client.force_login(test_user)
+        self._create_devices(test_license_key)
+
+        response = client.get(reverse('device_export'), {
+            'columns': 'hostname,compliant,report.kernel_version',
+            'q': 'hardening_index < 65',
+        })
+
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'text/csv'
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        assert rows == [
+            ['hostname', 'compliant', 'report.kernel_version'],
+            ['device-0', 'true', '6.0'],
+            ['device-1', 'false', '6.1'],
+        ]
+
+    def test_export_csv_escapes_formulas(self, test_user, test_device):
+        import csv
+        import io
+        from api.utils.report_index import index_report
+        client = Client()
+        client.force_login(test_user)
+        Device.objects.filter(id=test_device.id).update(hostname='=HYPERLINK("http://example.com")')
+        index_report(test_device, {'hardening_index': -1, 'os': '@SUM(A1)', 'kernel_version': '+6.1'})
+
+        response = client.get(reverse('device_export'), {
+            'columns': 'hostname,report.os,report.kernel_version,report.hardening_index',
+        })
+
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        # Numbers are not formulas, negative ones included
+        assert rows[1] == ['\'=HYPERLINK("http://example.com")', "'@SUM(A1)", "'+6.1", '-1']
+
+    def test_export_ndjson(self, test_user, test_license_key):
+        client = Client()
+        client.force_login(test_user)
+        self._create_devices(test_license_key)
+
+        response = client.get(reverse('device_export'), {'format': 'ndjson'})
+
+        assert response['Content-Type'] == 'application/x-ndjson'
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        assert len(lines) == 3
+        first = json.loads(lines[0])
+        assert first['hostname'] == 'device-0'
+        assert first['license'] == test_license_key.name
+        assert first['hardening_index'] == 50
+
+    def test_export_rejects_unknown_column_and_format(self, test_user):
+        client = Client()
+        client.force_login(test_user)
+
+        assert client.get(reverse('device_export'), {'columns': 'password'}).status_code == 400
+        assert client.get(reverse('device_export'), {'format': 'xml'}).status_code == 400
+        assert client.get(reverse('device_export'), {'q': 'hardening_index <'}).status_code == 400
+
 
 @pytest.mark.django_db
 class TestDeviceDelete:
@@ -433,6 +561,33 @@ class TestActivityView:
         added_block = next(block for block in first_entry['type_blocks'] if block['type'] == 'added')
         assert added_block['count'] == 4
 
+    def test_activity_view_shows_summarized_diffs_by_key(self, test_user, test_device, settings):
+        """A diff summarized by the retention policy after it was displayed is shown by key name."""
+        from api.utils.retention import apply_retention
+        settings.RETENTION_DIFFREPORT_SUMMARY_AFTER_DAYS = 30
+        client = Client()
+        client.force_login(test_user)
+        diff = DiffReport.objects.create(
+            device=test_device,
+            diff_report={
+                'added': {'nft_version': ['1.0.0']},
+                'removed': {},
+                'changed': [{'hardening_index': {'old': '60', 'new': '65'}}],
+            },
+        )
+        DiffReport.objects.filter(id=diff.id).update(created_at=timezone.now() - timedelta(days=60))
+        assert b'1.0.0' in client.get(reverse('activity')).content
+
+        apply_retention(tables=['diffreport'])
+        response = client.get(reverse('activity'))
+
+        assert response.status_code == 200
+        blocks = {block['type']: block['activities'] for block in response.context['grouped_activities'][0]['type_blocks']}
+        assert [(activity['key'], activity['summarized']) for activity in blocks['added']] == [('nft_version', True)]
+        assert [activity['key'] for activity in blocks['changed']] == ['hardening_index']
+        assert b'Values removed by the retention policy' in response.content
+        assert b'1.0.0' not in response.content
+
     def test_activity_view_groups_events_by_time(
         self, test_user, test_device, monkeypatch
     ):
@@ -541,6 +696,132 @@ class TestActivityFilters:
         assert custom_filters.value_delta('foo', 'bar') == ''
 
 
+@pytest.mark.django_db
+class TestActivityFeed:
+    """Tests for the live activity feed (Server-Sent Events and long-polling)."""
+
+    @pytest.fixture(autouse=True)
+    def feed_settings(self, settings):
+        from api.utils import activity_feed
+
+        settings.ACTIVITY_FEED_POLL_SECONDS = 0.01
+        settings.ACTIVITY_FEED_STREAM_SECONDS = 0.05
+        # The head of the feed is kept per process across tests
+        activity_feed.notify()
+
+    def create_activity(self, device):
+        from api.models import ActivityIgnorePattern, Organization
+
+        org = Organization.objects.first() or Organization.objects.create(name='Default', slug='default')
+        ActivityIgnorePattern.objects.create(organization=org, key_pattern='uptime_*')
+        DiffReport.objects.create(device=device, hostname=device.hostname, diff_report={
+            'added': {'installed_package': ['openssl']},
+            'removed': {},
+            'changed': [{'uptime_in_days': {'old': 1, 'new': 2}}],
+        })
+        DeviceEvent.objects.create(device=device, event_type='license_changed')
+
+    def test_read_returns_activity_after_cursor(self, test_device):
+        from api.utils import activity_feed
+
+        cursor = activity_feed.head(refresh=True)
+        self.create_activity(test_device)
+
+        entries, next_cursor = activity_feed.read(cursor)
+
+        # The uptime change is silenced
+        assert [(entry['kind'], entry['type']) for entry in entries] == [('change', 'added'), ('event', 'license_changed')]
+        assert entries[0]['value'] == 'openssl'
+        assert next_cursor == activity_feed.head(refresh=True)
+        assert activity_feed.read(next_cursor) == ([], next_cursor)
+
+    def test_saved_activity_refreshes_head(self, test_device, django_capture_on_commit_callbacks, settings):
+        from api.utils import activity_feed
+
+        settings.ACTIVITY_FEED_POLL_SECONDS = 3600
+        cursor = activity_feed.head(refresh=True)
+        assert not activity_feed.has_news(cursor)
+        with django_capture_on_commit_callbacks(execute=True):
+            DeviceEvent.objects.create(device=test_device, event_type='enrolled')
+        assert activity_feed.has_news(cursor)
+
+    def test_poll(self, test_user, test_device):
+        from api.utils import activity_feed
+
+        client = Client()
+        client.force_login(test_user)
+        cursor = activity_feed.encode_cursor(*activity_feed.head(refresh=True))
+        self.create_activity(test_device)
+
+        response = client.get(reverse('activity_poll'), {'cursor': cursor, 'wait': '0'})
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data['entries']) == 2
+
+        response = client.get(reverse('activity_poll'), {'cursor': data['cursor'], 'wait': '0'})
+        assert response.json() == {'entries': [], 'cursor': data['cursor']}
+        assert client.get(reverse('activity_poll'), {'cursor': 'nope'}).status_code == 400
+
+    def test_stream(self, test_user, test_device):
+        from api.utils import activity_feed
+
+        client = Client()
+        client.force_login(test_user)
+        cursor = activity_feed.encode_cursor(*activity_feed.head(refresh=True))
+        self.create_activity(test_device)
+
+        response = client.get(reverse('activity_stream'), HTTP_LAST_EVENT_ID=cursor)
+        assert response['Content-Type'] == 'text/event-stream'
+        body = b''.join(response.streaming_content).decode()
+        assert body.startswith('retry: ')
+        assert f'id: {activity_feed.encode_cursor(*activity_feed.head(refresh=True))}\nevent: activity\n' in body
+        assert 'openssl' in body
+
+    def test_wsgi_stream_is_short_and_releases_connection(self, test_user, monkeypatch, settings):
+        """Under WSGI the stream ends early and the waiting thread closes its connection between checks."""
+        import time
+        from api.utils import activity_feed
+        settings.ACTIVITY_FEED_POLL_SECONDS = 0.05
+        monkeypatch.setattr('frontend.views.ACTIVITY_STREAM_WSGI_MAX_SECONDS', 0.2)
+        released = []
+        monkeypatch.setattr(activity_feed, 'release_connection', lambda: released.append(True))
+        client = Client()
+        client.force_login(test_user)
+
+        start = time.monotonic()
+        body = b''.join(client.get(reverse('activity_stream')).streaming_content).decode()
+
+        assert time.monotonic() - start < 5
+        assert body.startswith('retry: ') and ': keepalive' in body
+        assert released
+
+    def test_async_stream(self, test_device):
+        from asgiref.sync import async_to_sync
+        from api.utils import activity_feed
+        from frontend.views import _async_activity_events
+
+        cursor = activity_feed.head(refresh=True)
+        self.create_activity(test_device)
+
+        async def first_message():
+            async for message in _async_activity_events(cursor, 1):
+                if message.startswith('id: '):
+                    return message
+
+        assert 'license_changed' in async_to_sync(first_message)()
+
+    def test_activity_page_starts_feed_at_latest_activity(self, test_user, test_device):
+        from api.utils import activity_feed
+
+        self.create_activity(test_device)
+        client = Client()
+        client.force_login(test_user)
+        response = client.get(reverse('activity'))
+
+        assert response.context['feed_cursor'] == activity_feed.encode_cursor(*activity_feed.head(refresh=True))
+        assert b'id="activity-live"' in response.content
+
+
 @pytest.mark.django_db
 class TestDeviceExportPDF:
     """Tests for the device_export_pdf endpoint."""
@@ -672,6 +953,154 @@ class TestDeviceExportPDF:
         assert response.status_code == 500
         assert response.content == b'Failed to parse the report'
 
+    def test_export_pdf_reuses_stored_export(self, test_user, test_device, sample_lynis_report, monkeypatch):
+        """The PDF is rendered once per report and rendered again for a new report."""
+        from api.models import DevicePdfExport
+        calls = []
+
+        def fake_render(device, full_report):
+            calls.append(full_report.id)
+            return 'test-server', b'%PDF-' + str(full_report.id).encode()
+
+        monkeypatch.setattr('api.utils.pdf_export.render_pdf', fake_render)
+        client = Client()
+        client.force_login(test_user)
+        FullReport.objects.create(device=test_device, full_report=sample_lynis_report)
+        url = reverse('device_export_pdf', kwargs={'device_id': test_device.id})
+
+        first = client.get(url)
+        second = client.get(url)
+        assert first.content == second.content
+        assert len(calls) == 1
+        assert 'test-server' in second['Content-Disposition']
+
+        report = FullReport.objects.create(device=test_device, full_report=sample_lynis_report)
+        third = client.get(url)
+        assert third.content == b'%PDF-' + str(report.id).encode()
+        assert DevicePdfExport.objects.filter(device=test_device).count() == 1
+
+    def test_export_pdf_pending_page(self, test_user, test_device, sample_lynis_report, settings):
+        """While the PDF renders in the background, a page reloading itself is returned."""
+        settings.DEFERRED_TASKS_ENABLED = True
+        client = Client()
+        client.force_login(test_user)
+        FullReport.objects.create(device=test_device, full_report=sample_lynis_report)
+
+        response = client.get(reverse('device_export_pdf', kwargs={'device_id': test_device.id}))
+
+        assert response.status_code == 202
+        assert b'http-equiv="refresh"' in response.content
+
+    def test_export_pdf_bulk_zip(self, test_user, test_device, test_license_key, sample_lynis_report, monkeypatch):
+        """The bulk export streams a zip with one PDF per device of the license that has a report."""
+        import io
+        import zipfile
+
+        monkeypatch.setattr(
+            'api.utils.pdf_export.render_pdf',
+            lambda device, full_report: (f'host-{device.id}', b'%PDF-bulk'),
+        )
+        client = Client()
+        client.force_login(test_user)
+        other = Device.objects.create(licensekey=test_license_key, hostid='bulk-1', hostid2='bulk-2')
+        Device.objects.create(licensekey=test_license_key, hostid='bulk-3', hostid2='bulk-4')  # no report
+        for device in (test_device, other):
+            FullReport.objects.create(device=device, full_report=sample_lynis_report)
+
+        response = client.get(reverse('device_export_pdf_bulk'), {'license': test_license_key.id})
+
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'application/zip'
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        assert sorted(archive.namelist()) == sorted(
+            f'device-host-{device.id}-{device.id}.pdf' for device in (test_device, other)
+        )
+        assert archive.read(f'device-host-{other.id}-{other.id}.pdf') == b'%PDF-bulk'
+
+    def test_export_pdf_bulk_loads_rulesets_once(self, test_user, test_license_key, sample_lynis_report, monkeypatch):
+        """The rulesets and rules of every device are read with one prefetch, whatever the number of devices."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from api.models import PolicyRule, PolicyRuleset
+        from api.utils.pdf_export import export_archive
+
+        monkeypatch.setattr(
+            'api.utils.pdf_export.render_pdf',
+            lambda device, full_report: (f'host-{device.id}', b'%PDF-bulk'),
+        )
+        ruleset = PolicyRuleset.objects.create(name='Baseline', description='', created_by=test_user)
+        ruleset.rules.add(
+            PolicyRule.objects.create(name='Linux', description='', rule_query="os == 'Linux'"),
+            PolicyRule.objects.create(name='Hardened', description='', rule_query='hardening_index > `50`'),
+        )
+        for index in range(3):
+            device = Device.objects.create(licensekey=test_license_key, hostid=f'bulk-{index}', hostid2=f'bulk-{index}-2')
+            device.rulesets.add(ruleset)
+            FullReport.objects.create(device=device, full_report=sample_lynis_report)
+
+        with CaptureQueriesContext(connection) as queries:
+            b''.join(export_archive(Device.objects.order_by('id')))
+
+        rule_queries = [query for query in queries.captured_queries if 'FROM "api_policyrule"' in query['sql']]
+        assert len(rule_queries) == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_export_pdf_bulk_renders_in_background(self, test_user, test_device, test_license_key,
+                                                   sample_lynis_report, settings, monkeypatch):
+        """Missing PDFs are rendered by deferred tasks, once each, and a stuck one is listed in errors.txt."""
+        import io
+        import threading
+        import time
+        import zipfile
+        from api.models import DevicePdfExport
+        from api.utils.pdf_export import start_export
+
+        settings.DEFERRED_TASKS_ENABLED = True
+        settings.PDF_EXPORT_TIMEOUT = 1
+        monkeypatch.setattr('api.utils.pdf_export.ARCHIVE_POLL_SECONDS', 0.05)
+        stuck = Device.objects.create(licensekey=test_license_key, hostid='bulk-1', hostid2='bulk-2')
+        for device in (test_device, stuck):
+            FullReport.objects.create(device=device, full_report=sample_lynis_report)
+        release = threading.Event()
+        calls = []
+
+        def fake_render(device, full_report):
+            calls.append(device.id)
+            if device.id == stuck.id:
+                release.wait(10)
+            return f'host-{device.id}', b'%PDF-bulk'
+
+        monkeypatch.setattr('api.utils.pdf_export.render_pdf', fake_render)
+        released = []
+        monkeypatch.setattr('api.utils.pdf_export.release_connection', lambda: released.append(True))
+        # Queued by a single download before the bulk export: not rendered again
+        start_export(test_device)
+        client = Client()
+        client.force_login(test_user)
+
+        try:
+            response = client.get(reverse('device_export_pdf_bulk'), {'license': test_license_key.id})
+            archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        finally:
+            release.set()
+
+        assert sorted(archive.namelist()) == [f'device-host-{test_device.id}-{test_device.id}.pdf', 'errors.txt']
+        assert archive.read('errors.txt') == f'device {stuck.id}: not rendered\n'.encode()
+        # The connection is released while waiting for the stuck export
+        assert released
+        deadline = time.monotonic() + 10
+        while DevicePdfExport.objects.filter(device=stuck, status='done').count() == 0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert sorted(calls) == sorted([test_device.id, stuck.id])
+
+    def test_export_pdf_bulk_requires_source(self, test_user):
+        client = Client()
+        client.force_login(test_user)
+
+        response = client.get(reverse('device_export_pdf_bulk'))
+
+        assert response.status_code == 400
+
 
 @pytest.mark.django_db
 class TestDeviceReportViews:
@@ -713,6 +1142,160 @@ class TestDeviceReportViews:
         assert data['hostname'] == 'test-server'
         assert data['hardening_index'] == 65
 
+    def test_device_report_history_includes_archive(self, test_user, test_device, sample_lynis_report, settings, tmp_path):
+        from api.utils.report_archive import archive_reports
+        settings.REPORT_ARCHIVE_DIR = tmp_path
+        client = Client()
+        client.force_login(test_user)
+
+        old_report = FullReport.objects.create(device=test_device, full_report=sample_lynis_report)
+        entry = archive_reports([old_report])[0]
+        old_report.delete()
+        current = FullReport.objects.create(device=test_device, full_report=sample_lynis_report)
+
+        response = client.get(reverse('device_report_history', kwargs={'device_id': test_device.id}))
+
+        assert response.status_code == 200
+        history = json.loads(response.content)
+        assert [item['source'] for item in history] == ['current', 'archive']
+        assert history[0]['report_id'] == current.id
+
+        response = client.get(history[1]['url'])
+        assert response.status_code == 200
+        assert json.loads(response.content)['hostname'] == 'test-server'
+        assert history[1]['url'] == reverse('device_report_archived', args=[test_device.id, entry.id])
+
+    def test_device_report_conditional_get(self, test_user, test_device, sample_lynis_report, sample_lynis_report_updated, django_assert_num_queries):
+        client = Client()
+        client.force_login(test_user)
+        FullReport.objects.create(device=test_device, full_report=sample_lynis_report)
+        url = reverse('device_report_json', kwargs={'device_id': test_device.id})
+
+        response = client.get(url)
+        etag = response['ETag']
+        assert etag.startswith('"report-')
+        assert 'Last-Modified' in response
+
+        # Session and user, then the latest report id: the report text is not read
+        with django_assert_num_queries(3):
+            not_modified = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert not_modified.status_code == 304
+        assert not_modified.content == b''
+
+        FullReport.objects.create(device=test_device, full_report=sample_lynis_report_updated)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response['ETag'] != etag
+        assert json.loads(response.content)['hardening_index'] == 70
+
+    def test_device_report_changelog_etag_changes_with_new_diff(self, test_user, test_device):
+        client = Client()
+        client.force_login(test_user)
+        url = reverse('device_report_changelog', kwargs={'device_id': test_device.id})
+        assert client.get(url).status_code == 404
+
+        DiffReport.objects.create(device=test_device, diff_report={'added': {'a': 1}})
+        response = client.get(url)
+        etag = response['ETag']
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+        DiffReport.objects.create(device=test_device, diff_report={'added': {'b': 2}})
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert len(json.loads(b''.join(response.streaming_content))['results']) == 2
+
+    def test_device_report_changelog_keyset_pages(self, test_user, test_device):
+        client = Client()
+        client.force_login(test_user)
+        created_at = timezone.now()
+        diffs = [
+            DiffReport.objects.create(device=test_device, diff_report={
+                'added': {'installed_packages_array': [f'pkg-{i}', 'extra']},
+                'removed': {},
+                'changed': [{'hardening_index': {'old': i, 'new': i + 1}}],
+            })
+            for i in range(5)
+        ]
+        # Same timestamp for all: the id breaks the tie
+        DiffReport.objects.filter(device=test_device).update(created_at=created_at)
+        url = reverse('device_report_changelog', kwargs={'device_id': test_device.id})
+
+        seen, cursor = [], None
+        while True:
+            params = {'limit': 2, **({'cursor': cursor} if cursor else {})}
+            page = json.loads(b''.join(client.get(url, params).streaming_content))
+            seen += [entry['id'] for entry in page['results']]
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+        assert seen == [diff.id for diff in reversed(diffs)]
+
+        page = json.loads(b''.join(client.get(url, {'compact': '1', 'type': 'added', 'key': 'installed_*'}).streaming_content))
+        assert page['results'][0]['added'] == {'installed_packages_array': 2}
+        assert page['results'][0]['changed'] == []
+
+        assert client.get(url, {'limit': 1000}).status_code == 400
+        assert client.get(url, {'cursor': 'not-a-cursor'}).status_code == 400
+
+@pytest.mark.django_db
+class TestDeviceSections:
+    """Tests for the lazily-loaded sections of the device page."""
+
+    def _report(self, device, sample_lynis_report):
+        suggestions = ''.join(f'suggestion[]=TEST-{i:04d}|Suggestion {i}|-|\n' for i in range(60))
+        return FullReport.objects.create(
+            device=device,
+            full_report=sample_lynis_report + 'warning[]=SSH-7408|Weak SSH configuration|-|\n' + suggestions,
+        )
+
+    def test_shell_does_not_render_sections(self, test_user, test_device, sample_lynis_report):
+        self._report(test_device, sample_lynis_report)
+        client = Client()
+        client.force_login(test_user)
+
+        response = client.get(reverse('device_detail', kwargs={'device_id': test_device.id}))
+
+        assert response.status_code == 200
+        assert b'test-server' in response.content
+        assert b'Suggestions (60)' in response.content
+        assert b'Suggestion 12' not in response.content
+        assert reverse('device_section', kwargs={'device_id': test_device.id, 'section': 'packages'}).encode() in response.content
+
+    def test_sections_are_paginated_and_cached(self, test_user, test_device, sample_lynis_report, django_assert_max_num_queries):
+        self._report(test_device, sample_lynis_report)
+        client = Client()
+        client.force_login(test_user)
+        url = reverse('device_section', kwargs={'device_id': test_device.id, 'section': 'suggestions'})
+
+        response = client.get(url)
+        assert b'TEST-0049' in response.content
+        assert b'TEST-0050' not in response.content
+        assert b'Page 1 of 2' in response.content
+        assert b'TEST-0050' in client.get(url, {'page': 2}).content
+
+        # Session, user, report version: the report is not read again
+        with django_assert_max_num_queries(4):
+            assert b'TEST-0049' in client.get(url).content
+
+        warnings = client.get(reverse('device_section', kwargs={'device_id': test_device.id, 'section': 'warnings'}))
+        assert b'Weak SSH configuration' in warnings.content
+
+    def test_inventory_and_compliance_sections(self, test_user, test_device, sample_lynis_report):
+        from api.models import InventoryPackage
+        self._report(test_device, sample_lynis_report)
+        InventoryPackage.objects.create(device=test_device, name='openssl', version='3.0.2')
+        client = Client()
+        client.force_login(test_user)
+
+        def section(name):
+            return client.get(reverse('device_section', kwargs={'device_id': test_device.id, 'section': name}))
+
+        assert b'openssl' in section('packages').content
+        assert b'No listening ports reported.' in section('network').content
+        assert b'No rulesets assigned.' in section('compliance').content
+        assert section('secrets').status_code == 404
+
+
 @pytest.mark.django_db
 class TestUserProfileView:
     """Tests for the profile management view."""
@@ -914,6 +1497,184 @@ class TestRuleDetailView:
         assert '/login' in response.url
 
 
+@pytest.mark.django_db
+class TestRuleStatsViews:
+    """Tests for rule evaluation statistics in the policy pages."""
+
+    def _stats(self, rule, evaluations, slow_bucket):
+        from django.utils import timezone
+        from api.models import RuleEvaluationStats
+        from api.utils.rule_stats import HISTOGRAM_BOUNDS_MS
+
+        histogram = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        histogram[slow_bucket] = evaluations
+        return RuleEvaluationStats.objects.create(
+            rule=rule,
+            day=timezone.localdate(),
+            evaluations=evaluations,
+            errors=1,
+            total_ms=evaluations * HISTOGRAM_BOUNDS_MS[slow_bucket],
+            max_ms=HISTOGRAM_BOUNDS_MS[slow_bucket],
+            histogram=histogram,
+        )
+
+    def test_policy_list_sorts_by_p95(self, test_user):
+        from api.models import PolicyRule
+
+        fast = PolicyRule.objects.create(name='Fast rule', description='', rule_query='os')
+        slow = PolicyRule.objects.create(name='Slow rule', description='', rule_query='installed_packages_array')
+        PolicyRule.objects.create(name='Idle rule', description='', rule_query='hostname')
+        self._stats(fast, 100, 0)
+        self._stats(slow, 10, 8)
+
+        client = Client()
+        client.force_login(test_user)
+        response = client.get(reverse('policy_list'), {'rule_sort': 'p95_ms', 'rule_order': 'desc'})
+
+        assert response.status_code == 200
+        names = [rule.name for rule in response.context['rules']]
+        assert names[:2] == ['Slow rule', 'Fast rule']
+        assert response.context['rules'][0].performance['p95_ms'] == 50
+        assert b'Not evaluated' in response.content
+
+    def test_rule_detail_shows_performance(self, test_user):
+        from api.models import PolicyRule
+
+        rule = PolicyRule.objects.create(name='Slow rule', description='', rule_query='installed_packages_array')
+        self._stats(rule, 10, 8)
+
+        client = Client()
+        client.force_login(test_user)
+        response = client.get(reverse('rule_detail', kwargs={'rule_id': rule.id}))
+
+        assert response.status_code == 200
+        assert response.context['performance']['evaluations'] == 10
+        assert response.context['performance']['error_rate'] == 10
+        assert len(response.context['performance_days']) == 1
+
+    def test_rule_stats_export(self, test_user):
+        import csv
+        import io
+        from api.models import PolicyRule
+
+        rule = PolicyRule.objects.create(name='Slow rule', description='', rule_query='installed_packages_array')
+        self._stats(rule, 10, 8)
+
+        client = Client()
+        client.force_login(test_user)
+        response = client.get(reverse('rule_stats_export'))
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'text/csv'
+        rows = list(csv.DictReader(io.StringIO(response.content.decode())))
+        assert rows[0]['rule_name'] == 'Slow rule'
+        assert rows[0]['evaluations'] == '10'
+        assert rows[0]['p95_ms'] == '50'
+
+        data = client.get(reverse('rule_stats_export'), {'format': 'json'}).json()
+        assert data['rows'][0]['rule_id'] == rule.id
+        assert data['rows'][0]['mean_ms'] == 50
+
+        client.logout()
+        assert client.get(reverse('rule_stats_export')).status_code == 302
+
+    def test_rule_stats_export_escapes_formulas(self, test_user):
+        import csv
+        import io
+        from api.models import PolicyRule
+
+        rule = PolicyRule.objects.create(name='=HYPERLINK("http://example.com")', description='', rule_query='@os')
+        self._stats(rule, 10, 8)
+        client = Client()
+        client.force_login(test_user)
+
+        rows = list(csv.DictReader(io.StringIO(client.get(reverse('rule_stats_export')).content.decode())))
+
+        assert rows[0]['rule_name'] == '\'=HYPERLINK("http://example.com")'
+        assert rows[0]['rule_query'] == "'@os"
+        assert rows[0]['evaluations'] == '10'
+
+
+@pytest.mark.django_db
+class TestPolicyCatalog:
+    """Tests for the cached policy catalog embedded in the policy pages."""
+
+    def test_catalog_is_cached_until_policies_change(self, test_user, django_assert_num_queries):
+        from api.models import PolicyRule, PolicyRuleset
+        from api.utils.policy_catalog import get_catalog
+
+        rule = PolicyRule.objects.create(name='SSH', description='', rule_query='ssh_daemon = 1')
+        ruleset = PolicyRuleset.objects.create(name='Base', description='')
+        catalog = get_catalog()
+        assert catalog['rulesets'][ruleset.id]['rules'] == []
+
+        # Only the version is read while nothing changes
+        with django_assert_num_queries(2):
+            assert get_catalog()['version'] == catalog['version']
+
+        ruleset.rules.add(rule)
+        ruleset_data = get_catalog()['rulesets'][ruleset.id]
+        assert [item['name'] for item in ruleset_data['rules']] == ['SSH']
+
+        rule.name = 'SSH daemon'
+        rule.save()
+        rules = {item['id']: item for item in json.loads(get_catalog()['rules_json'])}
+        assert rules[rule.id]['name'] == 'SSH daemon'
+
+        rule.delete()
+        assert get_catalog()['rulesets'][ruleset.id]['rules'] == []
+
+    def test_pages_embed_catalog(self, test_user):
+        from api.models import PolicyRule, PolicyRuleset
+
+        rule = PolicyRule.objects.create(name='SSH', description='', rule_query='ssh_daemon = 1')
+        ruleset = PolicyRuleset.objects.create(name='Base', description='')
+        ruleset.rules.add(rule)
+        client = Client()
+        client.force_login(test_user)
+
+        response = client.get(reverse('policy_list'))
+        rulesets = {item['id']: item for item in json.loads(response.context['rulesets_json'])}
+        assert [item['id'] for item in rulesets[ruleset.id]['rules']] == [rule.id]
+        response = client.get(reverse('ruleset_detail', args=[ruleset.id]))
+        assert json.loads(response.context['ruleset_json'])['name'] == 'Base'
+        rules = {item['id']: item for item in json.loads(response.context['rules_json'])}
+        assert rules[rule.id]['rule_query'] == 'ssh_daemon = 1'
+
+
+@pytest.mark.django_db
+class TestRuleImpactPreviewViews:
+    """Tests for the rule impact preview endpoints."""
+
+    def test_preview_start_and_status(self, test_user, test_device, sample_lynis_report):
+        FullReport.objects.create(device=test_device, full_report=sample_lynis_report)
+        client = Client()
+        client.force_login(test_user)
+
+        response = client.post(reverse('rule_impact_preview'), {'rule_query': " os == 'Linux' "})
+        assert response.status_code == 202
+        data = response.json()
+
+        status = client.get(data['status_url']).json()
+        assert status['status'] == 'done'
+        assert status['rule_query'] == "os == 'Linux'"
+        assert status['percent'] == 100
+        assert status['result']['passed'] == 1
+
+        # Previews are private to the user who started them
+        other = Client()
+        other.force_login(User.objects.create_user(username='other', password='x'))
+        assert other.get(data['status_url']).status_code == 404
+
+    def test_preview_rejects_invalid_query(self, test_user):
+        client = Client()
+        client.force_login(test_user)
+
+        response = client.post(reverse('rule_impact_preview'), {'rule_query': 'os =='})
+        assert response.status_code == 400
+        assert 'rule_query' in response.json()['errors']
+        assert client.get(reverse('rule_impact_preview')).status_code == 405
+
+
 @pytest.mark.django_db
 class TestPolicyRuleFormValidation:
     """Tests for PolicyRuleForm JMESPath query validation."""
@@ -992,3 +1753,95 @@ class TestPolicyRuleFormValidation:
         assert form.is_valid(), f"Form should be valid: {form.errors}"
         # The cleaned value should have whitespace stripped
         assert form.cleaned_data['rule_query'] == "os == 'Linux'"
+
+    def test_query_cost_limits(self, settings):
+        """Test that costly queries are rejected and list scans produce warnings."""
+        from frontend.forms import PolicyRuleForm
+
+        settings.POLICY_RULE_MAX_FILTER_DEPTH = 1
+        data = {'name': 'Test Rule', 'description': 'Test description', 'enabled': True}
+        form = PolicyRuleForm(data={**data, 'rule_query': 'length(a[?b[?c]]) > `0`'})
+        assert not form.is_valid()
+        assert 'nests filters 2 levels deep' in str(form.errors['rule_query'])
+
+        form = PolicyRuleForm(data={**data, 'rule_query': "length(installed_packages_array[?contains(@, 'openssl')]) > `0`"})
+        assert form.is_valid(), form.errors
+        assert form.cost_warnings == ['Filters every item of installed_packages_array']
+
+    def test_rule_create_returns_cost_warnings(self, test_user):
+        """Test that the AJAX rule creation response includes cost warnings."""
+        client = Client()
+        client.force_login(test_user)
+        response = client.post(reverse('rule_create'), {
+            'name': 'OpenSSL installed',
+            'description': 'Test description',
+            'rule_query': "length(installed_packages_array[?contains(@, 'openssl')]) > `0`",
+            'enabled': 'on',
+        }, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        assert response.status_code == 200
+        assert response.json()['warnings'] == ['Filters every item of installed_packages_array']
+
+
+@pytest.mark.django_db
+class TestComplianceRefresh:
+    """Tests that policy changes refresh the stored device compliance."""
+
+    def test_rule_update_refreshes_device_compliance(self, test_user, test_device, sample_lynis_report):
+        from api.models import PolicyRule, PolicyRuleset
+        client = Client()
+        client.force_login(test_user)
+        FullReport.objects.create(device=test_device, full_report=sample_lynis_report)
+        rule = PolicyRule.objects.create(name='Hardened', description='', rule_query='hardening_index > `90`', created_by=test_user)
+        ruleset = PolicyRuleset.objects.create(name='Baseline', description='', created_by=test_user)
+        ruleset.rules.add(rule)
+        test_device.rulesets.add(ruleset)
+        test_device.compliant = False
+        test_device.save()
+
+        response = client.post(reverse('rule_update', kwargs={'rule_id': rule.id}), {
+            'name': 'Hardened',
+            'description': 'Hardening index above 60',
+            'rule_query': 'hardening_index > `60`',
+            'enabled': 'on',
+        })
+
+        assert response.status_code == 302
+        test_device.refresh_from_db()
+        assert test_device.compliant is True
+
+    def test_device_update_refreshes_device_compliance(self, test_user, test_device, sample_lynis_report):
+        from api.models import PolicyRule, PolicyRuleset
+        client = Client()
+        client.force_login(test_user)
+        FullReport.objects.create(device=test_device, full_report=sample_lynis_report)
+        rule = PolicyRule.objects.create(name='Hardened', description='', rule_query='hardening_index > `90`', created_by=test_user)
+        ruleset = PolicyRuleset.objects.create(name='Strict', description='', created_by=test_user)
+        ruleset.rules.add(rule)
+
+        client.post(reverse('device_update', kwargs={'device_id': test_device.id}), {'rulesets': [ruleset.id]})
+
+        test_device.refresh_from_db()
+        assert test_device.compliant is False
+
+
+@pytest.mark.django_db
+class TestInventorySearch:
+    """Tests for the inventory search view."""
+
+    def test_search_packages_and_ports(self, test_user, test_device, real_lynis_report):
+        from api.utils.inventory import sync_device_inventory
+        client = Client()
+        client.force_login(test_user)
+        sync_device_inventory(test_device, LynisReport(real_lynis_report).get_parsed_report())
+
+        response = client.get(reverse('inventory_search'), {'kind': 'packages', 'q': 'adduser', 'version': '3.118*'})
+        assert response.status_code == 200
+        assert response.context['device_count'] == 1
+        assert response.context['rows'][0][1] == ['adduser', '3.118ubuntu5']
+
+        response = client.get(reverse('inventory_search'), {'kind': 'ports', 'q': '23'})
+        assert response.context['device_count'] == 0
+        assert 'No device matches this search.' in response.content.decode()
+
+        response = client.get(reverse('inventory_search'), {'kind': 'ports', 'q': '34767', 'protocol': 'tcp'})
+        assert response.context['device_count'] == 1
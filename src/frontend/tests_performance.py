@@ -0,0 +1,191 @@
+"""
+Query-count and response-time budgets for the frontend views.
+
+Each test seeds fleets of increasing size and checks that the number of
+queries a view issues does not depend on the number of devices, and that
+the largest fleet still renders within PERFORMANCE_RESPONSE_BUDGET_MS.
+
+Run only these tests with: pytest -m performance
+"""
+import time
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
+from api.models import Device, FullReport, DiffReport, DeviceEvent, PolicyRule, PolicyRuleset
+from api.utils.fleet_dashboard import update_aggregates
+
+FLEET_SIZES = (1, 100, 1000)
+PERFORMANCE_RESPONSE_BUDGET_MS = 3000
+
+pytestmark = [pytest.mark.django_db, pytest.mark.performance]
+
+
+@pytest.fixture
+def policy_catalog(test_user):
+    """Five rules spread over two rulesets."""
+    rules = [
+        PolicyRule.objects.create(
+            name=f'Rule {i}',
+            description=f'Rule {i}',
+            rule_query='hardening_index > `60`' if i % 2 else "os == 'Linux'",
+            created_by=test_user,
+        )
+        for i in range(5)
+    ]
+    baseline = PolicyRuleset.objects.create(name='Baseline', description='Baseline', created_by=test_user)
+    baseline.rules.set(rules[:3])
+    strict = PolicyRuleset.objects.create(name='Strict', description='Strict', created_by=test_user)
+    strict.rules.set(rules)
+    return {'rules': rules, 'rulesets': [baseline, strict]}
+
+
+class Fleet:
+    """Grows a fleet of devices, each with a report, a diff and an event, counted in the dashboard."""
+
+    def __init__(self, license_key, rulesets, report):
+        self.license_key = license_key
+        self.rulesets = rulesets
+        self.report = report
+        self.size = 0
+
+    def grow_to(self, size):
+        now = timezone.now()
+        devices = Device.objects.bulk_create([
+            Device(
+                licensekey=self.license_key,
+                hostid=f'perf-host-{i}',
+                hostid2=f'perf-host2-{i}',
+                hostname=f'perf-{i}',
+                os='Linux',
+                distro='Ubuntu',
+                distro_version='22.04',
+                lynis_version='3.0.0',
+                warnings=i % 7,
+                hardening_index=50 + i % 40,
+                last_update=now - timedelta(minutes=i),
+            )
+            for i in range(self.size, size)
+        ])
+        FullReport.objects.bulk_create([
+            FullReport(device=device, full_report=self.report.replace('test-server', device.hostname))
+            for device in devices
+        ])
+        DiffReport.objects.bulk_create([
+            DiffReport(
+                device=device,
+                hostname=device.hostname,
+                diff_report={'added': {'installed_package': ['openssl']}, 'removed': {}, 'changed': []},
+            )
+            for device in devices
+        ])
+        DeviceEvent.objects.bulk_create([DeviceEvent(device=device, event_type='enrolled') for device in devices])
+        Through = Device.rulesets.through
+        Through.objects.bulk_create([
+            Through(device_id=device.id, policyruleset_id=ruleset.id)
+            for device in devices
+            for ruleset in self.rulesets
+        ])
+        update_aggregates(devices)
+        self.size = size
+
+
+@pytest.fixture
+def fleet(test_license_key, policy_catalog, sample_lynis_report):
+    return Fleet(test_license_key, policy_catalog['rulesets'], sample_lynis_report)
+
+
+@pytest.fixture
+def client(test_user):
+    client = Client()
+    client.force_login(test_user)
+    return client
+
+
+def measure(client, url):
+    """Return (query_count, elapsed_ms) for a GET request to ``url``."""
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        response = client.get(url)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+    assert response.status_code == 200, f'{url} returned {response.status_code}'
+    return len(queries), elapsed_ms
+
+
+def assert_constant_queries(client, fleet, url_for):
+    """Grow the fleet through FLEET_SIZES and check the query count of ``url_for(fleet)``."""
+    counts = {}
+    elapsed_ms = 0
+    for size in FLEET_SIZES:
+        fleet.grow_to(size)
+        # Measure each size with cold caches (e.g. the policy catalog)
+        cache.clear()
+        counts[size], elapsed_ms = measure(client, url_for(fleet))
+
+    assert len(set(counts.values())) == 1, f'Query count depends on fleet size: {counts}'
+    assert elapsed_ms < PERFORMANCE_RESPONSE_BUDGET_MS, (
+        f'{url_for(fleet)} took {elapsed_ms:.0f}ms with {fleet.size} devices'
+    )
+
+
+def test_dashboard_queries_constant(client, fleet):
+    assert_constant_queries(client, fleet, lambda fleet: reverse('index'))
+
+
+def test_device_list_queries_constant(client, fleet):
+    assert_constant_queries(client, fleet, lambda fleet: reverse('device_list'))
+
+
+def test_device_list_sorted_by_hardening_index_queries_constant(client, fleet):
+    assert_constant_queries(client, fleet, lambda fleet: reverse('device_list') + '?sort=hardening_index&order=asc')
+
+
+def test_device_detail_queries_constant(client, fleet):
+    def url_for(fleet):
+        device = Device.objects.order_by('id').first()
+        return reverse('device_detail', kwargs={'device_id': device.id})
+
+    assert_constant_queries(client, fleet, url_for)
+
+
+def test_license_list_queries_constant(client, fleet):
+    assert_constant_queries(client, fleet, lambda fleet: reverse('license_list'))
+
+
+def test_license_detail_queries_constant(client, fleet):
+    assert_constant_queries(
+        client, fleet, lambda fleet: reverse('license_detail', kwargs={'license_id': fleet.license_key.id})
+    )
+
+
+def test_policy_list_queries_constant(client, fleet):
+    assert_constant_queries(client, fleet, lambda fleet: reverse('policy_list'))
+
+
+def test_ruleset_detail_queries_constant(client, fleet):
+    assert_constant_queries(
+        client, fleet, lambda fleet: reverse('ruleset_detail', kwargs={'ruleset_id': fleet.rulesets[0].id})
+    )
+
+
+def test_rule_detail_queries_constant(client, fleet, policy_catalog):
+    rule = policy_catalog['rules'][0]
+    assert_constant_queries(client, fleet, lambda fleet: reverse('rule_detail', kwargs={'rule_id': rule.id}))
+
+
+def test_activity_queries_constant(client, fleet):
+    assert_constant_queries(client, fleet, lambda fleet: reverse('activity'))
+
+
+def test_device_list_shows_stored_hardening_index(client, fleet):
+    fleet.grow_to(3)
+
+    response = client.get(reverse('device_list') + '?sort=hardening_index&order=desc')
+
+    devices = list(response.context['page_obj'].object_list)
+    assert [device.hardening_index for device in devices] == [52, 51, 50]
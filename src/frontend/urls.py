@@ -13,14 +13,20 @@ urlpatterns = [
     path('settings/', views.settings_view, name='settings'),
     path('onboarding/', views.onboarding, name='onboarding'),
     path('devices/', views.device_list, name='device_list'),
+    path('inventory/', views.inventory_search, name='inventory_search'),
     path('device/<int:device_id>/', views.device_detail, name='device_detail'),
+    path('device/<int:device_id>/section/<str:section>/', views.device_section, name='device_section'),
     path('device/<int:device_id>/edit/', views.device_update, name='device_update'),
     path('device/<int:device_id>/export-pdf/', views.device_export_pdf, name='device_export_pdf'),
+    path('devices/export/', views.device_export, name='device_export'),
+    path('devices/export-pdf/', views.device_export_pdf_bulk, name='device_export_pdf_bulk'),
     path('device/<int:device_id>/delete/', views.device_delete, name='device_delete'),
     path('device/<int:device_id>/report/', views.device_report, name='device_report'),
     path('device/<int:device_id>/report/json/', views.device_report_json, name='device_report_json'),
     path('device/<int:device_id>/rule/<int:rule_id>/evaluate/', views.rule_evaluate_for_device, name='rule_evaluate_for_device'),
     path('device/<int:device_id>/report/changelog/', views.device_report_changelog, name='device_report_changelog'),
+    path('device/<int:device_id>/report/history/', views.device_report_history, name='device_report_history'),
+    path('device/<int:device_id>/report/archive/<int:archive_id>/', views.device_report_archived, name='device_report_archived'),
     path('policies/', views.policy_list, name='policy_list'),
     # Backward compatibility redirect
     path('rulesets/', views.policy_list, name='ruleset_list'),
@@ -29,11 +35,16 @@ urlpatterns = [
     path('ruleset/<int:ruleset_id>/edit/', views.ruleset_update, name='ruleset_update'),
     path('ruleset/<int:ruleset_id>/delete/', views.ruleset_delete, name='ruleset_delete'),
     path('rules/', views.rule_list, name='rule_list'),
+    path('rules/stats/export/', views.rule_stats_export, name='rule_stats_export'),
+    path('rules/preview/', views.rule_impact_preview, name='rule_impact_preview'),
+    path('rules/preview/<int:preview_id>/', views.rule_impact_preview_status, name='rule_impact_preview_status'),
     path('rule/<int:rule_id>/', views.rule_detail, name='rule_detail'),
     path('rule/create/', views.rule_create, name='rule_create'),
     path('rule/<int:rule_id>/edit/', views.rule_update, name='rule_update'),
     path('rule/<int:rule_id>/delete/', views.rule_delete, name='rule_delete'),
     path('activity/', views.activity, name='activity'),
+    path('activity/stream/', views.activity_stream, name='activity_stream'),
+    path('activity/poll/', views.activity_poll, name='activity_poll'),
     path('activity/silence/', views.silence_rule_list, name='silence_rule_list'),
     path('activity/silence/create/', views.silence_rule_create, name='silence_rule_create'),
     path('activity/silence/<int:rule_id>/edit/', views.silence_rule_edit, name='silence_rule_edit'),
@@ -1,22 +1,45 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponse, JsonResponse, Http404
+from django.template.loader import render_to_string
+from django.http import HttpResponse, JsonResponse, Http404, StreamingHttpResponse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.auth import update_session_auth_hash
 from django.contrib.auth.models import User
 from django.views.decorators.csrf import csrf_protect
+from django.views.decorators.http import condition
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
 from django.db import transaction
-from django.db.models import Q, F, Count
+from django.db.models import Q, F, Count, Max
+from django.db.models.functions import Length
 from django.core.paginator import Paginator
 from django.conf import settings
-from api.models import Device, FullReport, DiffReport, LicenseKey, PolicyRule, PolicyRuleset, Organization, ActivityIgnorePattern, DeviceEvent, EnrollmentSettings
+from django.core.handlers.asgi import ASGIRequest
+from api.models import Device, FullReport, ArchivedReport, DiffReport, LicenseKey, PolicyRule, PolicyRuleset, Organization, ActivityIgnorePattern, DeviceEvent, EnrollmentSettings
 from api.utils.lynis_report import LynisReport
-from api.utils.compliance import check_device_compliance
+from api.utils.compliance import check_device_compliance, refresh_device_compliance
 from api.utils.license_utils import generate_license_key
+from api.utils.report_archive import ArchiveError, read_archived_report
+from api.utils.inventory import INVENTORY_KINDS, search_inventory
+from api.utils.report_index import FleetFilterError, parse_fleet_filter
+from api.utils.rule_stats import daily_stats, rule_stats
+from api.utils.impact_preview import start_preview
+from api.utils.compliance_history import device_history, fleet_trend
+from api.utils.changelog import ChangelogPage, ChangelogQueryError
+from api.utils.report_cache import parsed_report
+from api.utils.fleet_export import ExportColumnError, csv_value, iter_rows, parse_columns, stream_csv, stream_ndjson
+from api.utils.pdf_export import export_archive, pdf_filename, rulesets_version, start_export
+from api.utils.policy_catalog import get_catalog
+from api.utils.fleet_dashboard import evaluation_counts, fleet_dashboard, stale_devices
+from api.utils.display_model import diff_displays
+from api.utils import activity_feed
+from api.utils.activity_feed import is_silenced, silence_rules
 from .forms import (
     PolicyRulesetForm,
     PolicyRuleForm,
+    RuleImpactPreviewForm,
     DeviceForm,
     LicenseKeyForm,
     UserProfileForm,
@@ -30,14 +53,19 @@ import os
 import json
 import logging
 import re
-import fnmatch
+import time
 from urllib.parse import urlparse
 from django.urls import reverse
 from datetime import datetime
-from weasyprint import HTML
-from django.template.loader import render_to_string
+from django.utils.text import get_valid_filename
 
 DEVICE_LIST_PAGE_SIZE = getattr(settings, 'DEVICE_LIST_PAGE_SIZE', 25)
+# Live activity feed: reconnection delay of an EventSource, keepalive interval, longest long-poll and
+# longest stream under WSGI, where an open stream holds a server thread
+ACTIVITY_STREAM_RETRY_MS = 3000
+ACTIVITY_STREAM_KEEPALIVE_SECONDS = 15
+ACTIVITY_POLL_MAX_WAIT_SECONDS = 25
+ACTIVITY_STREAM_WSGI_MAX_SECONDS = 30
 
 def safe_redirect(request, fallback_url_name='device_list', **kwargs):
     referer = request.META.get('HTTP_REFERER')
@@ -52,8 +80,11 @@ def safe_redirect(request, fallback_url_name='device_list', **kwargs):
 
 @login_required
 def index(request):
-    """Index view: redirect to the device list"""
-    return redirect('device_list')
+    """Index view: fleet dashboard, read from the counters maintained at ingest (see api.utils.fleet_dashboard)"""
+    return render(request, 'dashboard.html', {
+        'dashboard': fleet_dashboard(),
+        'stale_devices': stale_devices(),
+    })
 
 
 @login_required
@@ -206,6 +237,17 @@ def onboarding(request):
         'autogenerated_license_names': json.dumps(list(autogenerated_licenses))
     })
 
+def _chart_points(series, key, width=600, height=100):
+    """SVG polyline points of ``series[i][key]`` (0-100) spread over ``width``; missing values are skipped."""
+    if len(series) < 2:
+        return ''
+    step = width / (len(series) - 1)
+    return ' '.join(
+        f'{position * step:.1f},{height - item[key] * height / 100:.1f}'
+        for position, item in enumerate(series)
+        if item[key] is not None
+    )
+
 @login_required
 def device_list(request):
     """Device list view: show all devices"""
@@ -213,24 +255,20 @@ def device_list(request):
     if not devices_qs.exists():
         return redirect('onboarding')
 
-    for device in devices_qs:
-        logging.debug('Checking compliance for device %s', device)
-        
-        # Get the latest report for the device
-        report = FullReport.objects.filter(device=device).order_by('-created_at').first()
-        if not report:
-            logging.error('No report found for device %s', device)
-            device.compliant = False
-            device.save()
-            continue
-        
-        report = LynisReport(report.full_report)
-        
-        # Use utility function to check compliance
-        compliant, _ = check_device_compliance(device, report)
-        device.compliant = compliant
-        device.save()
-    
+    # Compliance and hardening_index are stored on the device at ingest (and
+    # refreshed when rules or ruleset assignments change), so listing devices
+    # is a plain paginated query whatever the size of the fleet.
+
+    # Fleet filter on the report key/value index, e.g. "hardening_index < 60 AND os == 'Linux'"
+    fleet_filter = request.GET.get('q', '').strip()
+    filter_error = None
+    if fleet_filter:
+        try:
+            devices_qs = devices_qs.filter(parse_fleet_filter(fleet_filter))
+        except FleetFilterError as e:
+            filter_error = str(e)
+            devices_qs = devices_qs.none()
+
     # Handle sorting
     sort_field = request.GET.get('sort', 'last_update')
     sort_order = request.GET.get('order', 'desc')
@@ -247,49 +285,12 @@ def device_list(request):
     # Default to last_update if invalid sort field
     sort_field = valid_sort_fields.get(sort_field, 'last_update')
     
-    # If sorting by hardening_index, we need to extract it first and sort in Python
-    if sort_field == 'hardening_index':
-        # Get all devices first
-        devices = list(Device.objects.all())
-        
-        # Extract hardening_index from latest report for each device
-        for device in devices:
-            latest_report = FullReport.objects.filter(device=device).order_by('-created_at').first()
-            if latest_report:
-                try:
-                    parsed_report = LynisReport(latest_report.full_report).get_parsed_report()
-                    device.hardening_index = parsed_report.get('hardening_index', None)
-                except Exception:
-                    device.hardening_index = None
-            else:
-                device.hardening_index = None
-        
-        # Sort by hardening_index (treat None as -1 for sorting purposes)
-        reverse_order = sort_order == 'desc'
-        devices.sort(key=lambda d: d.hardening_index if d.hardening_index is not None else -1, reverse=reverse_order)
-    else:
-        # Determine sort order
-        if sort_order == 'asc':
-            order_by = sort_field
-        else:  # default to desc
-            order_by = f'-{sort_field}'
-        
-        # Order devices by selected field
-        devices = Device.objects.all().order_by(order_by)
-        
-        # Extract hardening_index from latest report for each device (for display)
-        devices_list = list(devices)
-        for device in devices_list:
-            latest_report = FullReport.objects.filter(device=device).order_by('-created_at').first()
-            if latest_report:
-                try:
-                    parsed_report = LynisReport(latest_report.full_report).get_parsed_report()
-                    device.hardening_index = parsed_report.get('hardening_index', None)
-                except Exception:
-                    device.hardening_index = None
-            else:
-                device.hardening_index = None
-        devices = devices_list
+    # Devices without a value sort as if their value was the lowest
+    if sort_order == 'asc':
+        order_by = F(sort_field).asc(nulls_first=True)
+    else:  # default to desc
+        order_by = F(sort_field).desc(nulls_last=True)
+    devices = devices_qs.order_by(order_by, 'id')
 
     paginator = Paginator(devices, DEVICE_LIST_PAGE_SIZE)
     page_number = request.GET.get('page')
@@ -303,7 +304,13 @@ def device_list(request):
     query_params['order'] = sort_order
     base_query = query_params.urlencode()
 
+    # Daily fleet aggregates maintained at ingest (see api.utils.compliance_history)
+    trend = fleet_trend(days=30)
+
     return render(request, 'device_list.html', {
+        'trend': trend,
+        'trend_compliance_points': _chart_points(trend, 'compliant_percent'),
+        'trend_hardening_points': _chart_points(trend, 'average_hardening_index'),
         'devices': page_obj,
         'page_obj': page_obj,
         'paginator': paginator,
@@ -311,76 +318,162 @@ def device_list(request):
         'pagination_query': base_query,
         'current_sort': sort_field,
         'current_order': sort_order,
+        'fleet_filter': fleet_filter,
+        'filter_error': filter_error,
+    })
+
+@login_required
+def inventory_search(request):
+    """Inventory search view: find the devices with a package, listening port, user, kernel module or address"""
+    kind = request.GET.get('kind', 'packages')
+    if kind not in INVENTORY_KINDS:
+        kind = 'packages'
+    term = request.GET.get('q', '').strip()
+    version = request.GET.get('version', '').strip()
+    protocol = request.GET.get('protocol', '').strip()
+
+    page_obj = paginator = None
+    device_count = 0
+    if term:
+        results = search_inventory(kind, term, version=version or None, protocol=protocol or None)
+        device_count = results.values('device').distinct().count()
+        paginator = Paginator(results, DEVICE_LIST_PAGE_SIZE)
+        page_obj = paginator.get_page(request.GET.get('page'))
+
+    fields = INVENTORY_KINDS[kind]['fields']
+    rows = [(item.device, [getattr(item, field) for field in fields]) for item in page_obj or []]
+
+    query_params = request.GET.copy()
+    query_params.pop('page', None)
+
+    return render(request, 'inventory/inventory_search.html', {
+        'kinds': INVENTORY_KINDS,
+        'kind': kind,
+        'term': term,
+        'version': version,
+        'protocol': protocol,
+        'columns': [field.replace('_', ' ') for field in fields],
+        'rows': rows,
+        'page_obj': page_obj,
+        'paginator': paginator,
+        'is_paginated': page_obj is not None and page_obj.has_other_pages(),
+        'pagination_query': query_params.urlencode(),
+        'device_count': device_count,
     })
 
+# Report keys shown in the overview of the device page
+DEVICE_OVERVIEW_KEYS = (
+    'hostname', 'hostid', 'hostid2', 'os', 'os_fullname', 'os_kernel_version_full', 'uptime_in_days',
+    'primary_ipv4_addresses', 'network_mac_address', 'trikusec_custom_tests', 'lynis_timer_period',
+    'lynis_timer_next_trigger', 'report_datetime_end', 'hardening_index', 'lynis_tests_done',
+    'auth_failed_logins_logged', 'firewall_active', 'clamav_version', 'clamav_last_update',
+)
+DEVICE_SECTIONS = ('compliance', 'warnings', 'suggestions', 'packages', 'network')
+DEVICE_SECTION_PAGE_SIZE = 50
+
+
+def _report_summary(report_id):
+    """Return the overview keys, warnings and suggestions of a report, or None if it cannot be parsed."""
+    def build():
+        report = parsed_report(report_id)
+        if not report:
+            return None
+        # Missing keys stay missing, as the template expects
+        summary = {key: report[key] for key in DEVICE_OVERVIEW_KEYS if key in report}
+        summary['warning'] = report.get('warning') or []
+        summary['suggestion'] = report.get('suggestion') or []
+        return summary
+
+    return _cached_body(f'device_report:summary:{report_id}', build)
+
+
 @login_required
 def device_detail(request, device_id):
-    """Device detail view: show the details of a device"""
-    device = Device.objects.get(id=device_id)
+    """Device detail view: show the overview of a device; the other sections are loaded by device_section"""
+    device = get_object_or_404(Device.objects.select_related('licensekey__created_by'), id=device_id)
     
     # Get last report for the device
-    report = FullReport.objects.filter(device=device).order_by('-created_at').first()
+    version = _report_version(request, device_id)
 
     # If no report found, error message
-    if not report:
+    if not version:
         return HttpResponse('No report found for the device', status=404)
     
-    report = LynisReport(report.full_report)
-    report = report.get_parsed_report()
-
+    report = _report_summary(version[0])
     if not report:
         return HttpResponse('Failed to parse the report', status=500)
-    
-    # Use utility function to check compliance and get detailed ruleset evaluation
-    compliant, evaluated_rulesets = check_device_compliance(device, report)
-
-    # Update the device compliance status
-    device.compliant = compliant
 
     # Get all rulesets (used to select the rulesets for the device from the side-panel)
-    policy_rulesets = PolicyRuleset.objects.prefetch_related('rules').all()
+    policy_rulesets = PolicyRuleset.objects.all()
     
-    # Get all rules for JavaScript
+    # Get all rules for the rule selection sidebar
     all_rules = PolicyRule.objects.all()
     
-    # Serialize rulesets for JavaScript
-    rulesets_data = []
-    for ruleset in policy_rulesets:
-        ruleset_data = {
-            'id': ruleset.id,
-            'name': ruleset.name,
-            'description': ruleset.description,
-            'created_at': ruleset.created_at.isoformat(),
-            'updated_at': ruleset.updated_at.isoformat(),
-            'rules': list(ruleset.rules.values('id', 'name', 'enabled', 'description', 'rule_query')),
-        }
-        rulesets_data.append(ruleset_data)
-    
-    # Serialize all rules for JavaScript
-    rules_data = []
-    for rule in all_rules:
-        rule_data = {
-            'id': rule.id,
-            'name': rule.name,
-            'description': rule.description,
-            'rule_query': rule.rule_query,
-            'enabled': rule.enabled,
-            'created_at': rule.created_at.isoformat(),
-            'updated_at': rule.updated_at.isoformat(),
-        }
-        rules_data.append(rule_data)
+    # Rulesets and rules for JavaScript
+    catalog = get_catalog()
 
     return render(request, 'device_detail.html', {
         'device': device,
         'report': report,
-        'evaluated_rulesets': evaluated_rulesets,
+        'sections': DEVICE_SECTIONS,
         'rulesets': policy_rulesets,
         'all_rules': all_rules,  # For rule selection sidebar template
-        'rulesets_json': json.dumps(rulesets_data),
-        'rules_json': json.dumps(rules_data),
+        'rulesets_json': catalog['rulesets_json'],
+        'rules_json': catalog['rules_json'],
     })
 
 
+def _render_device_section(device, section, report_id, page):
+    """Render one section of the device page for the report ``report_id``, or return None."""
+    if section == 'compliance':
+        report = parsed_report(report_id)
+        if not report:
+            return None
+        _, evaluated_rulesets = check_device_compliance(device, report)
+        return render_to_string('device/device_compliance.html', {
+            'device': device,
+            'evaluated_rulesets': evaluated_rulesets,
+            'compliance_history': device_history(device, limit=30),
+        })
+
+    context = {'device': device}
+    if section in ('warnings', 'suggestions'):
+        summary = _report_summary(report_id)
+        if summary is None:
+            return None
+        rows = summary['warning' if section == 'warnings' else 'suggestion']
+    elif section == 'packages':
+        rows = device.inventory_packages.order_by('name', 'version').values_list('name', 'version')
+    else:
+        context['addresses'] = list(device.inventory_addresses.order_by('family', 'address').values_list('family', 'address'))
+        rows = device.inventory_ports.order_by('port', 'protocol', 'address').values_list('protocol', 'address', 'port', 'process')
+    context['page_obj'] = Paginator(rows, DEVICE_SECTION_PAGE_SIZE).get_page(page)
+    context['section_url'] = reverse('device_section', kwargs={'device_id': device.id, 'section': section})
+    return render_to_string(f'device/device_{section}.html', context)
+
+
+@login_required
+def device_section(request, device_id, section):
+    """Device section view: one section of the device page as an HTML fragment, paginated with ?page="""
+    if section not in DEVICE_SECTIONS:
+        raise Http404('Unknown section')
+    device = get_object_or_404(Device, id=device_id)
+    version = _report_version(request, device_id)
+    if not version:
+        return HttpResponse('No report found for the device', status=404)
+
+    page = request.GET.get('page', '1')
+    page = page if page.isdigit() else '1'
+    # Sections are built from the latest report (and the inventory and snapshots stored with it)
+    key = f'device_section:{section}:{_report_etag(request, device_id)}:{page}'
+    if section == 'compliance':
+        key = f'{key}:{rulesets_version(device)}'
+    body = _cached_body(key, lambda: _render_device_section(device, section, version[0], page))
+    if body is None:
+        return HttpResponse('Failed to parse the report', status=500)
+    return HttpResponse(body)
+
+
 @login_required
 @csrf_protect
 def device_update(request, device_id):
@@ -394,6 +487,7 @@ def device_update(request, device_id):
             logging.debug('Selected rulesets: %s', selected_rulesets)
             device.rulesets.set(selected_rulesets)
             form.save()
+            refresh_device_compliance(Device.objects.filter(id=device.id))
             # Return to the referer page
             return safe_redirect(request, 'device_detail', device_id=device_id)
         else:
@@ -438,98 +532,246 @@ def device_delete(request, device_id):
     # GET request: return 405 Method Not Allowed
     return HttpResponse('Method not allowed', status=405)
 
+@login_required
+def device_export(request):
+    """Export devices (filtered with ?q= like the device list) as CSV or NDJSON, streamed in chunks"""
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in ('csv', 'ndjson'):
+        return HttpResponse('Format must be csv or ndjson', status=400)
+    try:
+        columns = parse_columns(request.GET.get('columns', ''))
+    except ExportColumnError as e:
+        return HttpResponse(str(e), status=400)
+
+    devices = Device.objects.all()
+    fleet_filter = request.GET.get('q', '').strip()
+    if fleet_filter:
+        try:
+            devices = devices.filter(parse_fleet_filter(fleet_filter))
+        except FleetFilterError as e:
+            return HttpResponse(str(e), status=400)
+
+    rows = iter_rows(devices, columns)
+    if export_format == 'csv':
+        response = StreamingHttpResponse(stream_csv(rows, columns), content_type='text/csv')
+    else:
+        response = StreamingHttpResponse(stream_ndjson(rows), content_type='application/x-ndjson')
+    response['Content-Disposition'] = f'attachment; filename="devices-{datetime.now().strftime("%Y%m%d")}.{export_format}"'
+    return response
+
 @login_required
 def device_export_pdf(request, device_id):
-    """Export device report to PDF"""
+    """Export device report to PDF (rendered in the background, then served from the stored export)"""
     device = get_object_or_404(Device, id=device_id)
-    
-    # Get last report for the device
-    full_report = FullReport.objects.filter(device=device).order_by('-created_at').first()
-    
-    # If no report found, error message
-    if not full_report:
+
+    export = start_export(device)
+    if export is None:
         return HttpResponse('No report found for the device', status=404)
-    
-    report = LynisReport(full_report.full_report)
-    report = report.get_parsed_report()
-    
-    if not report or not isinstance(report, dict):
-        return HttpResponse('Failed to parse the report', status=500)
-    
-    # Check if report has required fields (hostname is needed for filename)
-    if 'hostname' not in report:
-        return HttpResponse('Failed to parse the report', status=500)
-    
-    # Use utility function to check compliance and get detailed ruleset evaluation
-    compliant, evaluated_rulesets = check_device_compliance(device, report)
-    
-    # Update the device compliance status
-    device.compliant = compliant
-    
-    # Render HTML template
-    html_string = render_to_string('device/device_pdf.html', {
-        'device': device,
-        'report': report,
-        'evaluated_rulesets': evaluated_rulesets,
-        'generated_at': datetime.now(),
-    }, request=request)
-    
-    # Generate PDF using WeasyPrint
-    # Use base_url to resolve any relative URLs in the template
-    html = HTML(string=html_string, base_url=request.build_absolute_uri('/'))
-    document = html.render()
-    pdf_bytes = document.write_pdf()
-    
-    # Create filename with timestamp
+
+    # Already rendered when deferred tasks run inline
+    export.refresh_from_db()
+    if export.status == 'failed':
+        # The next download tries again
+        export.delete()
+        return HttpResponse(export.error, status=500)
+    if export.status != 'done':
+        return render(request, 'device/device_pdf_pending.html', {'device': device}, status=202)
+
+    response = HttpResponse(bytes(export.pdf), content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="{pdf_filename(export)}"'
+    return response
+
+@login_required
+def device_export_pdf_bulk(request):
+    """Export the PDFs of all devices of a license or a ruleset as a zip archive"""
+    devices = Device.objects.order_by('id')
+    license_id = request.GET.get('license', '')
+    ruleset_id = request.GET.get('ruleset', '')
+    if license_id.isdigit():
+        source = get_object_or_404(LicenseKey, id=license_id)
+        devices = devices.filter(licensekey=source)
+    elif ruleset_id.isdigit():
+        source = get_object_or_404(PolicyRuleset, id=ruleset_id)
+        devices = devices.filter(rulesets=source)
+    else:
+        return HttpResponse('A license or ruleset id is required', status=400)
+
+    response = StreamingHttpResponse(
+        export_archive(devices),
+        content_type='application/zip',
+    )
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f'device-{report["hostname"]}-{timestamp}.pdf'
-    
-    # Return PDF as response
-    response = HttpResponse(pdf_bytes, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['Content-Disposition'] = f'attachment; filename="devices-{get_valid_filename(source.name)}-{timestamp}.zip"'
     return response
 
+def _report_version(request, device_id):
+    """Return (id, created_at) of the latest report of a device, or None; looked up once per request."""
+    if not hasattr(request, '_report_version'):
+        request._report_version = (
+            FullReport.objects.filter(device_id=device_id).order_by('-created_at').values_list('id', 'created_at').first()
+        )
+    return request._report_version
+
+
+def _report_etag(request, device_id):
+    version = _report_version(request, device_id)
+    # The parsed report has time-dependent keys (days_since_audit): the body changes every day
+    return f'report-{version[0]}-{timezone.localdate():%Y%m%d}' if version else None
+
+
+def _report_last_modified(request, device_id):
+    version = _report_version(request, device_id)
+    if not version:
+        return None
+    today = timezone.make_aware(datetime.combine(timezone.localdate(), datetime.min.time()))
+    return max(version[1], today)
+
+
+def _cached_body(key, build):
+    """Return the response body cached under ``key``, building it with ``build()`` on a miss (None is not cached)."""
+    body = cache.get(key)
+    if body is None:
+        body = build()
+        if body is not None:
+            cache.set(key, body, getattr(settings, 'REPORT_BODY_CACHE_SECONDS', 3600))
+    return body
+
+
 @login_required
+@condition(etag_func=_report_etag, last_modified_func=_report_last_modified)
 def device_report(request, device_id):
     """Device report view: show the full report of a device"""
-    device = get_object_or_404(Device, id=device_id)
-    report = FullReport.objects.filter(device=device).order_by('-created_at').first()
-    if not report:
+    get_object_or_404(Device, id=device_id)
+    version = _report_version(request, device_id)
+    if not version:
         return HttpResponse('No report found for the device', status=404)
-    report = LynisReport(report.full_report)
 
-    # Get the parsed report in key=value format, one key per line
-    parsed_report = report.get_parsed_report()
-    parsed_report = '\n'.join([f'{key}={value}' for key, value in parsed_report.items()])
-    return HttpResponse(parsed_report, content_type='text/plain')
+    def build():
+        # Get the parsed report in key=value format, one key per line
+        report = parsed_report(version[0])
+        return '\n'.join([f'{key}={value}' for key, value in report.items()])
+
+    body = _cached_body(f'device_report:text:{_report_etag(request, device_id)}', build)
+    return HttpResponse(body, content_type='text/plain')
 
 
 @login_required
+@condition(etag_func=_report_etag, last_modified_func=_report_last_modified)
 def device_report_json(request, device_id):
     """Device report view: show the parsed report as a JSON dictionary"""
-    device = get_object_or_404(Device, id=device_id)
-    report = FullReport.objects.filter(device=device).order_by('-created_at').first()
-    if not report:
+    get_object_or_404(Device, id=device_id)
+    version = _report_version(request, device_id)
+    if not version:
         return HttpResponse('No report found for the device', status=404)
-    parsed_report = LynisReport(report.full_report).get_parsed_report()
 
-    if not isinstance(parsed_report, dict) or not parsed_report:
+    def build():
+        report = parsed_report(version[0])
+        if not isinstance(report, dict) or not report:
+            return None
+        return json.dumps(report, indent=2, sort_keys=True)
+
+    body = _cached_body(f'device_report:json:{_report_etag(request, device_id)}', build)
+    if body is None:
         return HttpResponse('Failed to parse the report', status=500)
+    return HttpResponse(body, content_type='application/json')
 
-    json_payload = json.dumps(parsed_report, indent=2, sort_keys=True)
+@login_required
+def device_report_history(request, device_id):
+    """Device report history view: list the stored and archived reports of a device as JSON"""
+    device = get_object_or_404(Device, id=device_id)
+    history = [
+        {
+            'source': 'current',
+            'report_id': report['id'],
+            'created_at': report['created_at'].isoformat(),
+            'size': report['size'],
+        }
+        for report in FullReport.objects.filter(device=device)
+        .annotate(size=Length('full_report'))
+        .values('id', 'created_at', 'size')
+    ]
+    history += [
+        {
+            'source': 'archive',
+            'report_id': entry.report_id,
+            'created_at': entry.created_at.isoformat(),
+            'size': entry.size,
+            'url': reverse('device_report_archived', args=[device.id, entry.id]),
+        }
+        for entry in ArchivedReport.objects.filter(device=device).only('id', 'report_id', 'created_at', 'size')
+    ]
+    history.sort(key=lambda item: item['created_at'], reverse=True)
+    return JsonResponse(history, safe=False, json_dumps_params={'indent': 2})
+
+
+@login_required
+def device_report_archived(request, device_id, archive_id):
+    """Archived report view: show an archived report, parsed, as a JSON dictionary"""
+    entry = get_object_or_404(ArchivedReport, id=archive_id, device_id=device_id)
+    try:
+        raw_report = read_archived_report(entry)
+    except ArchiveError as e:
+        logging.error('Failed to read archived report %s: %s', entry.id, e)
+        return HttpResponse('Failed to read the archived report', status=500)
+    parsed_report = LynisReport(raw_report).get_parsed_report()
+    json_payload = json.dumps(parsed_report, indent=2, sort_keys=True, default=str)
     return HttpResponse(json_payload, content_type='application/json')
 
+
+def _changelog_version(request, device_id):
+    """Return the device's last update, latest diff id, diff count and latest diff time, or None; once per request."""
+    if not hasattr(request, '_changelog_version'):
+        request._changelog_version = (
+            Device.objects.filter(id=device_id)
+            .annotate(latest_diff=Max('diffreport__id'), diffs=Count('diffreport'), latest_diff_at=Max('diffreport__created_at'))
+            .values_list('updated_at', 'latest_diff', 'diffs', 'latest_diff_at')
+            .first()
+        )
+    return request._changelog_version
+
+
+def _changelog_etag(request, device_id):
+    version = _changelog_version(request, device_id)
+    if not version or not version[2]:
+        return None
+    # Retention summaries rewrite old diffs in place and touch Device.updated_at
+    updated_at, latest_diff, diffs, _ = version
+    return f'changelog-{latest_diff}-{diffs}-{updated_at.timestamp():.0f}'
+
+
+def _changelog_last_modified(request, device_id):
+    version = _changelog_version(request, device_id)
+    if not version or not version[2]:
+        return None
+    return max(version[0], version[3])
+
+
 @login_required
+@condition(etag_func=_changelog_etag, last_modified_func=_changelog_last_modified)
 def device_report_changelog(request, device_id):
-    """Device report changelog view: show all the changelogs of a device"""
-    device = get_object_or_404(Device, id=device_id)
-    changelog = DiffReport.objects.filter(device=device).order_by('-created_at')
-    if not changelog:
+    """Device report changelog view: stream a page of the device's changelog, newest first (see api.utils.changelog)"""
+    get_object_or_404(Device, id=device_id)
+    if not _changelog_etag(request, device_id):
         return HttpResponse('No changelog found for the device', status=404)
-    import json
-    # Return JSON array of diff reports
-    diff_reports = [report.diff_report for report in changelog]
-    return HttpResponse(json.dumps(diff_reports, indent=2), content_type='application/json')
+    try:
+        page = ChangelogPage(
+            device_id,
+            cursor=request.GET.get('cursor'),
+            limit=request.GET.get('limit'),
+            key=request.GET.get('key'),
+            change_type=request.GET.get('type'),
+            compact=request.GET.get('compact') in ('1', 'true'),
+        )
+    except ChangelogQueryError as e:
+        return HttpResponse(str(e), status=400)
+
+    def stream():
+        yield '{"results":['
+        for position, entry in enumerate(page):
+            yield (',' if position else '') + json.dumps(entry, cls=DjangoJSONEncoder)
+        yield f'],"next_cursor":{json.dumps(page.next_cursor)}}}'
+
+    return StreamingHttpResponse(stream(), content_type='application/json')
 
 @login_required
 def policy_list(request):
@@ -557,9 +799,9 @@ def policy_list(request):
     
     # Pagination for rulesets (10 per page)
     ruleset_page = request.GET.get('ruleset_page', 1)
-    rulesets = PolicyRuleset.objects.prefetch_related('rules', 'devices').annotate(
-        rules_count=Count('rules'),
-        devices_count=Count('devices')
+    rulesets = PolicyRuleset.objects.annotate(
+        rules_count=Count('rules', distinct=True),
+        devices_count=Count('devices', distinct=True)
     ).all().order_by(ruleset_order_by)
     ruleset_paginator = Paginator(rulesets, 10)
     rulesets_page_obj = ruleset_paginator.get_page(ruleset_page)
@@ -573,6 +815,11 @@ def policy_list(request):
         'name': 'name',
         'enabled': 'enabled',
         'updated_at': 'updated_at',
+        # Evaluation statistics, sorted in Python (see api.utils.rule_stats)
+        'evaluations': 'evaluations',
+        'mean_ms': 'mean_ms',
+        'p95_ms': 'p95_ms',
+        'error_rate': 'error_rate',
     }
     rule_sort_field = valid_rule_sort_fields.get(rule_sort_field, 'updated_at')
     
@@ -584,7 +831,18 @@ def policy_list(request):
     
     # Pagination for rules (10 per page)
     rule_page = request.GET.get('rule_page', 1)
-    rules = PolicyRule.objects.prefetch_related('policyruleset_set').all().order_by(rule_order_by)
+    rules = PolicyRule.objects.prefetch_related('policyruleset_set').all()
+    stats = rule_stats()
+    if rule_sort_field in ('evaluations', 'mean_ms', 'p95_ms', 'error_rate'):
+        rules = sorted(
+            rules,
+            key=lambda rule: (stats.get(rule.id) or {}).get(rule_sort_field) or 0,
+            reverse=rule_sort_order != 'asc',
+        )
+    else:
+        rules = list(rules.order_by(rule_order_by))
+    for rule in rules:
+        rule.performance = stats.get(rule.id)
     rule_paginator = Paginator(rules, 10)
     rules_page_obj = rule_paginator.get_page(rule_page)
     
@@ -600,36 +858,8 @@ def policy_list(request):
         PolicyRuleset.objects.filter(devices__isnull=False).values_list('id', flat=True).distinct()
     )
     
-    # Serialize rulesets for JavaScript (use all rulesets, not just paginated)
-    all_rulesets = PolicyRuleset.objects.prefetch_related('rules', 'devices').annotate(
-        rules_count=Count('rules'),
-        devices_count=Count('devices')
-    ).all()
-    rulesets_data = []
-    for ruleset in all_rulesets:
-        ruleset_data = {
-            'id': ruleset.id,
-            'name': ruleset.name,
-            'description': ruleset.description,
-            'created_at': ruleset.created_at.isoformat(),
-            'updated_at': ruleset.updated_at.isoformat(),
-            'rules': list(ruleset.rules.values('id', 'name', 'enabled', 'description', 'rule_query')),
-        }
-        rulesets_data.append(ruleset_data)
-    
-    # Serialize rules for JavaScript
-    rules_data = []
-    for rule in rules:  # Use all rules for JavaScript, not just paginated
-        rule_data = {
-            'id': rule.id,
-            'name': rule.name,
-            'description': rule.description,
-            'rule_query': rule.rule_query,
-            'enabled': rule.enabled,
-            'created_at': rule.created_at.isoformat(),
-            'updated_at': rule.updated_at.isoformat(),
-        }
-        rules_data.append(rule_data)
+    # Rulesets and rules for JavaScript (all of them, not just paginated)
+    catalog = get_catalog()
     
     # Build query strings for pagination (preserving sort parameters and other table's params)
     ruleset_query_params = request.GET.copy()
@@ -657,13 +887,17 @@ def policy_list(request):
     if 'ruleset_order' in request.GET:
         rule_query_params['ruleset_order'] = request.GET.get('ruleset_order')
     rule_pagination_query = rule_query_params.urlencode()
+
+    # Rule evaluations run or carried forward at ingest (see evaluate_device_compliance)
+    rules_evaluated, rules_skipped = evaluation_counts()
+    evaluation_total = rules_evaluated + rules_skipped
     
     context = {
         'rulesets': rulesets_page_obj,
-        'rulesets_json': json.dumps(rulesets_data),
+        'rulesets_json': catalog['rulesets_json'],
         'rules': rules_page_obj,  # Paginated rules for the table
         'all_rules': rules,  # All rules for the rule selection sidebar
-        'rules_json': json.dumps(rules_data),
+        'rules_json': catalog['rules_json'],
         'rules_linked_to_rulesets': list(rules_linked_to_rulesets),  # List of rule IDs linked to rulesets
         'rulesets_linked_to_devices': list(rulesets_linked_to_devices),  # List of ruleset IDs linked to devices
         'ruleset_current_sort': ruleset_sort_field,
@@ -672,6 +906,9 @@ def policy_list(request):
         'rule_current_sort': rule_sort_field,
         'rule_current_order': rule_sort_order,
         'rule_pagination_query': rule_pagination_query,
+        'rules_evaluated': rules_evaluated,
+        'rules_skipped': rules_skipped,
+        'rules_skipped_percent': round(100 * rules_skipped / evaluation_total) if evaluation_total else 0,
     }
     
     return render(request, 'policy/policy_list.html', context)
@@ -762,35 +999,16 @@ def ruleset_detail(request, ruleset_id):
     # Get all rules for rule selection sidebar
     all_rules = PolicyRule.objects.all().order_by('name')
     
-    # Serialize ruleset for JavaScript
-    ruleset_data = {
-        'id': ruleset.id,
-        'name': ruleset.name,
-        'description': ruleset.description,
-        'created_at': ruleset.created_at.isoformat(),
-        'updated_at': ruleset.updated_at.isoformat(),
-        'rules': list(ruleset.rules.values('id', 'name', 'enabled', 'description', 'rule_query')),
-    }
-    
-    # Serialize all rules for JavaScript
-    rules_data = []
-    for rule in all_rules:
-        rule_data = {
-            'id': rule.id,
-            'name': rule.name,
-            'description': rule.description,
-            'rule_query': rule.rule_query,
-            'enabled': rule.enabled,
-        }
-        rules_data.append(rule_data)
+    # Ruleset and all rules for JavaScript
+    catalog = get_catalog()
     
     context = {
         'ruleset': ruleset,
         'rules': rules,  # Rules in this ruleset
         'all_rules': all_rules,  # All rules for rule selection sidebar
         'devices': devices,
-        'ruleset_json': json.dumps(ruleset_data),
-        'rules_json': json.dumps(rules_data),
+        'ruleset_json': json.dumps(catalog['rulesets'][ruleset.id]),
+        'rules_json': catalog['rules_json'],
     }
     
     return render(request, 'policy/ruleset_detail.html', context)
@@ -815,6 +1033,7 @@ def ruleset_update(request, ruleset_id):
             selected_rules = PolicyRule.objects.filter(id__in=selected_rule_ids)
             ruleset.rules.set(selected_rules)
             ruleset.save()
+            refresh_device_compliance(ruleset.devices.all())
             return redirect('policy_list')
         
         # Prevent editing name/description of system rulesets
@@ -874,6 +1093,7 @@ def ruleset_update(request, ruleset_id):
                 selected_rules = PolicyRule.objects.filter(id__in=rule_ids_int)
                 ruleset.rules.set(selected_rules)
                 ruleset.save()
+                refresh_device_compliance(ruleset.devices.all())
             
             # AJAX request: return JSON
             if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -1000,10 +1220,40 @@ def rule_detail(request, rule_id):
         'rule': rule,
         'rulesets': rulesets,  # Rulesets using this rule
         'rule_json': json.dumps(rule_data),
+        'performance': rule_stats([rule.id]).get(rule.id),
+        'performance_days': [
+            daily_stats(row) for row in rule.evaluation_stats.order_by('-day')[:getattr(settings, 'POLICY_RULE_STATS_DAYS', 7)]
+        ],
+        'stats_retention_days': getattr(settings, 'POLICY_RULE_STATS_DAYS', 7),
     }
     
     return render(request, 'policy/rule_detail.html', context)
 
+@login_required
+def rule_stats_export(request):
+    """Export the daily evaluation statistics of every rule as CSV (or JSON with ?format=json)"""
+    import csv
+    from api.models import RuleEvaluationStats
+
+    fields = ['rule_id', 'rule_name', 'rule_query', 'day', 'evaluations', 'errors', 'error_rate', 'mean_ms', 'p95_ms', 'max_ms', 'last_failure_at']
+    rows = []
+    for row in RuleEvaluationStats.objects.select_related('rule').order_by('rule_id', 'day'):
+        stats = daily_stats(row)
+        stats['day'] = stats['day'].isoformat()
+        stats['last_failure_at'] = stats['last_failure_at'].isoformat() if stats['last_failure_at'] else None
+        rows.append({'rule_id': row.rule_id, 'rule_name': row.rule.name, 'rule_query': row.rule.rule_query, **stats})
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({'fields': fields, 'rows': rows})
+
+    response = HttpResponse(content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="rule-stats-{datetime.now().strftime("%Y%m%d")}.csv"'
+    writer = csv.DictWriter(response, fieldnames=fields)
+    writer.writeheader()
+    # Rule names and queries are user input
+    writer.writerows({field: csv_value(value) for field, value in row.items()} for row in rows)
+    return response
+
 @login_required
 @csrf_protect
 def rule_update(request, rule_id):
@@ -1028,16 +1278,23 @@ def rule_update(request, rule_id):
             rule = form.save(commit=False)
             if not rule.created_by:
                 rule.created_by = request.user
+            if 'rule_query' in form.changed_data:
+                # Timings of the previous query no longer apply
+                rule.slow_since = None
             rule.save()
+            refresh_device_compliance(Device.objects.filter(rulesets__rules=rule).distinct())
             
             # AJAX request: return JSON
             if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
                 return JsonResponse({
                     'success': True,
                     'rule_id': policy_rule.id,
-                    'message': 'Rule updated successfully'
+                    'message': 'Rule updated successfully',
+                    'warnings': list(form.cost_warnings),
                 })
             
+            for warning in form.cost_warnings:
+                messages.warning(request, f'Rule "{rule.name}" may be slow: {warning}')
             # Traditional request: redirect to referer or rule list
             return safe_redirect(request, 'policy_list')
         else:
@@ -1071,9 +1328,12 @@ def rule_create(request):
                 return JsonResponse({
                     'success': True,
                     'rule_id': rule.id,
-                    'message': 'Rule created successfully'
+                    'message': 'Rule created successfully',
+                    'warnings': list(form.cost_warnings),
                 })
             
+            for warning in form.cost_warnings:
+                messages.warning(request, f'Rule "{rule.name}" may be slow: {warning}')
             # Traditional request: redirect to referer or rule list
             return safe_redirect(request, 'policy_list')
         else:
@@ -1095,6 +1355,44 @@ def rule_add(request):
     """Rule add view: add a new policy rule"""
     return render(request, 'policy/rule_form.html')
 
+@login_required
+@csrf_protect
+def rule_impact_preview(request):
+    """Start evaluating a draft rule query against every device; poll rule_impact_preview_status for the result"""
+    if request.method != 'POST':
+        return HttpResponse('Method not allowed', status=405)
+
+    form = RuleImpactPreviewForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'success': False, 'errors': form.errors}, status=400)
+
+    rule = None
+    if form.cleaned_data['rule_id']:
+        rule = get_object_or_404(PolicyRule, id=form.cleaned_data['rule_id'])
+    preview = start_preview(form.cleaned_data['rule_query'], request.user, rule=rule)
+    return JsonResponse({
+        'success': True,
+        'preview_id': preview.id,
+        'status_url': reverse('rule_impact_preview_status', kwargs={'preview_id': preview.id}),
+    }, status=202)
+
+@login_required
+def rule_impact_preview_status(request, preview_id):
+    """Progress and counts of a rule impact preview started by the current user"""
+    from api.models import RuleImpactPreview
+
+    preview = get_object_or_404(RuleImpactPreview, id=preview_id, created_by=request.user)
+    return JsonResponse({
+        'success': True,
+        'status': preview.status,
+        'rule_query': preview.rule_query,
+        'total': preview.total,
+        'processed': preview.processed,
+        'percent': round(100 * preview.processed / preview.total) if preview.total else 0,
+        'result': preview.result,
+        'error': preview.error,
+    })
+
 @login_required
 def rule_evaluate_for_device(request, device_id, rule_id):
     """Rule evaluation view: evaluate a rule against device's last report and return debug information"""
@@ -1210,137 +1508,42 @@ def activity(request):
     max_activities = 50
     preview_limit = 3
 
-    # Get all diff reports (from most recent to oldest)
-    diff_reports = DiffReport.objects.all().order_by('-created_at')
-    
-    # Let's humanize the diff reports to show them in the template
+    # Get the latest diff reports (from most recent to oldest); summarized diffs are shown by key name.
+    # Each diff yields at least one activity, so max_activities diffs are enough for the page
+    diff_reports = list(
+        DiffReport.objects.select_related('device').defer('diff_report')
+        .order_by('-created_at')[:max_activities]
+    )
+
+    # Humanize the diff reports from their cached display model
+    displays = diff_displays([diff_report.id for diff_report in diff_reports])
     for diff_report in diff_reports:
         if len(activities) >= max_activities:
             break
-        
-        diff_data = diff_report.diff_report  # Already a dict from JSONField
-        
         # Get hostname from DiffReport (preserved even if device is deleted)
         # Fallback to device.hostname if device still exists
         report_hostname = diff_report.hostname or (diff_report.device.hostname if diff_report.device else None)
-        
-        if 'added' in diff_data and 'removed' in diff_data:
-            for change_type in ['added', 'removed']:
-                logging.debug('Change type: %s', change_type)
-                for key, values in diff_data[change_type].items():
-                    logging.debug('Added/removed Key: %s', key)
-                    # Normalize to list: if it's a string, wrap it in a list
-                    if not isinstance(values, list):
-                        values = [values]
-                    # For every value in the list of values, append a new activity
-                    for value in values:
-                        activities.append({
-                            'device': diff_report.device,
-                            'created_at': diff_report.created_at,
-                            'key': key,
-                            'value': value,
-                            'type': change_type
-                        })
-        
-        if 'changed' in diff_data:
-            for change in diff_data['changed']:
-                # change = {'slow_test': {'old': [['DEB-0001', '17.179738'], ['PKGS-7392', '22.329404'], ['CRYP-7902', '28.998732']], 'new': [['DEB-0001', '19.197790'], ['PKGS-7345', '11.064739'], ['PKGS-7392', '17.606281'], ['CRYP-7902', '31.913178']]}}
-                key = list(change.keys())[0]
-                logging.debug('Changed key: %s', key)
-                
-                old_value = change[key]['old']
-                new_value = change[key]['new']
-                
-                # Check if both values are lists/arrays
-                is_array = isinstance(old_value, list) and isinstance(new_value, list)
-                array_added = []
-                array_removed = []
-                
-                if is_array:
-                    # Convert lists to sets for comparison (handling nested lists/strings)
-                    # If items are lists themselves, convert to tuples for hashing
-                    def normalize_for_set(item):
-                        if isinstance(item, list):
-                            return tuple(item)
-                        return item
-                    
-                    def format_item_for_display(item):
-                        """Format an item for display in the template."""
-                        if isinstance(item, list):
-                            # For lists, show the first element (usually the main identifier)
-                            # e.g., ['package-name', 'version'] -> 'package-name'
-                            return str(item[0]) if item else str(item)
-                        return str(item)
-                    
-                    old_set = set(normalize_for_set(item) for item in old_value)
-                    new_set = set(normalize_for_set(item) for item in new_value)
-                    
-                    # Find added and removed items
-                    added_items = sorted(list(new_set - old_set), key=str)
-                    removed_items = sorted(list(old_set - new_set), key=str)
-                    
-                    # Format items for display
-                    array_added = [format_item_for_display(item) for item in added_items]
-                    array_removed = [format_item_for_display(item) for item in removed_items]
-
-                activity_data = {
-                    'device': diff_report.device,
-                    'hostname': report_hostname,  # Preserved hostname
-                    'created_at': diff_report.created_at,
-                    'key': key,
-                    'old_value': old_value,
-                    'new_value': new_value,
-                    'type': 'changed',
-                    'is_array': is_array,
-                    'array_added': array_added,
-                    'array_removed': array_removed,
-                }
-                
-                activities.append(activity_data)
-
-        # Order activities by date (most recent first) and type (added, removed, changed)
-        activities = sorted(activities, key=lambda x: (x['created_at'], x['type']), reverse=True)
+        for entry in displays[diff_report.id]:
+            activities.append({
+                **entry,
+                'device': diff_report.device,
+                'hostname': report_hostname,  # Preserved hostname
+                'created_at': diff_report.created_at,
+            })
+
+    # Order activities by date (most recent first) and type (added, removed, changed)
+    activities = sorted(activities, key=lambda x: (x['created_at'], x['type']), reverse=True)
     
     # Filter activities based on silence rules
     if activities:
-        # Get default organization (single-tenant for now)
-        org = Organization.objects.first()
-        if org:
-            # Get all active silence rules for the organization
-            silence_rules = ActivityIgnorePattern.objects.filter(
-                organization=org, is_active=True
+        rules = silence_rules()
+        activities = [
+            activity for activity in activities
+            if not is_silenced(
+                rules, activity['key'], activity.get('type', 'other'),
+                activity['device'].hostname if activity['device'] else None,
             )
-            
-            # Filter out activities that match any silence rule
-            filtered_activities = []
-            for activity in activities:
-                device = activity['device']
-                activity_key = activity['key']
-                activity_type = activity.get('type', 'other')
-                
-                # Check if this activity matches any silence rule
-                should_include = True
-                for rule in silence_rules:
-                    # Match key pattern
-                    if rule.key_pattern != '*' and not fnmatch.fnmatch(activity_key, rule.key_pattern):
-                        continue
-                    
-                    # Match event type
-                    if rule.event_type != 'all' and activity_type != rule.event_type:
-                        continue
-                    
-                    # Match host pattern
-                    if rule.host_pattern != '*' and device.hostname and not fnmatch.fnmatch(device.hostname, rule.host_pattern):
-                        continue
-                    
-                    # If we get here, this activity matches the rule - exclude it
-                    should_include = False
-                    break
-                
-                if should_include:
-                    filtered_activities.append(activity)
-            
-            activities = filtered_activities
+        ]
     
     # Merge device events (not affected by silence rules)
     combined_activities = list(activities)
@@ -1564,9 +1767,81 @@ def activity(request):
         'is_paginated': is_paginated,
         'pagination_query': base_query,
         'all_devices': all_devices,
+        # Live feed of the activity created after this page (see api.utils.activity_feed)
+        'feed_cursor': activity_feed.encode_cursor(*activity_feed.head(refresh=True)),
     })
 
 
+def _feed_cursor(value):
+    """Return the feed cursor of a request parameter, the newest activity when empty."""
+    return activity_feed.decode_cursor(value) if value else activity_feed.head(refresh=True)
+
+
+def _sse_message(entries, cursor):
+    data = json.dumps(entries, cls=DjangoJSONEncoder)
+    return f'id: {activity_feed.encode_cursor(*cursor)}\nevent: activity\ndata: {data}\n\n'
+
+
+def _activity_events(cursor, seconds):
+    """Server-Sent Events of the activity after ``cursor`` during ``seconds``, for WSGI servers."""
+    deadline = time.monotonic() + seconds
+    yield f'retry: {ACTIVITY_STREAM_RETRY_MS}\n\n'
+    while (remaining := deadline - time.monotonic()) > 0:
+        entries, next_cursor = activity_feed.wait(cursor, min(ACTIVITY_STREAM_KEEPALIVE_SECONDS, remaining))
+        # A comment line keeps proxies from closing an idle stream
+        yield _sse_message(entries, next_cursor) if next_cursor != cursor else ': keepalive\n\n'
+        cursor = next_cursor
+
+
+async def _async_activity_events(cursor, seconds):
+    """``_activity_events`` for ASGI servers: a waiting stream holds no thread."""
+    deadline = time.monotonic() + seconds
+    yield f'retry: {ACTIVITY_STREAM_RETRY_MS}\n\n'
+    while (remaining := deadline - time.monotonic()) > 0:
+        entries, next_cursor = await activity_feed.async_wait(cursor, min(ACTIVITY_STREAM_KEEPALIVE_SECONDS, remaining))
+        yield _sse_message(entries, next_cursor) if next_cursor != cursor else ': keepalive\n\n'
+        cursor = next_cursor
+
+
+@login_required
+def activity_stream(request):
+    """
+    Server-Sent Events stream of new activity entries and device events.
+
+    Starts after the ``cursor`` parameter or the Last-Event-ID of a
+    reconnecting EventSource. The stream ends after ACTIVITY_FEED_STREAM_SECONDS,
+    at most ACTIVITY_STREAM_WSGI_MAX_SECONDS under WSGI, and the browser
+    reconnects from the last event it received.
+    """
+    try:
+        cursor = _feed_cursor(request.headers.get('Last-Event-ID') or request.GET.get('cursor'))
+    except activity_feed.FeedCursorError as e:
+        return HttpResponse(str(e), status=400)
+
+    seconds = getattr(settings, 'ACTIVITY_FEED_STREAM_SECONDS', 300)
+    if isinstance(request, ASGIRequest):
+        events = _async_activity_events(cursor, seconds)
+    else:
+        events = _activity_events(cursor, min(seconds, ACTIVITY_STREAM_WSGI_MAX_SECONDS))
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Stop nginx from buffering the stream
+    return response
+
+
+@login_required
+def activity_poll(request):
+    """Long-polling fallback of activity_stream: waits up to ``wait`` seconds for activity after ``cursor``"""
+    try:
+        cursor = _feed_cursor(request.GET.get('cursor'))
+        wait = min(max(float(request.GET.get('wait') or ACTIVITY_POLL_MAX_WAIT_SECONDS), 0), ACTIVITY_POLL_MAX_WAIT_SECONDS)
+    except (activity_feed.FeedCursorError, ValueError) as e:
+        return HttpResponse(str(e), status=400)
+
+    entries, cursor = activity_feed.wait(cursor, wait)
+    return JsonResponse({'entries': entries, 'cursor': activity_feed.encode_cursor(*cursor)})
+
+
 @login_required
 def silence_rule_list(request):
     """List all silence rules for the current organization (JSON endpoint)"""
@@ -1716,7 +1991,7 @@ def license_list(request):
     from django.utils import timezone
     from datetime import timedelta
     import json
-    licenses = LicenseKey.objects.all().order_by('-created_at')
+    licenses = LicenseKey.objects.annotate(num_devices=Count('device')).order_by('-created_at')
     now = timezone.now()
     
     # Serialize licenses for JavaScript
@@ -1731,7 +2006,7 @@ def license_list(request):
             'name': license.name,
             'licensekey': license.licensekey,
             'max_devices': license.max_devices,
-            'device_count': license.device_count(),
+            'device_count': license.num_devices,
             'expires_at': license.expires_at.isoformat() if license.expires_at else None,
             'is_active': license.is_active,
             'is_expired': is_expired,
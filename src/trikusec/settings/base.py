@@ -43,6 +43,11 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        'performance': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
     'root': {
         'handlers': ['console'],
@@ -81,6 +86,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'api.middleware.AuditLoggingMiddleware',  # Add audit logging
+    'api.middleware.QueryProfilingMiddleware',  # Query count / slow request logging
 ]
 
 ROOT_URLCONF = 'trikusec.urls'
@@ -247,3 +253,62 @@ TRIKUSEC_URL = os.environ.get('TRIKUSEC_URL', 'https://localhost:443')
 # Lynis API URL - falls back to TRIKUSEC_URL if not set
 TRIKUSEC_LYNIS_API_URL = os.environ.get('TRIKUSEC_LYNIS_API_URL', TRIKUSEC_URL)
 
+# Request profiling (see api.middleware.QueryProfilingMiddleware)
+REQUEST_PROFILING_ENABLED = os.environ.get('REQUEST_PROFILING_ENABLED', 'True').lower() in ('true', '1', 'yes')
+SLOW_REQUEST_THRESHOLD_MS = int(os.environ.get('SLOW_REQUEST_THRESHOLD_MS', '500'))
+SLOW_REQUEST_QUERY_BUDGET = int(os.environ.get('SLOW_REQUEST_QUERY_BUDGET', '100'))
+REQUEST_PROFILING_TOP_QUERIES = 5
+# Fraction of requests profiled with cProfile at startup (can be changed at runtime via /profiling/)
+REQUEST_PROFILING_SAMPLE_RATE = float(os.environ.get('REQUEST_PROFILING_SAMPLE_RATE', '0'))
+
+# Full reports kept per device; a license can override it with report_retention
+FULLREPORT_RETENTION_COUNT = int(os.environ.get('FULLREPORT_RETENTION_COUNT', '2'))
+# Dotted path to a callable receiving the list of FullReports about to be pruned (e.g. to copy them to cold storage)
+FULLREPORT_ARCHIVE_HOOK = os.environ.get('FULLREPORT_ARCHIVE_HOOK', '')
+# Segment files written by api.utils.report_archive.archive_reports (set it as FULLREPORT_ARCHIVE_HOOK to enable)
+REPORT_ARCHIVE_DIR = Path(os.environ.get('REPORT_ARCHIVE_DIR', str(BASE_DIR / 'archive')))
+REPORT_ARCHIVE_COMPRESSION_LEVEL = 6
+
+# Run housekeeping (e.g. report pruning) in a background thread after the response (see api.utils.tasks)
+DEFERRED_TASKS_ENABLED = os.environ.get('DEFERRED_TASKS_ENABLED', 'True').lower() in ('true', '1', 'yes')
+# Threads running deferred tasks in each process, PDF renderings included
+DEFERRED_TASKS_WORKERS = int(os.environ.get('DEFERRED_TASKS_WORKERS', '1'))
+
+# Seconds the serialized bodies of the device report and changelog endpoints, and parsed reports, stay in the cache
+REPORT_BODY_CACHE_SECONDS = int(os.environ.get('REPORT_BODY_CACHE_SECONDS', '3600'))
+
+# Device PDF exports (see api.utils.pdf_export): seconds after which an unfinished rendering is started
+# again, and a bulk export stops waiting when no PDF finished
+PDF_EXPORT_TIMEOUT = int(os.environ.get('PDF_EXPORT_TIMEOUT', '300'))
+
+# Fleet dashboard (see api.utils.fleet_dashboard): days without a report after which a device is stale
+DASHBOARD_STALE_DAYS = int(os.environ.get('DASHBOARD_STALE_DAYS', '7'))
+
+# Live activity feed (see api.utils.activity_feed): seconds between checks for new activity and
+# lifetime of one event stream, after which the browser reconnects
+ACTIVITY_FEED_POLL_SECONDS = float(os.environ.get('ACTIVITY_FEED_POLL_SECONDS', '2'))
+ACTIVITY_FEED_STREAM_SECONDS = int(os.environ.get('ACTIVITY_FEED_STREAM_SECONDS', '300'))
+
+# History retention (see api.utils.retention and `manage.py apply_retention`); 0 disables a limit
+RETENTION_DIFFREPORT_MAX_AGE_DAYS = int(os.environ.get('RETENTION_DIFFREPORT_MAX_AGE_DAYS', '365'))
+RETENTION_DIFFREPORT_MAX_ROWS_PER_DEVICE = int(os.environ.get('RETENTION_DIFFREPORT_MAX_ROWS_PER_DEVICE', '1000'))
+RETENTION_DIFFREPORT_SUMMARY_AFTER_DAYS = int(os.environ.get('RETENTION_DIFFREPORT_SUMMARY_AFTER_DAYS', '90'))
+RETENTION_DEVICEEVENT_MAX_AGE_DAYS = int(os.environ.get('RETENTION_DEVICEEVENT_MAX_AGE_DAYS', '730'))
+RETENTION_DEVICEEVENT_MAX_ROWS_PER_DEVICE = int(os.environ.get('RETENTION_DEVICEEVENT_MAX_ROWS_PER_DEVICE', '0'))
+RETENTION_COMPLIANCESNAPSHOT_MAX_AGE_DAYS = int(os.environ.get('RETENTION_COMPLIANCESNAPSHOT_MAX_AGE_DAYS', '730'))
+RETENTION_COMPLIANCESNAPSHOT_MAX_ROWS_PER_DEVICE = int(os.environ.get('RETENTION_COMPLIANCESNAPSHOT_MAX_ROWS_PER_DEVICE', '0'))
+
+# Policy rule cost guards (see api.utils.policy_query.analyze_query and api.utils.rule_guard)
+POLICY_RULE_MAX_PROJECTIONS = int(os.environ.get('POLICY_RULE_MAX_PROJECTIONS', '4'))
+POLICY_RULE_MAX_FILTER_DEPTH = int(os.environ.get('POLICY_RULE_MAX_FILTER_DEPTH', '2'))
+# Rules whose 95th percentile evaluation time exceeds this are flagged as slow
+POLICY_RULE_SLOW_MS = float(os.environ.get('POLICY_RULE_SLOW_MS', '50'))
+# A rule is skipped for POLICY_RULE_BREAKER_COOLDOWN seconds after this many consecutive
+# evaluations slower than POLICY_RULE_BREAKER_MS; 0 disables the breaker
+POLICY_RULE_BREAKER_MS = float(os.environ.get('POLICY_RULE_BREAKER_MS', '500'))
+POLICY_RULE_BREAKER_THRESHOLD = int(os.environ.get('POLICY_RULE_BREAKER_THRESHOLD', '3'))
+POLICY_RULE_BREAKER_COOLDOWN = int(os.environ.get('POLICY_RULE_BREAKER_COOLDOWN', '300'))
+# Per-rule evaluation statistics (see api.utils.rule_stats): days kept and how often each process writes
+# them (0: only when flushed explicitly, e.g. by manage.py recompute)
+POLICY_RULE_STATS_DAYS = int(os.environ.get('POLICY_RULE_STATS_DAYS', '7'))
+POLICY_RULE_STATS_FLUSH_SECONDS = int(os.environ.get('POLICY_RULE_STATS_FLUSH_SECONDS', '60'))
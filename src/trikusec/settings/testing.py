@@ -17,6 +17,12 @@ DATABASES = {
 # Disable rate limiting in tests
 RATELIMIT_ENABLE = False
 
+# Run deferred tasks inline so tests can assert on their results
+DEFERRED_TASKS_ENABLED = False
+
+# Rule evaluation statistics are only written when a test flushes them
+POLICY_RULE_STATS_FLUSH_SECONDS = 0
+
 # Simpler password hashing for faster tests
 PASSWORD_HASHERS = [
     'django.contrib.auth.hashers.MD5PasswordHasher',
@@ -20,9 +20,11 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from api.health import health_check
+from api.profiling import profiling_settings
 
 urlpatterns = [
     path('health/', health_check, name='health_check'),
+    path('profiling/', profiling_settings, name='profiling_settings'),
     path('admin/', admin.site.urls),
     path('', include('frontend.urls')),
     